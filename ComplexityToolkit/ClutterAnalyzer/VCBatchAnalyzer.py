@@ -89,7 +89,7 @@ class VCBatchAnalyzer():
 
     def _load_VCFrameAnalyzer_objects(self, suffix: str = '.jpg'):
         file_paths = DirectoryParser.parse_directory(self.folder_path, suffix=suffix)
-        ordered_files = DirectoryParser.order_parsed_files(file_paths=file_paths)
+        ordered_files = DirectoryParser.order_parsed_files(file_paths=file_paths, natural=True)
         self.vc_frame_objects = {i: VCFrameAnalyzer(input_image=ordered_files[i], num_segments=self.grid_dimensions)
                                  for i, _ in enumerate(ordered_files)}
 
@@ -1,7 +1,7 @@
 from ..Utils import FrameSegmenter
 from PIL import Image
-import visual_clutter as vc
 import numpy as np
+import visual_clutter as vc
 
 
 class VCFrameAnalyzer():
@@ -46,7 +46,7 @@ class VCFrameAnalyzer():
         value will be set to -1.
         '''
         # Segment the image.
-        segments = FrameSegmenter.segment_frame(image=self.image, num_segments=self.num_segments)
+        segments = FrameSegmenter.segment_frame_array(image=self.image, num_segments=self.num_segments)
         # Perform FC & SE on each segment.
         for key, val in segments.items():
             if verbose > 0:
@@ -139,7 +139,8 @@ class VCFrameAnalyzer():
                             required fields.")
 
     def _calculate_subframe_clutter(self, subframe_dict: dict) -> dict:
-        segment_vlc = vc.Vlc(inputImage=np.array(subframe_dict['image']),
+        # Segments are read-only, strided views into the frame; Vlc gets its own contiguous copy.
+        segment_vlc = vc.Vlc(inputImage=np.array(subframe_dict['image'], order='C'),
                              numlevels=self.vc_settings['numlevels'],
                              contrast_filt_sigma=self.vc_settings['contrast_filt_sigma'],
                              contrast_pool_sigma=self.vc_settings['contrast_pool_sigma'],
@@ -2,9 +2,10 @@ import sys
 import json
 from ..Utils import LabelParser, ReformateJson, FrameSegmenter
 from ..GroupingsAnalyzer import GroupingsDefiner as gd
+from ..GroupingsAnalyzer.GroupingsModel import GroupSet
 import copy
 import math
-import matplotlib.pyplot as plt
+import numpy as np
 
 
 SPEED_FACTORS = {
@@ -33,104 +34,150 @@ POS_FACTORS = {
 }
 
 
-def _calc_gridc_groupings(pos_groups: dict, spd_groups: dict, dir_groups: dict, grid_centers: list, category:str):
+GRID_CHANNELS = ('pos', 'spd', 'dir')
+_GRID_REDUCTIONS = {'sum', 'max', 'mean'}
+
+
+def calc_gridc(pos_groups: dict, spd_groups: dict, dir_groups: dict, category: str,
+               window_size: tuple = (1920, 1080), grid_dimensions: tuple = (10, 20), reduction: str = 'sum',
+               boxes: bool = False, pos_factors: dict = POS_FACTORS, speed_factors: dict = SPEED_FACTORS,
+               dir_factors: dict = DIR_FACTORS) -> np.ndarray:
+    '''
+    Grid complexity of a category for every frame, as a (frames, rows, cols, 3) array
+    where the last axis is GRID_CHANNELS ('pos', 'spd', 'dir'). Each cell combines the
+    complexities of all groups whose radius contains the cell's grid center (see
+    FrameSegmenter.grid_centers()) using 'reduction' ('sum', 'max' or 'mean').
+
+    Notes
+    -----
+    The group dictionaries have the same format as for _calc_gridc_groupings(). Set
+    'boxes' to True for box data (boxes_category_by_position() / rebox_by_attribute_state());
+    every box then counts as a group of one. Any of the {'frames': [...]} values can also
+    be a GroupingsModel.GroupSet, which is read from its arrays.
+    '''
+    layers = _grid_layers(pos_groups=pos_groups, spd_groups=spd_groups, dir_groups=dir_groups, category=category,
+                          boxes=boxes, pos_factors=pos_factors, speed_factors=speed_factors, dir_factors=dir_factors)
+    return rasterize_gridc(*layers, window_size=window_size, grid_dimensions=grid_dimensions, reduction=reduction)
+
+
+def rasterize_gridc(centers: np.ndarray, radii: np.ndarray, weights: np.ndarray, frame_index: np.ndarray,
+                    channel: np.ndarray, num_frames: int, window_size: tuple = (1920, 1080),
+                    grid_dimensions: tuple = (10, 20), reduction: str = 'sum') -> np.ndarray:
+    '''
+    Accumulates the complexity ('weights') of a set of groups onto a (frames, rows, cols, 3)
+    grid in one vectorized pass. Group g belongs to frame frame_index[g] and to channel
+    channel[g] (an index into GRID_CHANNELS), and covers the cells whose grid center lies
+    strictly within radii[g] of centers[g].
+
+    Notes
+    -----
+    'reduction' is 'sum', 'max' or 'mean'. Cells without groups are 0.
+    '''
+    _verify_reduction(reduction=reduction)
+    points = FrameSegmenter.grid_centers(window_size=window_size, grid_dimensions=grid_dimensions)
+    num_points, num_channels = len(points), len(GRID_CHANNELS)
+    indptr, indices = FrameSegmenter.points_within_radii_csr(centers, radii, points)
+    group_of = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    target = (np.asarray(frame_index, dtype=np.int64)[group_of] * num_points + indices) * num_channels + \
+             np.asarray(channel, dtype=np.int64)[group_of]
+    values = np.asarray(weights, dtype=float)[group_of]
+    size = num_frames * num_points * num_channels
+    if reduction == 'max':
+        grid = np.zeros(size)
+        np.maximum.at(grid, target, values)
+    else:
+        grid = np.bincount(target, weights=values, minlength=size)
+        if reduction == 'mean':
+            counts = np.bincount(target, minlength=size)
+            grid = np.divide(grid, counts, out=np.zeros(size), where=counts > 0)
+    # grid_centers() runs over the rows within each column.
+    rows, cols = grid_dimensions
+    return grid.reshape(num_frames, cols, rows, num_channels).transpose(0, 2, 1, 3)
 
-    #{(123,123):{'pos':123,'spd':123,'dir':123}}
-    # {'frames' : [ [[(1,2),(3,4)], [(1,2),(3,4)]], [[(1,2),(3,4)], [(1,2),(3,4)]] ]
-    # {'frames' : [[],[],[(324,234),(324,234)]] }  (grid centers inside each group radius).
-
-    # Complexity values
-
-    grid_complexities = { 'frames':  [{(cell[0], cell[1]) : {'pos': [], 'spd': [], 'dir': []} for cell in grid_centers} for j in range(len(pos_groups[category]['pos']['frames']))] }
-
-    #----Pos----
-    for state_type in pos_groups[category].keys():
-        pg_centers, pg_radii = gd.group_centers_n_radii(pos_groups[category][state_type])
-        pg_within_radii = FrameSegmenter.points_within_radii(pg_centers, pg_radii, grid_centers)
-        # For each grid center, apply the complexity of each group that contains the grid center.
-        # Each frame(f) and pos_state.
-        for i, (f, pos_state) in enumerate(zip(pg_within_radii['frames'], pos_groups[category][state_type]['frames'])):
-            # Each group(cwr:center within radius).
-            for cwr, p_group in zip(f, pos_state):
-                p_c = _calc_attribute_group_complexity(p_group,POS_FACTORS['center'])
-                # Each grid center(c) located within the group radius.
-                for c in cwr:
-                    grid_complexities['frames'][i][c]['pos'].append(p_c)
-
-    #----Spd----
-    for state_type in spd_groups[category].keys():
-        sg_centers, sg_radii = gd.group_centers_n_radii(spd_groups[category][state_type])
-        sg_within_radii = FrameSegmenter.points_within_radii(sg_centers, sg_radii, grid_centers)
-        for i, (f, spd_state) in enumerate(zip(sg_within_radii['frames'], spd_groups[category][state_type]['frames'])):
-            # Each group(cwr:center within radius).
-            for cwr, s_group in zip(f, spd_state):
-                s_c = _calc_attribute_group_complexity(s_group,SPEED_FACTORS[s_group[0]['attributes']['Speed']])
-                # Each grid center(c) located within the group radius.
-                for c in cwr:
-                    grid_complexities['frames'][i][c]['spd'].append(s_c)
-
-    #----Dir----
-    for state_type in dir_groups[category].keys():
-        dg_centers, dg_radii = gd.group_centers_n_radii(dir_groups[category][state_type])
-        dg_within_radii = FrameSegmenter.points_within_radii(dg_centers, dg_radii, grid_centers)
-        for i, (f, dir_state) in enumerate(zip(dg_within_radii['frames'], dir_groups[category][state_type]['frames'])):
-            # Each group(cwr:center within radius).
-            for cwr, d_group in zip(f, dir_state):
-                d_c = _calc_attribute_group_complexity(d_group,DIR_FACTORS[d_group[0]['attributes']['Direction']])
-                # Each grid center(c) located within the group radius.
-                for c in cwr:
-                    grid_complexities['frames'][i][c]['dir'].append(d_c)
 
-    return grid_complexities
+def _calc_gridc_groupings(pos_groups: dict, spd_groups: dict, dir_groups: dict, grid_centers: list, category:str):
+    # {'frames': [{(x, y): {'pos': [...], 'spd': [...], 'dir': [...]}, ...}, ...]}, with the
+    # complexity of every group whose radius contains the grid center (x, y).
+    layers = _grid_layers(pos_groups=pos_groups, spd_groups=spd_groups, dir_groups=dir_groups, category=category,
+                          boxes=False, pos_factors=POS_FACTORS, speed_factors=SPEED_FACTORS, dir_factors=DIR_FACTORS)
+    return _gridc_dict(*layers, grid_centers=grid_centers)
 
 
 def _calc_gridc_boxes(pos_boxes: dict, spd_boxes: dict, dir_boxes: dict, grid_centers: list, category:str):
-
-    #{(123,123):{'pos':123,'spd':123,'dir':123}}
-    # {'frames' : [ [[(1,2),(3,4)], [(1,2),(3,4)]], [[(1,2),(3,4)], [(1,2),(3,4)]] ]
-    # {'frames' : [[],[],[(324,234),(324,234)]] }  (grid centers inside each group radius).
-
-    # Complexity values
-
-    grid_complexities = { 'frames':  [{(cell[0], cell[1]) : {'pos': [], 'spd': [], 'dir': []} for cell in grid_centers} for j in range(len(pos_boxes[category]['pos']['frames']))] }
-
-    #----Pos----
-    for state_type in pos_boxes[category].keys():
-        pg_centers, pg_radii = gd.centers_n_radii(pos_boxes[category][state_type])
-        pg_within_radii = FrameSegmenter.points_within_radii(pg_centers, pg_radii, grid_centers)
-        # For each grid center, apply the complexity of each group that contains the grid center.
-        # Each frame(f) and pos_state.
-        for i, (f, pos_state) in enumerate(zip(pg_within_radii['frames'], pos_boxes[category][state_type]['frames'])):
-            # Each group(cwr:center within radius).
-            for cwr, p_group in zip(f, pos_state):
-                p_c = _calc_attribute_group_complexity(p_group,POS_FACTORS['center'])
-                # Each grid center(c) located within the group radius.
-                for c in cwr:
-                    grid_complexities['frames'][i][c]['pos'].append(p_c)
-
-    #----Spd----
-    for state_type in spd_boxes[category].keys():
-        sg_centers, sg_radii = gd.centers_n_radii(spd_boxes[category][state_type])
-        sg_within_radii = FrameSegmenter.points_within_radii(sg_centers, sg_radii, grid_centers)
-        for i, (f, spd_state) in enumerate(zip(sg_within_radii['frames'], spd_boxes[category][state_type]['frames'])):
-            # Each group(cwr:center within radius).
-            for cwr, s_group in zip(f, spd_state):
-                s_c = _calc_attribute_group_complexity(s_group,SPEED_FACTORS[s_group['attributes']['Speed']])
-                # Each grid center(c) located within the group radius.
-                for c in cwr:
-                    grid_complexities['frames'][i][c]['spd'].append(s_c)
-    #----Dir----
-    for state_type in dir_boxes[category].keys():
-        dg_centers, dg_radii = gd.centers_n_radii(dir_boxes[category][state_type])
-        dg_within_radii = FrameSegmenter.points_within_radii(dg_centers, dg_radii, grid_centers)
-        for i, (f, dir_state) in enumerate(zip(dg_within_radii['frames'], dir_boxes[category][state_type]['frames'])):
-            # Each group(cwr:center within radius).
-            for cwr, d_group in zip(f, dir_state):
-                d_c = _calc_attribute_group_complexity(d_group,DIR_FACTORS[d_group['attributes']['Direction']])
-                # Each grid center(c) located within the group radius.
-                for c in cwr:
-                    grid_complexities['frames'][i][c]['dir'].append(d_c)
-
+    # Same as _calc_gridc_groupings() for box data. As before, the complexity of a box is
+    # computed from len(box), i.e. the number of fields of the label dict.
+    layers = _grid_layers(pos_groups=pos_boxes, spd_groups=spd_boxes, dir_groups=dir_boxes, category=category,
+                          boxes=True, pos_factors=POS_FACTORS, speed_factors=SPEED_FACTORS, dir_factors=DIR_FACTORS,
+                          legacy_box_weights=True)
+    return _gridc_dict(*layers, grid_centers=grid_centers)
+
+
+def _grid_layers(pos_groups: dict, spd_groups: dict, dir_groups: dict, category: str, boxes: bool,
+                 pos_factors: dict, speed_factors: dict, dir_factors: dict, legacy_box_weights: bool = False) -> tuple:
+    # Flattens the groups (or boxes) of all three channels into (centers, radii, weights,
+    # frame_index, channel, num_frames), in channel, state type and frame order.
+    geometry = gd.box_geometry if boxes else gd.group_geometry
+    num_frames = _num_frames(pos_groups[category]['pos'])
+    layers = []
+    for c, (channel_groups, attribute, factors) in enumerate(_channels(pos_groups, spd_groups, dir_groups,
+                                                                       pos_factors, speed_factors, dir_factors)):
+        for state_groups in channel_groups[category].values():
+            centers, radii, _ = state_groups.geometry() if isinstance(state_groups, GroupSet) else geometry(state_groups)
+            weights, frame_index = _state_weights(state_groups=state_groups, attribute=attribute, factors=factors,
+                                                  boxes=boxes, legacy_box_weights=legacy_box_weights)
+            layers.append((centers, radii, weights, frame_index, np.full(len(radii), c, dtype=np.int64)))
+    if not layers:
+        return np.zeros((0, 2)), np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), num_frames
+    return tuple(np.concatenate(arrays) for arrays in zip(*layers)) + (num_frames,)
+
+
+def _channels(pos_groups: dict, spd_groups: dict, dir_groups: dict,
+              pos_factors: dict, speed_factors: dict, dir_factors: dict) -> tuple:
+    # (groups, attribute, factor table) of every channel, in GRID_CHANNELS order.
+    return ((pos_groups, None, pos_factors), (spd_groups, 'Speed', speed_factors), (dir_groups, 'Direction', dir_factors))
+
+
+def _state_weights(state_groups: dict, attribute: str, factors: dict, boxes: bool, legacy_box_weights: bool = False) -> tuple:
+    # Returns the complexity (size * factor) and frame of every group of one state type.
+    if isinstance(state_groups, GroupSet):
+        return state_groups.weights(attribute=attribute, factors=factors)
+    frames = state_groups['frames']
+    groups = [group for frame in frames for group in frame]
+    frame_index = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+    if attribute is None:
+        factor = np.full(len(groups), factors['center'])
+    else:
+        table, codes = _factor_table(factors)
+        factor = table[np.array([codes[(group if boxes else group[0])['attributes'][attribute]] for group in groups],
+                                dtype=np.int64)]
+    if boxes and not legacy_box_weights:
+        sizes = np.ones(len(groups))
+    else:
+        sizes = np.array([len(group) for group in groups], dtype=float)
+    return sizes * factor, frame_index
+
+
+def _num_frames(state_groups) -> int:
+    return state_groups.num_frames if isinstance(state_groups, GroupSet) else len(state_groups['frames'])
+
+
+def _factor_table(factors: dict) -> tuple:
+    # Factor table as an array, plus the code (array index) of every state.
+    return np.array(list(factors.values()), dtype=float), {state: k for k, state in enumerate(factors)}
+
+
+def _gridc_dict(centers: np.ndarray, radii: np.ndarray, weights: np.ndarray, frame_index: np.ndarray,
+                channel: np.ndarray, num_frames: int, grid_centers: list) -> dict:
+    # Dictionary view of the flattened groups, with the values of every cell in group order.
+    cells = [(cell[0], cell[1]) for cell in grid_centers]
+    grid_complexities = {'frames': [{cell: {'pos': [], 'spd': [], 'dir': []} for cell in cells} for _ in range(num_frames)]}
+    indptr, indices = FrameSegmenter.points_within_radii_csr(centers, radii, grid_centers)
+    indptr, indices = indptr.tolist(), indices.tolist()
+    names = [GRID_CHANNELS[c] for c in channel.tolist()]
+    for g, (weight, i, name) in enumerate(zip(weights.tolist(), frame_index.tolist(), names)):
+        frame = grid_complexities['frames'][i]
+        for k in indices[indptr[g]:indptr[g + 1]]:
+            frame[cells[k]][name].append(weight)
     return grid_complexities
 
 
@@ -255,4 +302,106 @@ def calc_framesc(pos_boxes,spd_boxes,dir_boxes):
         frames_sc['frames'].append(v_s_c + p_s_c)
         frames_dc['frames'].append(v_d_c + p_d_c)
 
-    return frames_pc, frames_sc, frames_dc
\ No newline at end of file
+    return frames_pc, frames_sc, frames_dc
+
+
+def calc_framesc_arrays(pos_groups: dict, spd_groups: dict, dir_groups: dict, categories: tuple = ('vehicle', 'pedestrian'),
+                        boxes: bool = False, pos_factors: dict = POS_FACTORS, speed_factors: dict = SPEED_FACTORS,
+                        dir_factors: dict = DIR_FACTORS) -> np.ndarray:
+    '''
+    Frame complexity of the whole sequence as a (frames, 3) array with the 'pos', 'spd'
+    and 'dir' totals (GRID_CHANNELS order) of every frame, summed over 'categories'.
+    The group dictionaries have the same format as for calc_framesc_groupings(); set
+    'boxes' to True for box data, where every box counts as a group of one.
+
+    Notes
+    -----
+    Every group adds len(group) * factor to its channel: POS_FACTORS['center'] for
+    position groups, and the factor of the group's state for speed and direction groups.
+    This differs from calc_framesc_groupings(), which adds the vehicle direction groups to
+    the speed total, uses the pedestrian direction groups as speed groups and counts the
+    fields of each label dict for the position total.\n
+    The groups can also be GroupingsModel.GroupSet objects, as for calc_gridc().
+    '''
+    weights, frame_index, channel = [], [], []
+    num_frames = _num_frames(pos_groups[categories[0]]['pos']) if categories else 0
+    for category in categories:
+        for c, (channel_groups, attribute, factors) in enumerate(_channels(pos_groups, spd_groups, dir_groups,
+                                                                           pos_factors, speed_factors, dir_factors)):
+            for state_groups in channel_groups[category].values():
+                state_weights, state_frames = _state_weights(state_groups=state_groups, attribute=attribute,
+                                                             factors=factors, boxes=boxes)
+                weights.append(state_weights)
+                frame_index.append(state_frames)
+                channel.append(np.full(len(state_weights), c, dtype=np.int64))
+    if not weights:
+        return np.zeros((num_frames, len(GRID_CHANNELS)))
+    return sum_framesc(weights=np.concatenate(weights), frame_index=np.concatenate(frame_index),
+                       channel=np.concatenate(channel), num_frames=num_frames)
+
+
+def calc_store_framesc(store, groupings: dict, pos_factors: dict = POS_FACTORS, speed_factors: dict = SPEED_FACTORS,
+                       dir_factors: dict = DIR_FACTORS) -> np.ndarray:
+    '''
+    Same as calc_framesc_arrays(), computed from the arrays of a Utils.LabelStore.
+    'groupings' maps each category to its group_store_by_position() result. The speed and
+    direction groups are the members of a position group that share a state (at least two),
+    as with GroupingsDefiner.regroup_by_attribute_state().
+    '''
+    weights, frame_index, channel = [], [], []
+    for grouped in groupings.values():
+        frames = grouped['frames']
+        groups = [group for frame in frames for group in frame]
+        if not groups:
+            continue
+        sizes = np.array([len(group) for group in groups], dtype=np.int64)
+        group_frame = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+        layers = _store_group_layers(store=store, rows=np.concatenate(groups).astype(np.int64), sizes=sizes,
+                                     group_frame=group_frame, pos_factors=pos_factors, speed_factors=speed_factors,
+                                     dir_factors=dir_factors)
+        for layer in layers:
+            weights.append(layer[0])
+            frame_index.append(layer[1])
+            channel.append(layer[2])
+    if not weights:
+        return np.zeros((store.num_frames, len(GRID_CHANNELS)))
+    return sum_framesc(weights=np.concatenate(weights), frame_index=np.concatenate(frame_index),
+                       channel=np.concatenate(channel), num_frames=store.num_frames)
+
+
+def _store_group_layers(store, rows: np.ndarray, sizes: np.ndarray, group_frame: np.ndarray,
+                        pos_factors: dict, speed_factors: dict, dir_factors: dict) -> list:
+    # (weights, frame_index, channel) of the position groups and of their speed and direction
+    # sub-groups. The groups are given as consecutive runs of store rows with the given sizes.
+    layers = [(sizes * pos_factors['center'], group_frame, np.zeros(len(sizes), dtype=np.int64))]
+    member_group = np.repeat(np.arange(len(sizes)), sizes)
+    for c, (attribute, factors) in enumerate((('Speed', speed_factors), ('Direction', dir_factors)), start=1):
+        if attribute not in store.attributes:
+            continue
+        states = store.attribute_states[attribute]
+        # Factor of every state code (0 for states without a factor, falsy states excluded below).
+        table = np.array([factors.get(state, 0.0) if state else np.nan for state in states] + [np.nan], dtype=float)
+        codes = store.attributes[attribute][rows].astype(np.int64)
+        keep = codes >= 0
+        keep[keep] = ~np.isnan(table[codes[keep]])
+        # Sub-groups are the (group, state) pairs with at least two members.
+        pairs, counts = np.unique(member_group[keep] * (len(states) + 1) + codes[keep], return_counts=True)
+        pairs, counts = pairs[counts > 1], counts[counts > 1]
+        sub_group, sub_state = pairs // (len(states) + 1), pairs % (len(states) + 1)
+        layers.append((counts * table[sub_state], group_frame[sub_group], np.full(len(pairs), c, dtype=np.int64)))
+    return layers
+
+
+def sum_framesc(weights: np.ndarray, frame_index: np.ndarray, channel: np.ndarray, num_frames: int) -> np.ndarray:
+    '''
+    Segment sum of group complexities: returns a (frames, 3) array where element [f, c]
+    is the sum of the weights of the groups with frame_index == f and channel == c.
+    '''
+    target = np.asarray(frame_index, dtype=np.int64) * len(GRID_CHANNELS) + np.asarray(channel, dtype=np.int64)
+    totals = np.bincount(target, weights=np.asarray(weights, dtype=float), minlength=num_frames * len(GRID_CHANNELS))
+    return totals.reshape(num_frames, len(GRID_CHANNELS))
+
+
+def _verify_reduction(reduction: str):
+    if reduction not in _GRID_REDUCTIONS:
+        raise ValueError(f"'reduction': {reduction} is not allowed. Allowed values are 'sum', 'max' or 'mean'.")
@@ -1,40 +1,191 @@
 from ..Utils import LabelParser
+import itertools
+import collections
+import concurrent.futures
 import numpy as np
-# from sklearn.cluster import DBSCAN
 
 
-def group_category_by_position(parsed_data, category: str, threshold: float = 0.70, max_distance: float = 100.0) -> dict:
-    frames = parsed_data['frames']
-    frames = LabelParser.select_parsed_data_by_category(parsed_data=frames, category=category)
-    frames = [_calculate_boundingbox_areas(frame_data=frames[i]) for i, _ in enumerate(frames)]
-    frames = [_calculate_centers(frame_data=frames[i]) for i, _ in enumerate(frames)]
-    groupings = []
-    for frame in frames:
-        frame_groupings = []
-        for i, box in enumerate(frame['labels']):
-            for j in range(len(frame['labels'])):
-                if i >= j:
-                    continue
-                if _group_analyzer(box['box2d'],frame['labels'][j]['box2d'], threshold, max_distance):
-                    frame_groupings.append((box,frame['labels'][j]))
-        groupings.append(frame_groupings)
+# CONSTANTS.
+_PAIR_CHUNK_SIZE = 1 << 21     # Max. number of candidate pairs tested at once.
+_PRUNE_SLACK = 1.0 + 1e-9      # Widens the pruning bounds so rounding never drops a valid pair.
+_FRAMES_PER_TASK = 64          # Frames sent to a worker process at once.
+_DENSITY_METHODS = {'dbscan', 'hdbscan'}
+
+
+class DensityClustering():
+    def __init__(self, method: str = 'dbscan', eps: float = 50.0, min_samples: int = 2, area_weight: float = 0.0):
+        '''
+        Density-based clustering backend for group_category_by_position() (pass it as
+        'pairing'). Boxes are clustered on their centers with scikit-learn's tree-based
+        DBSCAN ('dbscan') or HDBSCAN ('hdbscan'), in O(n log n) for typical scenes.
+
+        Notes
+        -----
+        'eps' is the DBSCAN neighbourhood radius in pixels (not used by HDBSCAN), and
+        'min_samples' is the smallest group size ('min_cluster_size' for HDBSCAN). With
+        'area_weight' > 0, area_weight * sqrt(box area) is added as a third feature, so
+        boxes of very different sizes are less likely to be grouped. Boxes labelled as
+        noise are not grouped. Groups are ordered by their lowest box index.\n
+        scikit-learn is only imported when the backend is used (HDBSCAN needs >= 1.3).
+        '''
+        if method not in _DENSITY_METHODS:
+            raise ValueError(f"'method': {method} is not allowed. Allowed values are 'dbscan' or 'hdbscan'.")
+        self.method: str = method
+        self.eps: float = eps
+        self.min_samples: int = min_samples
+        self.area_weight: float = area_weight
+
+    def __call__(self, areas: np.ndarray, centers: np.ndarray) -> list:
+        if len(areas) < max(self.min_samples, 2):
+            return []
+        features = np.asarray(centers, dtype=float).reshape(-1, 2)
+        if self.area_weight:
+            features = np.column_stack((features, self.area_weight * np.sqrt(np.abs(areas))))
+        if self.method == 'dbscan':
+            from sklearn.cluster import DBSCAN
+            labels = DBSCAN(eps=self.eps, min_samples=self.min_samples).fit_predict(features)
+        else:
+            from sklearn.cluster import HDBSCAN
+            # 'features' can be the caller's 'centers' array, which HDBSCAN must not modify.
+            labels = HDBSCAN(min_cluster_size=max(self.min_samples, 2), copy=True).fit_predict(features)
+        members = np.flatnonzero(labels >= 0)
+        # Members sorted by cluster, clusters ordered by their first member.
+        order = members[np.argsort(labels[members], kind='stable')]
+        groups = np.split(order, np.flatnonzero(np.diff(labels[order])) + 1) if len(order) else []
+        return sorted((group for group in groups if len(group) > 1), key=lambda group: group[0])
+
+
+def group_category_by_position(parsed_data, category: str, threshold: float = 0.70, max_distance: float = 100.0,
+                               legacy_merge: bool = False, pairing: str = 'pruned', workers: int = 1) -> dict:
+    '''
+    Groups the objects of a category in every frame by size and position. Returns
+    {'frames': [[group, ...], ...]}, where each group is a list of label dicts.
+
+    Notes
+    -----
+    'parsed_data' is either a {'frames': [...]} dictionary or an iterable of frames, such
+    as LabelParser.iter_scalabel_frames(). Frames are processed one at a time.\n
+    Groups are the connected components of all grouped pairs. Set 'legacy_merge' to True
+    to merge the pairs the way earlier versions did, where a pair linking two existing
+    groups was added to the first group only.\n
+    'pairing' selects how the grouped pairs are found: 'pruned' (default) only tests the
+    candidate pairs of a sorted sweep index, 'dense' tests all pairs with the chunked
+    broadcasting kernel of adjacency_matrix(). Both give the same groups. 'pairing' can
+    also be a clustering backend, i.e. a callable (areas, centers) -> [index arrays],
+    such as DensityClustering(); 'threshold', 'max_distance' and 'legacy_merge' are then
+    not used.\n
+    With 'workers' > 1 the grouping (testing the pairs and merging them into groups) runs
+    in a pool of worker processes. Frames are sent in chunks as packed box arrays and the
+    results are returned in frame order. Selecting the category, measuring the boxes and
+    turning the index groups back into label dicts stay in the calling process, so they
+    bound the speed-up on frames with few boxes; group_store_by_position() skips them.
+    '''
+    if workers > 1:
+        return {'frames': list(_group_frames_parallel(frames=_iter_frames(parsed_data), category=category,
+                                                      threshold=threshold, max_distance=max_distance,
+                                                      legacy_merge=legacy_merge, pairing=pairing, workers=workers))}
+    return {'frames': [_group_frame_by_position(frame_data=frame_data, category=category, threshold=threshold,
+                                                max_distance=max_distance, legacy_merge=legacy_merge, pairing=pairing)
+                       for frame_data in _iter_frames(parsed_data)]}
 
-    return { 'frames': [_finalize_groups_frame(groupings_frame=groupings[i]) for i in range(len(groupings))]}
 
 def boxes_category_by_position(parsed_data, category: str):
-    frames = parsed_data['frames']
-    frames = LabelParser.select_parsed_data_by_category(parsed_data=frames, category=category)
-    frames = [_calculate_boundingbox_areas(frame_data=frames[i]) for i, _ in enumerate(frames)]
-    frames = [_calculate_centers(frame_data=frames[i]) for i, _ in enumerate(frames)]
     boxings = []
-    for frame in frames:
+    for frame_data in _iter_frames(parsed_data):
+        frame = _prepare_frame(frame_data=frame_data, category=category)
         frame_boxings = [box for box in frame['labels']]
         boxings.append(frame_boxings)
 
     return {'frames': boxings}
 
 
-def rebox_by_attribute_state(boxed_data: dict, attribute: str, state: str) -> dict:
+def group_store_by_position(store, category: str, threshold: float = 0.70, max_distance: float = 100.0,
+                            legacy_merge: bool = False, pairing: str = 'pruned', workers: int = 1) -> dict:
+    '''
+    Same grouping as group_category_by_position(), but run directly on the box arrays
+    of a LabelStore. Returns {'frames': [[group, ...], ...]}, where each group is an
+    np.ndarray with the store row indices of its members.
+
+    Notes
+    -----
+    Use store_groups_to_labels() to get the groups as label dicts. See
+    group_category_by_position() for 'workers'.
+    '''
+    mask = store.category == store.categories.index(category) if category in store.categories \
+        else np.zeros(len(store), dtype=bool)
+    rows = np.flatnonzero(mask)
+    return {'frames': _group_store_rows(store, rows=rows, row_offsets=np.searchsorted(rows, store.frame_offsets),
+                                        threshold=threshold, max_distance=max_distance, legacy_merge=legacy_merge,
+                                        pairing=pairing, workers=workers)}
+
+
+def store_groups_to_labels(store, grouped_data: dict) -> dict:
+    '''
+    Converts the row-index groups of group_store_by_position() into the label dict groups
+    returned by group_category_by_position().
+    '''
+    return {'frames': [[_store_labels(store, group) for group in frame] for frame in grouped_data['frames']]}
+
+
+def adjacency_matrix(areas, centers, threshold: float = 0.70, max_distance: float = 100.0) -> np.ndarray:
+    '''
+    Returns the boolean (n, n) adjacency matrix of a frame's boxes, given their areas (n,)
+    and centers (n, 2). Element [i, j] (i < j) is True if boxes i and j pass the grouping
+    tests of group_category_by_position(); the lower triangle is False.
+
+    Notes
+    -----
+    Built with the chunked broadcasting kernel of adjacency_pairs(). For large frames,
+    prefer adjacency_pairs(), which never holds the full matrix.
+    '''
+    areas = np.asarray(areas, dtype=float)
+    adjacency = np.zeros((len(areas), len(areas)), dtype=bool)
+    first, second = adjacency_pairs(areas=areas, centers=centers, threshold=threshold, max_distance=max_distance)
+    adjacency[first, second] = True
+    return adjacency
+
+
+def adjacency_pairs(areas, centers, threshold: float = 0.70, max_distance: float = 100.0,
+                    chunk_size: int = None) -> tuple:
+    '''
+    Returns the (first, second) index arrays of all adjacent box pairs (first < second) of
+    a frame, in row-major order. Every pair is tested with broadcasting, 'chunk_size'
+    matrix elements at a time, so memory stays bounded for large frames.
+    '''
+    areas = np.asarray(areas, dtype=float)
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    n = len(areas)
+    rows_per_chunk = max(1, (chunk_size or _PAIR_CHUNK_SIZE) // max(n, 1))
+    first, second = [], []
+    columns = np.arange(n)
+    for start in range(0, n, rows_per_chunk):
+        rows = np.arange(start, min(start + rows_per_chunk, n))
+        area_a, area_b = areas[rows, None], areas[None, :]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            block = np.minimum(area_a, area_b) / np.maximum(area_a, area_b) >= threshold
+        dx = centers[rows, 0, None] - centers[None, :, 0]
+        dy = centers[rows, 1, None] - centers[None, :, 1]
+        block &= np.sqrt(dx**2 + dy**2) <= max_distance*area_a
+        block &= columns[None, :] > rows[:, None]
+        block_rows, block_columns = np.nonzero(block)
+        first.append(rows[block_rows])
+        second.append(block_columns)
+    if not first:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(first), np.concatenate(second)
+
+
+def rebox_by_attribute_state(boxed_data: dict, attribute: str, state: str, index=None) -> dict:
+    '''
+    Returns the boxes of every frame whose 'attribute' equals 'state'.
+
+    Notes
+    -----
+    If a Utils.LabelIndex built from 'boxed_data' is passed as 'index', the selection
+    is a lookup instead of a scan over every box.
+    '''
+    if index is not None:
+        return index.rebox_by_attribute_state(attribute=attribute, state=state)
     frames = boxed_data['frames']
     boxings = {'frames': []}
     for frame in frames:
@@ -43,7 +194,18 @@ def rebox_by_attribute_state(boxed_data: dict, attribute: str, state: str) -> di
     return boxings
 
 
-def regroup_by_attribute_state(grouped_data: dict, attribute: str, state: str) -> dict:
+def regroup_by_attribute_state(grouped_data: dict, attribute: str, state: str, index=None) -> dict:
+    '''
+    Splits every group into the members whose 'attribute' equals 'state', keeping the
+    sub-groups with more than one member.
+
+    Notes
+    -----
+    If a Utils.LabelIndex built from 'grouped_data' (with grouped=True) is passed as
+    'index', the selection is a lookup instead of a scan over every group.
+    '''
+    if index is not None:
+        return index.regroup_by_attribute_state(attribute=attribute, state=state)
     frames = grouped_data['frames']
     groupings = {'frames': []}
     for frame in frames:
@@ -53,46 +215,340 @@ def regroup_by_attribute_state(grouped_data: dict, attribute: str, state: str) -
     return groupings
 
 
+def rebox_by_attribute_states(boxed_data: dict, attribute: str, states=None) -> dict:
+    '''
+    Splits the boxes of every frame by the state of 'attribute' in a single pass. Returns
+    {state: {'frames': [...]}}, where each value equals rebox_by_attribute_state() for
+    that state.
+
+    Notes
+    -----
+    'states' selects (and orders) the states to return; states that never occur get
+    empty frames. Leaving it out returns every (truthy) state found, in order of first
+    appearance.
+    '''
+    partitions = _init_partitions(states)
+    for f, frame in enumerate(boxed_data['frames']):
+        frame_boxings = dict()
+        for obj in frame:
+            state = obj['attributes'].get(attribute)
+            if state:
+                frame_boxings.setdefault(state, []).append(obj)
+        _append_partitions(partitions, frame_boxings, f, fixed=states is not None)
+    return partitions
+
+
+def regroup_by_attribute_states(grouped_data: dict, attribute: str, states=None) -> dict:
+    '''
+    Splits every group by the state of 'attribute' in a single pass. Returns
+    {state: {'frames': [...]}}, where each value equals regroup_by_attribute_state()
+    for that state.
+
+    Notes
+    -----
+    'states' selects (and orders) the states to return; states that never occur get
+    empty frames. Leaving it out returns every state that forms at least one
+    sub-group, in order of first appearance.
+    '''
+    partitions = _init_partitions(states)
+    for f, frame in enumerate(grouped_data['frames']):
+        frame_groupings = dict()
+        for group in frame:
+            sub_groups = dict()
+            for obj in group:
+                state = obj['attributes'].get(attribute)
+                if state:
+                    sub_groups.setdefault(state, []).append(obj)
+            for state, sub_group in sub_groups.items():
+                if len(sub_group) > 1:
+                    frame_groupings.setdefault(state, []).append(sub_group)
+        _append_partitions(partitions, frame_groupings, f, fixed=states is not None)
+    return partitions
+
+
 def group_centers_n_radii(grouped_data: dict) -> tuple:
-    frames = grouped_data['frames']
     # Same format as everywhere else.
-    groupings_centers = {'frames': []}
-    groupings_radii = {'frames': []}
-    for frame in frames:
-        frame_grouping_centers = [_center_of_mass_group(group=group) for group in frame]
-        frame_grouping_radii = [_radius_group(group=group, center_of_mass=mass) for group, mass in zip(frame, frame_grouping_centers)]
-        groupings_centers['frames'].append([group for group in frame_grouping_centers])
-        groupings_radii['frames'].append([group for group in frame_grouping_radii])
-    return groupings_centers, groupings_radii
+    centers, radii, frame_offsets = group_geometry(grouped_data=grouped_data)
+    return _split_geometry(centers=centers, radii=radii, frame_offsets=frame_offsets)
 
 
 def centers_n_radii(data: dict) -> tuple:
-    frames = data['frames']
     # Same format as everywhere else.
-    boxes_centers = {'frames': []}
-    boxes_radii = {'frames': []}
-    for frame in frames:
-        frame_boxes_centers = [box['box2d']['center'] for box in frame]
-        frame_boxes_radii = [_radius_box(box=box) for box in frame]
-        boxes_centers['frames'].append([box for box in frame_boxes_centers])
-        boxes_radii['frames'].append([box for box in frame_boxes_radii])
-    return boxes_centers, boxes_radii
+    centers, radii, frame_offsets = box_geometry(boxed_data=data)
+    return _split_geometry(centers=centers, radii=radii, frame_offsets=frame_offsets)
+
+
+def group_geometry(grouped_data: dict) -> tuple:
+    '''
+    Computes the center of mass and radius of every group in 'grouped_data' at once.
+    Returns (centers (G, 2), radii (G,), frame_offsets (frames + 1,)), where the groups of
+    frame i are found at frame_offsets[i]:frame_offsets[i + 1]. This is the layout used by
+    FrameSegmenter.flatten_frames() and FrameSegmenter.points_within_radii_csr().
+
+    Notes
+    -----
+    The center of mass is the mean of the box centers, and the radius is twice the
+    distance from it to the furthest box corner, as in group_centers_n_radii(). Groups
+    must not be empty.
+    '''
+    frames = grouped_data['frames']
+    boxes = np.array([(obj['box2d']['x1'], obj['box2d']['y1'], obj['box2d']['x2'], obj['box2d']['y2'])
+                      for frame in frames for group in frame for obj in group], dtype=float).reshape(-1, 4)
+    group_sizes = np.array([len(group) for frame in frames for group in frame], dtype=np.int64)
+    centers, radii = _group_geometry_arrays(boxes=boxes, group_sizes=group_sizes)
+    return centers, radii, _offsets([len(frame) for frame in frames])
+
+
+def store_group_geometry(store, grouped_data: dict) -> tuple:
+    '''
+    Same as group_geometry() for the groups of group_store_by_position(), read directly
+    from the arrays of the Utils.LabelStore.
+    '''
+    frames = grouped_data['frames']
+    groups = [group for frame in frames for group in frame]
+    rows = np.concatenate(groups).astype(np.int64) if groups else np.zeros(0, dtype=np.int64)
+    boxes = np.stack((store.x1[rows], store.y1[rows], store.x2[rows], store.y2[rows]), axis=1)
+    group_sizes = np.array([len(group) for group in groups], dtype=np.int64)
+    centers, radii = _group_geometry_arrays(boxes=boxes, group_sizes=group_sizes)
+    return centers, radii, _offsets([len(frame) for frame in frames])
+
+
+def box_geometry(boxed_data: dict) -> tuple:
+    '''
+    Computes the center and radius of every box in 'boxed_data' at once, in the same
+    layout as group_geometry(). The radius is based on the box area, as in centers_n_radii().
+    '''
+    frames = boxed_data['frames']
+    boxes = np.array([(obj['box2d']['x1'], obj['box2d']['y1'], obj['box2d']['x2'], obj['box2d']['y2'])
+                      for frame in frames for obj in frame], dtype=float).reshape(-1, 4)
+    vehicle = np.array([obj['category'] == 'vehicle' for frame in frames for obj in frame], dtype=bool)
+    w, h = boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]
+    centers = np.stack((boxes[:, 0] + 0.5 * w, boxes[:, 1] + 0.5 * h), axis=1)
+    radii = np.where(vehicle, 2, 4) * np.sqrt(w*h / np.pi)
+    return centers, radii, _offsets([len(frame) for frame in frames])
+
+
+def _iter_frames(parsed_data):
+    return parsed_data['frames'] if isinstance(parsed_data, dict) else parsed_data
+
+
+def _offsets(sizes) -> np.ndarray:
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    return offsets
+
 
+def _group_geometry_arrays(boxes: np.ndarray, group_sizes: np.ndarray) -> tuple:
+    # Segment reductions over the boxes of consecutive groups: mean of the box centers, and
+    # the largest squared corner distance (the furthest corner combines the furthest x and y).
+    if len(group_sizes) == 0:
+        return np.zeros((0, 2)), np.zeros(0)
+    starts = _offsets(group_sizes)[:-1]
+    w, h = boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]
+    box_centers = np.stack((boxes[:, 0] + 0.5 * w, boxes[:, 1] + 0.5 * h), axis=1)
+    centers = np.add.reduceat(box_centers, starts, axis=0) / group_sizes[:, None]
+    member_centers = np.repeat(centers, group_sizes, axis=0)
+    dx = np.maximum(np.abs(member_centers[:, 0] - boxes[:, 0]), np.abs(member_centers[:, 0] - boxes[:, 2]))
+    dy = np.maximum(np.abs(member_centers[:, 1] - boxes[:, 1]), np.abs(member_centers[:, 1] - boxes[:, 3]))
+    return centers, 2 * np.sqrt(np.maximum.reduceat(dx**2 + dy**2, starts))
 
-def _finalize_groups_frame(groupings_frame: list) -> list:
+
+def _split_geometry(centers: np.ndarray, radii: np.ndarray, frame_offsets: np.ndarray) -> tuple:
+    # Back to the per-frame {'frames': [...]} lists of group_centers_n_radii() / centers_n_radii().
+    centers, radii = [tuple(c) for c in centers.tolist()], radii.tolist()
+    bounds = list(zip(frame_offsets[:-1].tolist(), frame_offsets[1:].tolist()))
+    return {'frames': [centers[a:b] for a, b in bounds]}, {'frames': [radii[a:b] for a, b in bounds]}
+
+
+def _init_partitions(states) -> dict:
+    return {state: {'frames': []} for state in states} if states is not None else dict()
+
+
+def _append_partitions(partitions: dict, frame_parts: dict, frame: int, fixed: bool):
+    # Appends one frame to every partition; states first seen in this frame get empty earlier frames.
+    if not fixed:
+        for state in frame_parts:
+            if state not in partitions:
+                partitions[state] = {'frames': [[] for _ in range(frame)]}
+    for state, partition in partitions.items():
+        partition['frames'].append(frame_parts.get(state, []))
+
+
+def _prepare_frame(frame_data: dict, category: str) -> dict:
+    frame = LabelParser.select_frame_by_category(frame_data=frame_data, category=category)
+    frame = _calculate_boundingbox_areas(frame_data=frame)
+    return _calculate_centers(frame_data=frame)
+
+
+def _group_frame_by_position(frame_data: dict, category: str, threshold: float, max_distance: float,
+                             legacy_merge: bool = False, pairing: str = 'pruned') -> list:
+    frame = _prepare_frame(frame_data=frame_data, category=category)
+    labels = frame['labels']
+    areas = np.array([obj['box2d']['area'] for obj in labels], dtype=float)
+    centers = np.array([obj['box2d']['center'] for obj in labels], dtype=float).reshape(-1, 2)
+    groups = _group_indices(areas=areas, centers=centers, threshold=threshold, max_distance=max_distance,
+                            legacy_merge=legacy_merge, pairing=pairing)
+    return [[labels[k] for k in group] for group in groups]
+
+
+def _group_store_rows(store, rows: np.ndarray, row_offsets: np.ndarray, threshold: float, max_distance: float,
+                      legacy_merge: bool = False, pairing: str = 'pruned', workers: int = 1) -> list:
+    # Groups the store rows rows[row_offsets[f]:row_offsets[f + 1]] of every frame f. Returns
+    # the groups of every frame as arrays of store rows.
+    areas, centers = store.area[rows], store.center[rows]
+    if workers > 1:
+        chunks = (([rows[row_offsets[f]:row_offsets[f + 1]] for f in range(start, end)],
+                   areas[row_offsets[start]:row_offsets[end]], centers[row_offsets[start]:row_offsets[end]],
+                   row_offsets[start:end + 1] - row_offsets[start])
+                  for start, end in _chunk_bounds(len(row_offsets) - 1, _FRAMES_PER_TASK))
+        return [[frame_rows[group] for group in frame_groups]
+                for chunk_rows, chunk_groups in _iter_group_chunks(chunks=chunks, threshold=threshold,
+                                                                   max_distance=max_distance, legacy_merge=legacy_merge,
+                                                                   pairing=pairing, workers=workers)
+                for frame_rows, frame_groups in zip(chunk_rows, chunk_groups)]
+    groupings = []
+    for start, end in zip(row_offsets[:-1].tolist(), row_offsets[1:].tolist()):
+        frame_groups = _group_indices(areas=areas[start:end], centers=centers[start:end], threshold=threshold,
+                                      max_distance=max_distance, legacy_merge=legacy_merge, pairing=pairing)
+        groupings.append([rows[start:end][group] for group in frame_groups])
+    return groupings
+
+
+def _group_frames_parallel(frames, category: str, threshold: float, max_distance: float, legacy_merge: bool,
+                           pairing: str, workers: int):
+    # Labels are selected and measured here; only their areas and centers go to the workers.
+    def chunks():
+        frames_iter = iter(frames)
+        while True:
+            labels = [_prepare_frame(frame_data=frame_data, category=category)['labels']
+                      for frame_data in itertools.islice(frames_iter, _FRAMES_PER_TASK)]
+            if not labels:
+                return
+            areas = np.array([obj['box2d']['area'] for frame in labels for obj in frame], dtype=float)
+            centers = np.array([obj['box2d']['center'] for frame in labels for obj in frame], dtype=float).reshape(-1, 2)
+            offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+            np.cumsum([len(frame) for frame in labels], out=offsets[1:])
+            yield labels, areas, centers, offsets
+    for labels, chunk_groups in _iter_group_chunks(chunks=chunks(), threshold=threshold, max_distance=max_distance,
+                                                   legacy_merge=legacy_merge, pairing=pairing, workers=workers):
+        for frame_labels, frame_groups in zip(labels, chunk_groups):
+            yield [[frame_labels[k] for k in group] for group in frame_groups]
+
+
+def _iter_group_chunks(chunks, threshold: float, max_distance: float, legacy_merge: bool, pairing: str, workers: int):
+    # Runs _group_chunk() on a process pool for chunks of (payload, areas, centers, frame_offsets)
+    # and yields (payload, [frame groups of box indices]) in chunk order. At most two chunks
+    # per worker are in flight, so iterables of frames are consumed gradually.
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        for payload, areas, centers, offsets in chunks:
+            pending.append((payload, executor.submit(_group_chunk, areas, centers, offsets, threshold,
+                                                     max_distance, legacy_merge, pairing)))
+            if len(pending) >= 2 * workers:
+                yield _unpack_chunk(*pending.popleft())
+        while pending:
+            yield _unpack_chunk(*pending.popleft())
+
+
+def _group_chunk(areas: np.ndarray, centers: np.ndarray, frame_offsets: np.ndarray, threshold: float,
+                 max_distance: float, legacy_merge: bool, pairing: str) -> tuple:
+    # Worker side: groups every frame of a chunk and packs the groups into flat arrays
+    # (members with frame-local indices, group sizes, groups per frame).
+    members, group_sizes, frame_groups = [], [], []
+    for start, end in zip(frame_offsets[:-1].tolist(), frame_offsets[1:].tolist()):
+        groups = _group_indices(areas=areas[start:end], centers=centers[start:end], threshold=threshold,
+                                max_distance=max_distance, legacy_merge=legacy_merge, pairing=pairing)
+        members.extend(groups)
+        group_sizes.extend(len(group) for group in groups)
+        frame_groups.append(len(groups))
+    members = np.concatenate(members).astype(np.int64) if members else np.zeros(0, dtype=np.int64)
+    return members, np.array(group_sizes, dtype=np.int64), np.array(frame_groups, dtype=np.int64)
+
+
+def _unpack_chunk(payload, future) -> tuple:
+    # Turns the packed groups of _group_chunk() back into per-frame lists of index arrays.
+    members, group_sizes, frame_groups = future.result()
+    groups = np.split(members, np.cumsum(group_sizes)[:-1]) if len(group_sizes) else []
+    bounds = np.concatenate(([0], np.cumsum(frame_groups))).tolist()
+    return payload, [groups[bounds[f]:bounds[f + 1]] for f in range(len(frame_groups))]
+
+
+def _chunk_bounds(size: int, chunk_size: int) -> list:
+    return [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+
+def _group_indices(areas: np.ndarray, centers: np.ndarray, threshold: float, max_distance: float,
+                   legacy_merge: bool = False, pairing: str = 'pruned') -> list:
+    # Returns the groups of a frame as arrays of box indices.
+    if callable(pairing):
+        return pairing(areas, centers)
+    if pairing == 'pruned':
+        first, second = _group_pairs_arrays(areas=areas, centers=centers, threshold=threshold, max_distance=max_distance)
+    elif pairing == 'dense':
+        first, second = adjacency_pairs(areas=areas, centers=centers, threshold=threshold, max_distance=max_distance)
+    else:
+        raise ValueError(f"'pairing': {pairing} is not allowed. Allowed values are 'pruned' or 'dense'.")
+    if legacy_merge:
+        groups = _finalize_groups_frame_legacy(groupings_frame=list(zip(first.tolist(), second.tolist())), key=None)
+        return [np.array(group, dtype=np.int64) for group in groups]
+    return _components_to_groups(first=first, second=second, size=len(areas))
+
+
+def _components_to_groups(first: np.ndarray, second: np.ndarray, size: int) -> list:
+    # Merges the grouped pairs of a frame into groups: the connected components of the pairs, with
+    # members and groups ordered by their first appearance in the (first, second) pair list.
+    if len(first) == 0:
+        return []
+    labels = _connected_components(first=first, second=second, size=size)
+    # Position of each box in the flattened pair list [first[0], second[0], first[1], ...].
+    appearance = np.full(size, 2 * len(first), dtype=np.int64)
+    positions = np.arange(len(first), dtype=np.int64)
+    np.minimum.at(appearance, second, 2 * positions + 1)
+    np.minimum.at(appearance, first, 2 * positions)
+    members = np.flatnonzero(appearance < 2 * len(first))
+    members = members[np.argsort(appearance[members], kind='stable')]
+    member_labels = labels[members]
+    _, first_seen, group_of = np.unique(member_labels, return_index=True, return_inverse=True)
+    group_rank = np.argsort(np.argsort(first_seen, kind='stable'), kind='stable')[group_of.reshape(-1)]
+    order = np.argsort(group_rank, kind='stable')
+    splits = np.flatnonzero(np.diff(group_rank[order])) + 1
+    return np.split(members[order], splits)
+
+
+def _connected_components(first: np.ndarray, second: np.ndarray, size: int) -> np.ndarray:
+    # Vectorized connected components: every element points to a smaller (or the same)
+    # element, roots are hooked onto the smallest neighbouring root and pointers are
+    # shortcut until no pair links two different roots. Returns the root of every element.
+    labels = np.arange(size)
+    while True:
+        root_a, root_b = labels[first], labels[second]
+        linked = root_a != root_b
+        if not linked.any():
+            return labels
+        low = np.minimum(root_a[linked], root_b[linked])
+        np.minimum.at(labels, root_a[linked], low)
+        np.minimum.at(labels, root_b[linked], low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+
+def _finalize_groups_frame_legacy(groupings_frame: list, key=lambda obj: obj['id']) -> list:
     finalized_groups = []
     for pair in groupings_frame:
         group_found = False
         for i, group in enumerate(finalized_groups):
-            if _in_group(pair[0], group) and not _in_group(pair[1], group):
+            if _in_group(pair[0], group, key) and not _in_group(pair[1], group, key):
                 finalized_groups[i].append(pair[1])
                 group_found = True
                 break
-            elif not _in_group(pair[0], group) and _in_group(pair[1], group):
+            elif not _in_group(pair[0], group, key) and _in_group(pair[1], group, key):
                 finalized_groups[i].append(pair[0])
                 group_found = True
                 break
-            elif _in_group(pair[0], group) and _in_group(pair[1], group):
+            elif _in_group(pair[0], group, key) and _in_group(pair[1], group, key):
                 group_found = True
                 break
         if not group_found:
@@ -100,15 +556,15 @@ def _finalize_groups_frame(groupings_frame: list) -> list:
     return finalized_groups
 
 
-def _in_group(obj: dict, group: set) -> bool:
-    return obj['id'] in { o['id'] for o in group }
+def _in_group(obj, group: list, key=lambda obj: obj['id']) -> bool:
+    if key is None:
+        return obj in group
+    return key(obj) in { key(o) for o in group }
 
 
-def _radius_box(box: dict):
-    if box['category'] == 'vehicle':
-        return 2* np.sqrt(float(box['box2d']['area']) / np.pi)
-    else:
-        return 4* np.sqrt(float(box['box2d']['area']) / np.pi)
+def _store_labels(store, rows: np.ndarray) -> list:
+    # Same derived fields as _calculate_boundingbox_areas() and _calculate_centers().
+    return store.labels(rows, geometry=True)
 
 
 def _calculate_boundingbox_areas(frame_data: dict) -> dict:
@@ -127,37 +583,79 @@ def _calculate_centers(frame_data: dict) -> dict:
     return frame_data
 
 
-def _group_analyzer(box2d_A: dict, box2d_B: dict, threshold: float=0.70, max_distance: float=100.0) -> bool:
-    if min(box2d_A['area'], box2d_B['area']) / max(box2d_A['area'], box2d_B['area']) < threshold:
-        return False
-    if (norm := np.linalg.norm(np.array(box2d_A['center']) - np.array(box2d_B['center']))) > max_distance*(box2d_A['area']/1):
-        return False
-    return True
-
-
-def _center_of_mass_group(group: list) -> tuple:
-    groupx = list()
-    groupy = list()
-    for box in group:
-        groupx.append(box['box2d']['center'][0])
-        groupy.append(box['box2d']['center'][1])
-    return (np.mean(groupx, axis = 0), np.mean(groupy, axis = 0))
-
-
-def _radius_group(group: list, center_of_mass: tuple) -> float:
-    # Select the corner that is furthest away from the center of mass.
-    point_list = [(obj['box2d']['x1'], obj['box2d']['y1']) for obj in group] + \
-                 [(obj['box2d']['x2'], obj['box2d']['y2']) for obj in group] + \
-                 [(obj['box2d']['x1'], obj['box2d']['y2']) for obj in group] + \
-                 [(obj['box2d']['x2'], obj['box2d']['y1']) for obj in group]
-    
-    # Do radius thing.
-    point_list_sorted = sorted(point_list, key=lambda p: (center_of_mass[0] - p[0])**2+(center_of_mass[1] - p[1])**2)
-
-    # Return the radius that correpsonds to the largest distance between com and box corner.
-    return 2* np.sqrt((center_of_mass[0] - point_list_sorted[-1][0])**2+(center_of_mass[1] - point_list_sorted[-1][1])**2)
-    
-    
+def _group_pairs_arrays(areas: np.ndarray, centers: np.ndarray, threshold: float=0.70, max_distance: float=100.0) -> tuple:
+    # Grouped pairs (i < j) of a frame, as index arrays in lexicographic (i, j) order. Only the candidates from _candidate_pairs() are tested.
+    first, second = [], []
+    for cand_a, cand_b in _candidate_pairs(areas=areas, centers=centers, threshold=threshold, max_distance=max_distance):
+        i, j = np.minimum(cand_a, cand_b), np.maximum(cand_a, cand_b)
+        keep = _pair_test(areas=areas, centers=centers, first=i, second=j, threshold=threshold, max_distance=max_distance)
+        first.append(i[keep])
+        second.append(j[keep])
+    first = np.concatenate(first) if first else np.zeros(0, dtype=np.int64)
+    second = np.concatenate(second) if second else np.zeros(0, dtype=np.int64)
+    order = np.lexsort((second, first))
+    return first[order], second[order]
+
+
+def _pair_test(areas: np.ndarray, centers: np.ndarray, first: np.ndarray, second: np.ndarray,
+               threshold: float, max_distance: float) -> np.ndarray:
+    # A pair is grouped if the area ratio is >= threshold and the center distance is
+    # <= max_distance * area_A, with box A being the box with the lower index.
+    area_a, area_b = areas[first], areas[second]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        keep = np.minimum(area_a, area_b) / np.maximum(area_a, area_b) >= threshold
+    delta = centers[first] - centers[second]
+    keep &= np.sqrt(delta[:, 0]**2 + delta[:, 1]**2) <= max_distance*area_a
+    return keep
+
+
+def _candidate_pairs(areas: np.ndarray, centers: np.ndarray, threshold: float, max_distance: float):
+    # Yields chunks of (a, b) index arrays holding every pair that can pass _pair_test().
+    # Two sorted-sweep indices are built: one over the box areas (a pair needs an area ratio
+    # >= threshold) and one over the x-coordinate of the box centers (a pair needs a center
+    # distance <= max_distance * area_A, where area_A <= min(areas) / threshold). The index
+    # that proposes the fewest candidates is used.
+    n = len(areas)
+    if n < 2 or threshold > 1.0:
+        return
+    max_area = float(np.max(areas))
+    area_bound = areas / threshold if threshold > 0 else np.full(n, np.inf)
+    reach = max_distance * np.minimum(area_bound, max_area) * _PRUNE_SLACK
+
+    by_area = np.argsort(areas, kind='stable')
+    area_ends = np.searchsorted(areas[by_area], area_bound[by_area] * _PRUNE_SLACK, side='right')
+    by_x = np.argsort(centers[:, 0], kind='stable')
+    x_sorted = centers[by_x, 0]
+    x_ends = np.searchsorted(x_sorted, x_sorted + reach[by_x], side='right')
+
+    starts = np.arange(1, n + 1)
+    area_ends, x_ends = np.maximum(area_ends, starts), np.maximum(x_ends, starts)
+    if np.sum(area_ends - starts) <= np.sum(x_ends - starts):
+        order, ends = by_area, area_ends
+    else:
+        order, ends = by_x, x_ends
+    for a, b in _expand_ranges(starts=starts, ends=ends):
+        yield order[a], order[b]
+
+
+def _expand_ranges(starts: np.ndarray, ends: np.ndarray):
+    # Yields (row, column) arrays for all columns in [starts[row], ends[row]), split into
+    # chunks of at most _PAIR_CHUNK_SIZE pairs (or one row, if that is larger).
+    counts = ends - starts
+    cumulative = np.cumsum(counts)
+    row = 0
+    while row < len(counts):
+        done = cumulative[row - 1] if row else 0
+        last = max(int(np.searchsorted(cumulative, done + _PAIR_CHUNK_SIZE, side='right')), row + 1)
+        rows = np.arange(row, last)
+        chunk_counts = counts[row:last]
+        if chunk_counts.sum():
+            rep = np.repeat(rows, chunk_counts)
+            offsets = np.arange(len(rep)) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+            yield rep, starts[rep] + offsets
+        row = last
+
+
 #NOTE: Out of Service
 def _overlap(box2d_A: dict, box2d_B: dict) -> bool:
     # Check if the two boxed do NOT overlap, and return the opposite bool.
@@ -0,0 +1,131 @@
+import os
+import json
+import numpy as np
+from ..Utils import FrameSegmenter
+from ..Utils.JsonStream import JsonStreamReader
+
+
+# CONSTANTS.
+_MERGE_REDUCTIONS = {'sum', 'mean', 'max'}
+
+
+def merge_grouping_complexity(clutter_path: str, output_path: str, grouping_complexity, field: str = 'grouping_complexity',
+                              reduction: str = 'sum', frame_offset: int = 0):
+    '''
+    Writes a copy of a VCBatchAnalyzer clutter file where every cell in 'clutter_data'
+    gets a 'grouping_complexity' field (the field read by PyvistaWrapper.get_video_data()).
+
+    'grouping_complexity' is either the dictionary output of
+    GroupingsComplexity._calc_gridc_groupings() / _calc_gridc_boxes(), keyed by grid-center
+    tuples, or a (frames, rows, cols[, channels]) array from GroupingsComplexity.calc_gridc()
+    (or the path to such an array saved with np.save()). Channels are summed.
+
+    Notes
+    -----
+    Grid centers are assigned to the clutter cell whose rectangle ('top', 'left', 'width',
+    'height') contains them, so both grids may have different dimensions; the values of
+    all grid centers within a cell are combined with 'reduction' ('sum', 'mean' or 'max').
+    The assignment is computed once and reused for every frame. Clutter frame "i" gets the
+    values of frame i + 'frame_offset'; cells without grid centers, and frames without
+    grouping complexity, are left unchanged.\n
+    The clutter file is read and written one frame at a time, to 'output_path' + ".tmp",
+    which replaces 'output_path' once complete and is removed if the merge fails.
+    '''
+    _verify_reduction(reduction=reduction)
+    tmp_path = output_path + ".tmp"
+    try:
+        with open(clutter_path, "r") as src, open(tmp_path, "w") as dst:
+            _write_merged(reader=JsonStreamReader(src), dst=dst, grouping_complexity=grouping_complexity, field=field,
+                          reduction=reduction, frame_offset=frame_offset)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        # Leave no partial copy behind.
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _write_merged(reader: JsonStreamReader, dst, grouping_complexity, field: str, reduction: str, frame_offset: int):
+    values, points = None, None
+    dst.write('{')
+    header = dict()
+    for k, key in enumerate(reader.iter_object_keys()):
+        dst.write(f"{', ' if k else ''}{json.dumps(key)}: ")
+        if key != 'data':
+            header[key] = reader.decode()
+            dst.write(json.dumps(header[key]))
+            continue
+        if values is None:
+            values, points = _grouping_values(grouping_complexity=grouping_complexity, header=header)
+        index = _CellIndex(points=points, reduction=reduction)
+        dst.write('{')
+        for f, frame_no in enumerate(reader.iter_object_keys()):
+            frame = reader.decode()
+            frame_index = int(frame_no) + frame_offset
+            if frame.get('clutter_data') and 0 <= frame_index < len(values):
+                index.apply(frame['clutter_data'], values[frame_index], field=field)
+            dst.write(f"{', ' if f else ''}{json.dumps(frame_no)}: {json.dumps(frame)}")
+        dst.write('}')
+    dst.write('}')
+
+
+class _CellIndex():
+    def __init__(self, points: np.ndarray, reduction: str):
+        # Maps the grid centers to clutter cells; built from the first frame's cell geometry.
+        self.points: np.ndarray = points
+        self.reduction: str = reduction
+        self._cells: tuple = None
+        self._members: np.ndarray = None
+
+    def apply(self, clutter_data: dict, values: np.ndarray, field: str):
+        cells = tuple(clutter_data)
+        if cells != self._cells:
+            self._build(clutter_data)
+        members = self._members
+        if self.reduction == 'max':
+            cell_values = np.max(np.where(members, values[None, :], -np.inf), axis=1, initial=-np.inf)
+        else:
+            cell_values = members @ values
+            if self.reduction == 'mean':
+                counts = members.sum(axis=1)
+                cell_values = np.divide(cell_values, counts, out=np.zeros(len(counts)), where=counts > 0)
+        has_points = members.any(axis=1)
+        for cell, value, used in zip(cells, cell_values.tolist(), has_points.tolist()):
+            if used:
+                clutter_data[cell][field] = value
+
+    def _build(self, clutter_data: dict):
+        self._cells = tuple(clutter_data)
+        geometry = np.array([(cell['left'], cell['top'], cell['width'], cell['height']) for cell in clutter_data.values()],
+                            dtype=float).reshape(-1, 4)
+        x, y = self.points[None, :, 0], self.points[None, :, 1]
+        left, top = geometry[:, 0, None], geometry[:, 1, None]
+        self._members = (x >= left) & (x < left + geometry[:, 2, None]) & (y >= top) & (y < top + geometry[:, 3, None])
+
+
+def _grouping_values(grouping_complexity, header: dict) -> tuple:
+    # Returns (values (frames, points), points (points, 2)).
+    if isinstance(grouping_complexity, str):
+        grouping_complexity = np.load(grouping_complexity, mmap_mode='r')
+    if isinstance(grouping_complexity, dict):
+        frames = grouping_complexity['frames']
+        cells = list(frames[0]) if frames else []
+        values = np.array([[sum(sum(channel) for channel in frame[cell].values()) for cell in cells] for frame in frames],
+                          dtype=float).reshape(len(frames), len(cells))
+        return values, np.array(cells, dtype=float).reshape(-1, 2)
+    array = np.asarray(grouping_complexity, dtype=float)
+    if array.ndim == 4:
+        array = array.sum(axis=3)
+    num_frames, rows, cols = array.shape
+    points = FrameSegmenter.grid_centers(window_size=(header['image_width'], header['image_height']),
+                                         grid_dimensions=(rows, cols))
+    # grid_centers() runs over the rows within each column.
+    values = array.transpose(0, 2, 1).reshape(num_frames, rows * cols)
+    return values, np.array(points, dtype=float).reshape(-1, 2)
+
+
+def _verify_reduction(reduction: str):
+    if reduction not in _MERGE_REDUCTIONS:
+        raise ValueError(f"'reduction': {reduction} is not allowed. Allowed values are 'sum', 'mean' or 'max'.")
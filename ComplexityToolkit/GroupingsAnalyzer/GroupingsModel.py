@@ -0,0 +1,266 @@
+import numpy as np
+from ..GroupingsAnalyzer import GroupingsDefiner as gd
+
+
+class Box():
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row: int):
+        '''
+        View of one label of a Utils.LabelStore. The category and attribute states stay
+        interned codes in the store and are only decoded when read.
+        '''
+        self.store = store
+        self.row: int = row
+
+    @property
+    def id(self) -> str:
+        return self.store.ids[self.store.object_id[self.row]]
+
+    @property
+    def category(self) -> str:
+        return self.store.categories[self.store.category[self.row]]
+
+    @property
+    def box(self) -> tuple:
+        store, row = self.store, self.row
+        return float(store.x1[row]), float(store.y1[row]), float(store.x2[row]), float(store.y2[row])
+
+    @property
+    def area(self) -> float:
+        return float(self.store.area[self.row])
+
+    @property
+    def center(self) -> tuple:
+        return tuple(self.store.center[self.row].tolist())
+
+    def state(self, attribute: str):
+        '''
+        Returns the state of 'attribute', or None if the label does not have it.
+        '''
+        codes = self.store.attributes.get(attribute)
+        if codes is None or codes[self.row] < 0:
+            return None
+        return self.store.attribute_states[attribute][codes[self.row]]
+
+    def to_label(self) -> dict:
+        '''
+        Returns the label as a Scalabel label dict, with 'area' and 'center' in 'box2d'.
+        '''
+        return gd._store_labels(self.store, np.array([self.row]))[0]
+
+
+class Group():
+    __slots__ = ('groups', 'index')
+
+    def __init__(self, groups, index: int):
+        '''
+        View of group 'index' of a GroupSet.
+        '''
+        self.groups = groups
+        self.index: int = index
+
+    @property
+    def members(self) -> np.ndarray:
+        offsets = self.groups.group_offsets
+        return self.groups.members[offsets[self.index]:offsets[self.index + 1]]
+
+    @property
+    def frame(self) -> int:
+        return int(np.searchsorted(self.groups.frame_offsets, self.index, side='right')) - 1
+
+    def boxes(self) -> list:
+        return [Box(self.groups.store, row) for row in self.members.tolist()]
+
+    def state(self, attribute: str):
+        '''
+        Returns the state of 'attribute' of the group's first member.
+        '''
+        return Box(self.groups.store, int(self.members[0])).state(attribute)
+
+    def to_labels(self) -> list:
+        return gd._store_labels(self.groups.store, self.members)
+
+    def __len__(self) -> int:
+        offsets = self.groups.group_offsets
+        return int(offsets[self.index + 1] - offsets[self.index])
+
+
+class GroupSet():
+    __slots__ = ('store', 'members', 'group_offsets', 'frame_offsets', 'boxes')
+
+    def __init__(self, store, members: np.ndarray, group_offsets: np.ndarray, frame_offsets: np.ndarray,
+                 boxes: bool = False):
+        '''
+        Array-backed groups of a sequence, stored as rows of a Utils.LabelStore. The members
+        of group g are members[group_offsets[g]:group_offsets[g + 1]], and the groups of
+        frame f are frame_offsets[f]:frame_offsets[f + 1]. With 'boxes' set to True every
+        group is a single box, like the frames of boxes_category_by_position().
+
+        Notes
+        -----
+        Grouping, regrouping, geometry and complexity weights run on the arrays and the
+        store's interned codes; label dicts are only built by to_labels(). Iterating yields
+        Group views, and Box views give access to single labels.
+        '''
+        self.store = store
+        self.members: np.ndarray = np.asarray(members, dtype=np.int64)
+        self.group_offsets: np.ndarray = np.asarray(group_offsets, dtype=np.int64)
+        self.frame_offsets: np.ndarray = np.asarray(frame_offsets, dtype=np.int64)
+        self.boxes: bool = boxes
+
+    @classmethod
+    def from_boxes(cls, store, category: str):
+        '''
+        Returns the boxes of one category as a GroupSet of single boxes.
+        '''
+        mask = store.category == store.categories.index(category) if category in store.categories \
+            else np.zeros(len(store), dtype=bool)
+        rows = np.flatnonzero(mask)
+        return cls(store, members=rows, group_offsets=np.arange(len(rows) + 1),
+                   frame_offsets=np.searchsorted(rows, store.frame_offsets), boxes=True)
+
+    @classmethod
+    def from_grouped(cls, store, grouped_data: dict, boxes: bool = False):
+        '''
+        Builds a GroupSet from {'frames': [[rows, ...], ...]} data, such as the output of
+        GroupingsDefiner.group_store_by_position().
+        '''
+        frames = grouped_data['frames']
+        groups = [group for frame in frames for group in frame]
+        members = np.concatenate(groups).astype(np.int64) if groups else np.zeros(0, dtype=np.int64)
+        return cls(store, members=members, group_offsets=gd._offsets([len(group) for group in groups]),
+                   frame_offsets=gd._offsets([len(frame) for frame in frames]), boxes=boxes)
+
+    def group_by_position(self, threshold: float = 0.70, max_distance: float = 100.0, legacy_merge: bool = False,
+                          pairing: str = 'pruned', workers: int = 1):
+        '''
+        Groups the members of every frame by size and position, with the same tests and
+        options as GroupingsDefiner.group_category_by_position(). Returns a new GroupSet.
+        '''
+        frames = gd._group_store_rows(self.store, rows=self.members, row_offsets=self.group_offsets[self.frame_offsets],
+                                      threshold=threshold, max_distance=max_distance, legacy_merge=legacy_merge,
+                                      pairing=pairing, workers=workers)
+        return GroupSet.from_grouped(self.store, {'frames': frames})
+
+    def split_by_attribute_states(self, attribute: str, states=None) -> dict:
+        '''
+        Splits every group by the state of 'attribute'. Returns {state: GroupSet}, equal to
+        GroupingsDefiner.regroup_by_attribute_states() (or rebox_by_attribute_states() for
+        a set of boxes), including the handling of 'states' and the state order.
+        '''
+        min_size = 1 if self.boxes else 2
+        names = self.store.attribute_states.get(attribute, [])
+        codes = self.store.attributes[attribute][self.members].astype(np.int64) if attribute in self.store.attributes \
+            else np.full(len(self.members), -1, dtype=np.int64)
+        truthy = np.array([bool(state) for state in names] + [False], dtype=bool)
+        valid = truthy[codes]
+        # Runs of members sharing (group, state), in group order with the members in their original order.
+        positions = np.flatnonzero(valid)
+        keys = np.repeat(np.arange(len(self)), self.group_sizes)[positions] * (len(names) + 1) + codes[positions]
+        order = np.argsort(keys, kind='stable')
+        positions, keys = positions[order], keys[order]
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1]))) if len(keys) else np.zeros(0, dtype=np.int64)
+        counts = np.diff(np.append(starts, len(keys)))
+        run_group, run_code = keys[starts] // (len(names) + 1), keys[starts] % (len(names) + 1)
+        run_start = positions[starts] if len(starts) else np.zeros(0, dtype=np.int64)
+        kept = counts >= min_size
+        if states is None:
+            # States in order of their first kept run (runs are in group order, groups in frame order).
+            kept_codes = run_code[kept][np.argsort(run_start[kept], kind='stable')]
+            _, first = np.unique(kept_codes, return_index=True)
+            states = [names[code] for code in kept_codes[np.sort(first)].tolist()]
+        partitions = dict()
+        group_frame = self.group_frame
+        for state in states:
+            code = names.index(state) if state in names else -2
+            runs = np.flatnonzero(kept & (run_code == code))
+            members = positions[_expand(starts[runs], counts[runs])]
+            frames = group_frame[run_group[runs]]
+            partitions[state] = GroupSet(self.store, members=self.members[members], group_offsets=gd._offsets(counts[runs]),
+                                         frame_offsets=gd._offsets(np.bincount(frames, minlength=self.num_frames)),
+                                         boxes=self.boxes)
+        return partitions
+
+    def geometry(self) -> tuple:
+        '''
+        Returns (centers (G, 2), radii (G,), frame_offsets (frames + 1,)) of the groups, as
+        GroupingsDefiner.group_geometry() (or box_geometry() for a set of boxes).
+        '''
+        store, rows = self.store, self.members
+        if self.boxes:
+            vehicle = store.categories.index('vehicle') if 'vehicle' in store.categories else -1
+            w, h = store.x2[rows] - store.x1[rows], store.y2[rows] - store.y1[rows]
+            centers = np.stack((store.x1[rows] + 0.5 * w, store.y1[rows] + 0.5 * h), axis=1).reshape(-1, 2)
+            radii = np.where(store.category[rows] == vehicle, 2, 4) * np.sqrt(w*h / np.pi)
+            return centers, radii, self.frame_offsets
+        boxes = np.stack((store.x1[rows], store.y1[rows], store.x2[rows], store.y2[rows]), axis=1).reshape(-1, 4)
+        centers, radii = gd._group_geometry_arrays(boxes=boxes, group_sizes=self.group_sizes)
+        return centers, radii, self.frame_offsets
+
+    def weights(self, attribute: str, factors: dict) -> tuple:
+        '''
+        Returns the complexity (size * factor) and frame of every group, as
+        GroupingsComplexity._state_weights(). The factor is factors['center'] if 'attribute'
+        is None, otherwise the factor of the state of the group's first member. Every box of
+        a set of boxes counts as a group of one.
+
+        Notes
+        -----
+        As with the label dicts, every group needs a state with a factor in 'factors';
+        a ValueError is raised otherwise.
+        '''
+        sizes = np.ones(len(self)) if self.boxes else self.group_sizes.astype(float)
+        if attribute is None:
+            return sizes * factors['center'], self.group_frame
+        states = self.store.attribute_states.get(attribute, [])
+        codes = self.store.attributes[attribute][self.members[self.group_offsets[:-1]]].astype(np.int64) \
+            if attribute in self.store.attributes and len(self) else np.full(len(self), -1, dtype=np.int64)
+        for code in np.unique(codes).tolist():
+            _verify_state(attribute=attribute, state=states[code] if code >= 0 else None, factors=factors)
+        table = np.array([factors.get(state, np.nan) for state in states] + [np.nan], dtype=float)
+        return sizes * table[codes], self.group_frame
+
+    def to_labels(self) -> dict:
+        '''
+        Exports the groups as {'frames': [...]} with label dicts, the format of
+        group_category_by_position() (or boxes_category_by_position() for a set of boxes).
+        '''
+        labels = gd._store_labels(self.store, self.members)
+        groups = [labels[a:b] for a, b in zip(self.group_offsets[:-1].tolist(), self.group_offsets[1:].tolist())]
+        if self.boxes:
+            groups = [group[0] for group in groups]
+        return {'frames': [groups[a:b] for a, b in zip(self.frame_offsets[:-1].tolist(), self.frame_offsets[1:].tolist())]}
+
+    def frame(self, frame: int) -> list:
+        return [Group(self, g) for g in range(self.frame_offsets[frame], self.frame_offsets[frame + 1])]
+
+    @property
+    def group_sizes(self) -> np.ndarray:
+        return np.diff(self.group_offsets)
+
+    @property
+    def group_frame(self) -> np.ndarray:
+        return np.repeat(np.arange(self.num_frames), np.diff(self.frame_offsets))
+
+    @property
+    def num_frames(self) -> int:
+        return len(self.frame_offsets) - 1
+
+    def __len__(self) -> int:
+        return len(self.group_offsets) - 1
+
+    def __iter__(self):
+        return (Group(self, g) for g in range(len(self)))
+
+
+def _expand(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    # Concatenation of the ranges [starts[k], starts[k] + counts[k]).
+    if len(counts) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.repeat(starts - gd._offsets(counts)[:-1], counts) + np.arange(int(counts.sum()))
+
+
+def _verify_state(attribute: str, state: str, factors: dict):
+    if state not in factors:
+        raise ValueError(f"'{attribute}': {state} is not allowed. Allowed values are {', '.join(map(str, factors))}.")
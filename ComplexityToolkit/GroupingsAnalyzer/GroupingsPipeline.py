@@ -0,0 +1,234 @@
+import os
+import json
+import pickle
+import hashlib
+import numpy as np
+from ..Utils import LabelParser, LabelCache
+from ..Utils.LabelStore import LabelStore
+from ..GroupingsAnalyzer import GroupingsComplexity as gc
+from ..GroupingsAnalyzer.GroupingsModel import GroupSet
+
+
+# CONSTANTS.
+SPEED_STATES = ("Slow", "Moderate", "Fast", "VeryFast")
+DIR_STATES = ("UL", "U", "UR", "L", "NA", "R", "DL", "D", "DR")
+# Stage: (upstream stages, parameters).
+_STAGES = {
+    'parse': ((), ('url_token',)),
+    'select': (('parse',), ('categories',)),
+    'group': (('select',), ('threshold', 'max_distance')),
+    'regroup': (('group',), ('speed_states', 'dir_states')),
+    'geometry': (('group', 'regroup'), ()),
+    'gridc': (('group', 'regroup', 'geometry'), ('window_size', 'grid_dimensions', 'reduction',
+                                                'pos_factors', 'speed_factors', 'dir_factors')),
+    'framesc': (('group', 'regroup'), ('pos_factors', 'speed_factors', 'dir_factors')),
+}
+_ATTRIBUTES = {'pos': None, 'spd': 'Speed', 'dir': 'Direction'}
+_CACHE_SUFFIX = ".pkl"
+_STORE_ID = "label_store"
+_CACHE_VERSION = 2             # Bumped when the format of a stage output changes.
+
+
+class GroupingsPipeline():
+    DEFAULTS = {
+        'url_token': LabelParser._URL_TOKEN_STANDARD_LOCAL,
+        'categories': ('vehicle', 'pedestrian'),
+        'threshold': 0.70,
+        'max_distance': 100.0,
+        'speed_states': SPEED_STATES,
+        'dir_states': DIR_STATES,
+        'window_size': (1920, 1080),
+        'grid_dimensions': (10, 20),
+        'reduction': 'sum',
+        'pos_factors': gc.POS_FACTORS,
+        'speed_factors': gc.SPEED_FACTORS,
+        'dir_factors': gc.DIR_FACTORS,
+    }
+
+    def __init__(self, file_name: str, cache_dir: str = None, workers: int = 1, **params):
+        '''
+        Runs the grouping complexity of a Scalabel export as a chain of named stages:
+
+        parse: Utils.LabelStore with the labels of the export (LabelCache.load_label_store()).\n
+        select: {category: GroupSet} with the boxes of each category.\n
+        group: {category: GroupSet} with the position groups (GroupSet.group_by_position()).\n
+        regroup: {'spd': {category: {state: GroupSet}}, 'dir': {...}} (GroupSet.split_by_attribute_states()).\n
+        geometry: {(category, channel, state): GroupSet.geometry()}, channel being 'pos', 'spd' or 'dir'.\n
+        gridc: {category: (frames, rows, cols, 3) grid complexity}, see GroupingsComplexity.rasterize_gridc().\n
+        framesc: (frames, 3) frame complexity, see GroupingsComplexity.calc_framesc_arrays().
+
+        Parameters are passed as keyword arguments (see GroupingsPipeline.DEFAULTS) and can
+        be changed with set_params().
+
+        Notes
+        -----
+        The output of every stage is memoized, keyed by the stage's parameters and the keys
+        of the stages it depends on, so changing e.g. a factor table only re-runs 'gridc'
+        and 'framesc'. With 'cache_dir' set, stage outputs are also pickled to that folder
+        and reused across runs, and the LabelCache of the export is kept there too instead
+        of next to the export. Only the latest pickle of every stage is kept per export.
+        The 'parse' key includes the size and modification time of the export. Groups are
+        kept as GroupingsModel.GroupSet arrays over the parsed LabelStore; use
+        GroupSet.to_labels() to get them as label dicts.\n
+        'workers' > 1 runs the 'group' stage on a process pool (see
+        GroupingsDefiner.group_category_by_position()); it does not change any output.
+        '''
+        self.file_name: str = file_name
+        self.cache_dir: str = cache_dir
+        self.workers: int = workers
+        self.params: dict = dict(self.DEFAULTS)
+        self._memo: dict = dict()      # Stage -> (key, output).
+        self.set_params(**params)
+
+    def set_params(self, **params):
+        '''
+        Updates pipeline parameters. Stages are re-run lazily, the next time they (or a
+        stage depending on them) are requested.
+        '''
+        unknown = set(params).difference(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f"GroupingsPipeline.set_params(): Unknown parameters {sorted(unknown)}.")
+        self.params.update(params)
+
+    def run(self, stage: str = 'framesc'):
+        '''
+        Returns the output of a stage, running it and the stages it depends on if needed.
+        '''
+        _verify_stage(stage=stage)
+        key = self.stage_key(stage)
+        memo = self._memo.get(stage)
+        if memo is not None and memo[0] == key:
+            return memo[1]
+        output = self._load(stage, key)
+        if output is None:
+            upstream, _ = _STAGES[stage]
+            output = getattr(self, f"_run_{stage}")(*(self.run(name) for name in upstream))
+            self._store(stage, key, output)
+        self._memo[stage] = (key, output)
+        return output
+
+    def stage_key(self, stage: str) -> str:
+        '''
+        Returns the cache key of a stage: a hash of its parameters and of the keys of its
+        upstream stages.
+        '''
+        _verify_stage(stage=stage)
+        upstream, names = _STAGES[stage]
+        content = {'version': _CACHE_VERSION, 'stage': stage, 'params': {name: self.params[name] for name in names},
+                   'upstream': [self.stage_key(name) for name in upstream]}
+        if stage == 'parse':
+            stat = os.stat(self.file_name)
+            content['file'] = [os.path.abspath(self.file_name), stat.st_size, stat.st_mtime_ns]
+        return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    def clear(self, disk: bool = False):
+        '''
+        Drops the memoized stage outputs (and, if 'disk' is True, the pickled ones and the
+        LabelCache of the export in 'cache_dir'). Pickles of other exports are kept.
+        '''
+        self._memo.clear()
+        if disk and self.cache_dir and os.path.isdir(self.cache_dir):
+            prefixes = tuple(self._cache_prefix(stage) for stage in _STAGES)
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.startswith(prefixes) and entry.name.endswith(_CACHE_SUFFIX):
+                    os.remove(entry.path)
+            LabelCache.invalidate(self.file_name, cache_dir=self.cache_dir)
+
+    def _run_parse(self) -> LabelStore:
+        return LabelCache.load_label_store(self.file_name, url_token=self.params['url_token'], cache_dir=self.cache_dir)
+
+    def _run_select(self, store: LabelStore) -> dict:
+        return {category: GroupSet.from_boxes(store, category) for category in self.params['categories']}
+
+    def _run_group(self, selected: dict) -> dict:
+        return {category: boxes.group_by_position(threshold=self.params['threshold'],
+                                                  max_distance=self.params['max_distance'], workers=self.workers)
+                for category, boxes in selected.items()}
+
+    def _run_regroup(self, grouped: dict) -> dict:
+        return {channel: {category: {state.lower(): groups for state, groups in
+                                     data.split_by_attribute_states(attribute=attribute, states=states).items()}
+                          for category, data in grouped.items()}
+                for channel, attribute, states in (('spd', 'Speed', self.params['speed_states']),
+                                                   ('dir', 'Direction', self.params['dir_states']))}
+
+    def _run_geometry(self, grouped: dict, regrouped: dict) -> dict:
+        return {(category, channel, state): state_groups.geometry()
+                for category, channel, state, state_groups in _iter_state_groups(grouped, regrouped)}
+
+    def _run_gridc(self, grouped: dict, regrouped: dict, geometry: dict) -> dict:
+        factors = {'pos': self.params['pos_factors'], 'spd': self.params['speed_factors'], 'dir': self.params['dir_factors']}
+        gridc = dict()
+        for category in grouped:
+            layers = []
+            for _, channel, state, state_groups in _iter_state_groups({category: grouped[category]}, regrouped):
+                centers, radii, _ = geometry[(category, channel, state)]
+                weights, frame_index = state_groups.weights(attribute=_ATTRIBUTES[channel], factors=factors[channel])
+                c = gc.GRID_CHANNELS.index(channel)
+                layers.append((centers, radii, weights, frame_index, np.full(len(radii), c, dtype=np.int64)))
+            centers, radii, weights, frame_index, channel = (np.concatenate(arrays) for arrays in zip(*layers))
+            gridc[category] = gc.rasterize_gridc(centers, radii, weights, frame_index, channel,
+                                                 num_frames=grouped[category].num_frames,
+                                                 window_size=self.params['window_size'],
+                                                 grid_dimensions=self.params['grid_dimensions'],
+                                                 reduction=self.params['reduction'])
+        return gridc
+
+    def _run_framesc(self, grouped: dict, regrouped: dict) -> np.ndarray:
+        pos_groups = {category: {'pos': data} for category, data in grouped.items()}
+        return gc.calc_framesc_arrays(pos_groups, regrouped['spd'], regrouped['dir'], categories=tuple(grouped),
+                                      pos_factors=self.params['pos_factors'], speed_factors=self.params['speed_factors'],
+                                      dir_factors=self.params['dir_factors'])
+
+    def _cache_path(self, stage: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._cache_prefix(stage)}{key}{_CACHE_SUFFIX}")
+
+    def _cache_prefix(self, stage: str) -> str:
+        # Pickles are named '<stage>-<export>-<key>.pkl', so each export's outdated pickles can be found.
+        return f"{stage}-{hashlib.sha1(os.path.abspath(self.file_name).encode()).hexdigest()[:8]}-"
+
+    def _load(self, stage: str, key: str):
+        # 'parse' already has its own sidecar cache (see LabelCache).
+        if not self.cache_dir or stage == 'parse':
+            return None
+        try:
+            with open(self._cache_path(stage, key), "rb") as file:
+                unpickler = pickle.Unpickler(file)
+                # GroupSets refer to the parsed LabelStore, which is not part of the pickle.
+                unpickler.persistent_load = lambda pid: self.run('parse') if pid == _STORE_ID else None
+                return unpickler.load()
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _store(self, stage: str, key: str, output):
+        if not self.cache_dir or stage == 'parse':
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self._cache_path(stage, key)}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as file:
+            pickler = pickle.Pickler(file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickler.persistent_id = lambda obj: _STORE_ID if isinstance(obj, LabelStore) else None
+            pickler.dump(output)
+        os.replace(tmp_path, self._cache_path(stage, key))
+        # Pickles of this stage and export with other keys are outdated (changed parameters or export).
+        prefix, current = self._cache_prefix(stage), os.path.basename(self._cache_path(stage, key))
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith(prefix) and entry.name.endswith(_CACHE_SUFFIX) and entry.name != current:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+def _iter_state_groups(grouped: dict, regrouped: dict):
+    # Yields (category, channel, state, groups) in GRID_CHANNELS order.
+    for category, data in grouped.items():
+        yield category, 'pos', 'pos', data
+        for channel in ('spd', 'dir'):
+            for state, state_groups in regrouped[channel][category].items():
+                yield category, channel, state, state_groups
+
+
+def _verify_stage(stage: str):
+    if stage not in _STAGES:
+        raise ValueError(f"'stage': {stage} is not allowed. Allowed values are {', '.join(_STAGES)}.")
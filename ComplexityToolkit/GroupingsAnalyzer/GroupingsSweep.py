@@ -0,0 +1,145 @@
+import itertools
+import numpy as np
+from ..Utils.LabelStore import LabelStore
+from ..GroupingsAnalyzer import GroupingsDefiner as gd
+from ..GroupingsAnalyzer import GroupingsComplexity as gc
+
+
+class GroupingSweep():
+    def __init__(self, data, thresholds, max_distances, categories: tuple = ('vehicle', 'pedestrian')):
+        '''
+        Evaluates the position grouping of GroupingsDefiner.group_store_by_position() for
+        many (threshold, max_distance) settings. 'data' is a Utils.LabelStore or parsed
+        Scalabel data. The candidate pairs of every frame are tested once, for the loosest
+        setting (the lowest threshold and the largest max_distance), and their area ratio
+        and center distance are kept; every setting is then a filter on those pairs.
+
+        Notes
+        -----
+        Settings within [min(thresholds), 1] x [0, max(max_distances)] can be evaluated
+        and give the same groups as group_store_by_position(). Memory grows with the
+        number of pairs that pass the loosest setting, not with the number of boxes squared.
+        '''
+        self.store: LabelStore = data if isinstance(data, LabelStore) else LabelStore.from_scalabel(data)
+        self.categories: tuple = tuple(categories)
+        self.min_threshold: float = float(min(thresholds))
+        self.max_distance: float = float(max(max_distances))
+        self.thresholds: tuple = tuple(thresholds)
+        self.max_distances: tuple = tuple(max_distances)
+        self._tables: dict = {category: self._pair_table(category) for category in self.categories}
+
+    def run(self, pos_factors: dict = gc.POS_FACTORS, speed_factors: dict = gc.SPEED_FACTORS,
+            dir_factors: dict = gc.DIR_FACTORS) -> dict:
+        '''
+        Evaluates every (threshold, max_distance) setting of the sweep. Returns a dictionary
+        with one row per setting:
+
+        'threshold', 'max_distance': (settings,) parameters of each setting.\n
+        'group_counts': (settings, frames) number of groups per frame, summed over the categories.\n
+        'framesc': (settings, frames, 3) frame complexity, as GroupingsComplexity.calc_store_framesc().
+        '''
+        settings = list(itertools.product(self.thresholds, self.max_distances))
+        num_frames = self.store.num_frames
+        report = {'threshold': np.array([s[0] for s in settings], dtype=float),
+                  'max_distance': np.array([s[1] for s in settings], dtype=float),
+                  'group_counts': np.zeros((len(settings), num_frames), dtype=np.int64),
+                  'framesc': np.zeros((len(settings), num_frames, len(gc.GRID_CHANNELS)))}
+        for k, (threshold, max_distance) in enumerate(settings):
+            layers = []
+            for category in self.categories:
+                rows, sizes, group_frame = self._flat_groups(category, threshold=threshold, max_distance=max_distance)
+                report['group_counts'][k] += np.bincount(group_frame, minlength=num_frames)
+                layers.extend(gc._store_group_layers(store=self.store, rows=rows, sizes=sizes, group_frame=group_frame,
+                                                     pos_factors=pos_factors, speed_factors=speed_factors,
+                                                     dir_factors=dir_factors))
+            if layers:
+                weights, frame_index, channel = (np.concatenate(arrays) for arrays in zip(*layers))
+                report['framesc'][k] = gc.sum_framesc(weights=weights, frame_index=frame_index, channel=channel,
+                                                      num_frames=num_frames)
+        return report
+
+    def groups(self, category: str, threshold: float, max_distance: float) -> dict:
+        '''
+        Returns the groups of one category and setting in the format of
+        GroupingsDefiner.group_store_by_position() (store row indices, same order).
+        '''
+        self._verify_setting(threshold=threshold, max_distance=max_distance)
+        rows, frames, first, second, grouped = self._grouped_pairs(category, threshold=threshold, max_distance=max_distance)
+        offsets = self._tables[category]['offsets']
+        pair_offsets = np.searchsorted(frames[grouped], np.arange(self.store.num_frames + 1))
+        first, second = first[grouped], second[grouped]
+        groupings = []
+        for f in range(self.store.num_frames):
+            start, a, b = offsets[f], pair_offsets[f], pair_offsets[f + 1]
+            frame_groups = gd._components_to_groups(first=first[a:b] - start, second=second[a:b] - start,
+                                                    size=int(offsets[f + 1] - start))
+            groupings.append([rows[start + group] for group in frame_groups])
+        return {'frames': groupings}
+
+    def _pair_table(self, category: str) -> dict:
+        # Candidate pairs of the loosest setting, as positions into the category's store rows
+        # (first < second, lexsorted), with their frame, area ratio, center distance and the
+        # area of the first box. Frame f has the positions offsets[f]:offsets[f + 1].
+        store = self.store
+        mask = store.category == store.categories.index(category) if category in store.categories \
+            else np.zeros(len(store), dtype=bool)
+        rows = np.flatnonzero(mask)
+        areas, centers = store.area[rows], store.center[rows]
+        offsets = np.searchsorted(rows, store.frame_offsets)
+        columns = {name: [] for name in ('frame', 'first', 'second', 'ratio', 'distance', 'area')}
+        for f in range(store.num_frames):
+            start, end = int(offsets[f]), int(offsets[f + 1])
+            frame_areas, frame_centers = areas[start:end], centers[start:end]
+            for cand_a, cand_b in gd._candidate_pairs(areas=frame_areas, centers=frame_centers,
+                                                      threshold=self.min_threshold, max_distance=self.max_distance):
+                i, j = np.minimum(cand_a, cand_b), np.maximum(cand_a, cand_b)
+                area_a, area_b = frame_areas[i], frame_areas[j]
+                # Same arithmetic as GroupingsDefiner._pair_test().
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    ratio = np.minimum(area_a, area_b) / np.maximum(area_a, area_b)
+                delta = frame_centers[i] - frame_centers[j]
+                distance = np.sqrt(delta[:, 0]**2 + delta[:, 1]**2)
+                keep = (ratio >= self.min_threshold) & (distance <= self.max_distance*area_a)
+                columns['frame'].append(np.full(np.count_nonzero(keep), f, dtype=np.int64))
+                for name, values in (('first', i + start), ('second', j + start), ('ratio', ratio),
+                                     ('distance', distance), ('area', area_a)):
+                    columns[name].append(values[keep])
+        table = {name: np.concatenate(values) if values else np.zeros(0) for name, values in columns.items()}
+        for name in ('frame', 'first', 'second'):
+            table[name] = table[name].astype(np.int64)
+        order = np.lexsort((table['second'], table['first']))
+        table = {name: values[order] for name, values in table.items()}
+        table['rows'], table['offsets'] = rows, offsets
+        return table
+
+    def _grouped_pairs(self, category: str, threshold: float, max_distance: float) -> tuple:
+        table = self._tables[category]
+        grouped = (table['ratio'] >= threshold) & (table['distance'] <= max_distance*table['area'])
+        return table['rows'], table['frame'], table['first'], table['second'], grouped
+
+    def _flat_groups(self, category: str, threshold: float, max_distance: float) -> tuple:
+        # Groups of all frames at once, as consecutive runs of store rows: (rows, sizes, group_frame).
+        # Pairs never link two frames, so the components of the whole category are the groups.
+        rows, frames, first, second, grouped = self._grouped_pairs(category, threshold=threshold, max_distance=max_distance)
+        labels = gd._connected_components(first=first[grouped], second=second[grouped], size=len(rows))
+        sizes = np.bincount(labels, minlength=len(rows))
+        members = np.flatnonzero(sizes[labels] > 1)
+        members = members[np.argsort(labels[members], kind='stable')]
+        roots = np.flatnonzero(sizes > 1)
+        return rows[members], sizes[roots], self.store.frame_index[rows[roots]].astype(np.int64)
+
+    def _verify_setting(self, threshold: float, max_distance: float):
+        if threshold < self.min_threshold or max_distance > self.max_distance:
+            raise ValueError(f"GroupingSweep: setting ({threshold}, {max_distance}) is outside of the sweep range "
+                             f"(threshold >= {self.min_threshold}, max_distance <= {self.max_distance}).")
+
+
+def sweep_grouping_parameters(data, thresholds, max_distances, categories: tuple = ('vehicle', 'pedestrian'),
+                              pos_factors: dict = gc.POS_FACTORS, speed_factors: dict = gc.SPEED_FACTORS,
+                              dir_factors: dict = gc.DIR_FACTORS) -> dict:
+    '''
+    Group counts and frame complexity for every (threshold, max_distance) combination of
+    'thresholds' and 'max_distances'. See GroupingSweep.run() for the output format.
+    '''
+    sweep = GroupingSweep(data, thresholds=thresholds, max_distances=max_distances, categories=categories)
+    return sweep.run(pos_factors=pos_factors, speed_factors=speed_factors, dir_factors=dir_factors)
@@ -0,0 +1,231 @@
+from ..GroupingsAnalyzer import GroupingsDefiner as gd
+import numpy as np
+
+
+# CONSTANTS.
+_CERTIFY_SLACK = 1.0 + 1e-9     # Keeps rounding errors from certifying a pair that sits on a test boundary.
+_MOVED_FRACTION = 0.5           # Frames where more boxes moved are grouped from scratch.
+
+
+class IncrementalGrouper():
+    def __init__(self, category: str, threshold: float = 0.70, max_distance: float = 100.0,
+                 tolerance: float = 0.0, legacy_merge: bool = False):
+        '''
+        Groups one category frame by frame, like GroupingsDefiner.group_category_by_position(),
+        but carries the pair results of the previous frame forward using the persistent
+        Scalabel object ids. Only pairs involving objects that appeared, or that moved more
+        than 'tolerance' pixels (on any box coordinate) since they were last tested, are
+        re-tested.
+
+        Notes
+        -----
+        Results always match a full recompute. When a pair is tested, it is also checked
+        whether its outcome could change while both boxes stay within 'tolerance' of the
+        boxes they had at their last re-test; pairs for which it could are re-tested every
+        frame. Re-tested objects are only paired with the candidates of a sorted sweep, as
+        in GroupingsDefiner._candidate_pairs(), so the cost grows with the number of changed
+        boxes and not with the number of boxes squared. Frames where most boxes moved are
+        grouped from scratch, and so are frames with duplicate ids, without changing what is
+        carried to the next frame.\n
+        'tolerance' = 0 carries forward every pair of boxes that did not change, which suits
+        sequences where most boxes stay put between frames and frames that are edited again.
+        Larger values let slowly moving boxes keep their pairs, but leave more pairs
+        uncertified (re-tested every frame); on synthetic sequences they were rarely faster.
+        '''
+        self.category: str = category
+        self.threshold: float = threshold
+        self.max_distance: float = max_distance
+        self.tolerance: float = tolerance
+        self.legacy_merge: bool = legacy_merge
+        self.stats: dict = {'frames': 0, 'tested_pairs': 0, 'carried_pairs': 0, 'regrouped_frames': 0}
+        self.reset()
+
+    def reset(self):
+        '''
+        Forgets the previous frames, so the next frame is grouped from scratch.
+        '''
+        self._codes: dict = dict()                          # Object id -> running integer code.
+        self._present: np.ndarray = np.zeros(0, dtype=bool) # Objects (by code) of the previous frame.
+        self._reference: np.ndarray = np.zeros((0, 4))      # Box of every object at its last re-test.
+        self._area_low: np.ndarray = np.zeros(0)            # Area bounds of boxes within 'tolerance' of the reference.
+        self._area_high: np.ndarray = np.zeros(0)
+        self._center: np.ndarray = np.zeros((0, 2))         # Center of the reference box.
+        # Pairs (by code, first < second) that were grouped or could not be certified. Every
+        # other pair of objects that stayed in the frame is certified as not grouped.
+        self._pairs: tuple = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        self._grouped: np.ndarray = np.zeros(0, dtype=bool)
+        self._certified: np.ndarray = np.zeros(0, dtype=bool)
+        self._stale: bool = False       # The stored pairs are not valid and every object has to be re-tested.
+
+    def update(self, frame_data: dict) -> list:
+        '''
+        Groups the next frame of the sequence. Returns the frame's groups (lists of label
+        dicts), in the same format as one frame of group_category_by_position().
+        '''
+        frame = gd._prepare_frame(frame_data=frame_data, category=self.category)
+        labels = frame['labels']
+        ids = [obj['id'] for obj in labels]
+        boxes = np.array([(obj['box2d']['x1'], obj['box2d']['y1'], obj['box2d']['x2'], obj['box2d']['y2'])
+                          for obj in labels], dtype=float).reshape(-1, 4)
+        # Same arithmetic as GroupingsDefiner._calculate_boundingbox_areas() and _calculate_centers().
+        sides = boxes[:, 2:] - boxes[:, :2]
+        areas, centers = sides[:, 0] * sides[:, 1], boxes[:, :2] + 0.5 * sides
+        if len(set(ids)) != len(ids):
+            # Ids have to identify the objects; group frames where they don't from scratch and
+            # leave the stored pairs to the frames around them.
+            first, second = gd._group_pairs_arrays(areas=areas, centers=centers, threshold=self.threshold,
+                                                   max_distance=self.max_distance)
+        else:
+            first, second = self._grouped_pairs(ids=ids, boxes=boxes, areas=areas, centers=centers)
+        if self.legacy_merge:
+            groups = gd._finalize_groups_frame_legacy(groupings_frame=list(zip(first.tolist(), second.tolist())), key=None)
+        else:
+            groups = gd._components_to_groups(first=first, second=second, size=len(labels))
+        self.stats['frames'] += 1
+        return [[labels[k] for k in group] for group in groups]
+
+    def _grouped_pairs(self, ids: list, boxes: np.ndarray, areas: np.ndarray, centers: np.ndarray) -> tuple:
+        # Returns the grouped pairs of the frame as lexsorted (first, second) row arrays, the
+        # same pairs as GroupingsDefiner._group_pairs_arrays().
+        n = len(ids)
+        codes = list(map(self._codes.get, ids))
+        if None in codes:
+            codes = [self._codes.setdefault(i, len(self._codes)) for i in ids]
+        codes = np.array(codes, dtype=np.int64)
+        self._grow(len(self._codes))
+        row_of = np.full(len(self._codes), -1, dtype=np.int64)
+        row_of[codes] = np.arange(n)
+
+        # Objects that are new, came back or drifted away from their reference box are re-tested against all others.
+        moved = np.max(np.abs(boxes - self._reference[codes]), axis=1, initial=0.0) > self.tolerance
+        dirty = ~self._present[codes] | moved | self._stale
+        if np.count_nonzero(moved & self._present[codes]) > _MOVED_FRACTION * n:
+            # Most boxes moved, so hardly any pair can be carried forward: group the frame like
+            # group_category_by_position() and only keep the boxes as references for the next frame.
+            self._set_reference(codes=codes, boxes=boxes)
+            self._present[:] = False
+            self._present[codes] = True
+            self._stale = True
+            self.stats['regrouped_frames'] += 1
+            return gd._group_pairs_arrays(areas=areas, centers=centers, threshold=self.threshold,
+                                          max_distance=self.max_distance)
+        self._set_reference(codes=codes[dirty], boxes=boxes[dirty])
+        self._stale = False
+        is_dirty = np.zeros(len(self._codes), dtype=bool)
+        is_dirty[codes[dirty]] = True
+
+        # Stored pairs of two objects that are still in the frame and did not move.
+        code_a, code_b = self._pairs
+        keep = (row_of[code_a] >= 0) & (row_of[code_b] >= 0) & ~is_dirty[code_a] & ~is_dirty[code_b]
+        carried = keep & self._certified
+        retest = keep & ~self._certified
+        rows_a, rows_b = row_of[code_a[retest]], row_of[code_b[retest]]
+        tested_first, tested_second = [np.minimum(rows_a, rows_b)], [np.maximum(rows_a, rows_b)]
+        for rows, others in self._dirty_candidates(codes=codes, dirty=dirty):
+            tested_first.append(np.minimum(rows, others))
+            tested_second.append(np.maximum(rows, others))
+        tested_first, tested_second = np.concatenate(tested_first), np.concatenate(tested_second)
+
+        grouped = gd._pair_test(areas=areas, centers=centers, first=tested_first, second=tested_second,
+                                threshold=self.threshold, max_distance=self.max_distance)
+        certified = self._certify(first=codes[tested_first], second=codes[tested_second])
+        stored = grouped | ~certified
+        self._pairs = (np.concatenate((code_a[carried], np.minimum(codes[tested_first], codes[tested_second])[stored])),
+                       np.concatenate((code_b[carried], np.maximum(codes[tested_first], codes[tested_second])[stored])))
+        self._grouped = np.concatenate((self._grouped[carried], grouped[stored]))
+        self._certified = np.concatenate((self._certified[carried], certified[stored]))
+        self._present[:] = False
+        self._present[codes] = True
+        self.stats['tested_pairs'] += len(tested_first)
+        self.stats['carried_pairs'] += n*(n - 1)//2 - len(tested_first)
+
+        rows_a, rows_b = row_of[self._pairs[0][self._grouped]], row_of[self._pairs[1][self._grouped]]
+        first, second = np.minimum(rows_a, rows_b), np.maximum(rows_a, rows_b)
+        order = np.lexsort((second, first))
+        return first[order], second[order]
+
+    def _dirty_candidates(self, codes: np.ndarray, dirty: np.ndarray):
+        # Yields chunks of (row, other row) arrays holding every pair with a dirty row that
+        # could be grouped while both boxes stay within 'tolerance' of their reference boxes,
+        # each pair once. Pairs left out are certified as not grouped. As in
+        # GroupingsDefiner._candidate_pairs(), two sorted-sweep indices are built and the one
+        # that proposes the fewest candidates is used: the reference center x (distance
+        # <= max_distance * area_A + 2*sqrt(2)*tolerance, with area_A <= area_high / threshold
+        # of either box) and the lower area bound (area intervals that overlap once scaled by
+        # 'threshold'). A dirty row is paired with all rows after it in the sweep order, and
+        # with the clean rows before it.
+        n = len(codes)
+        dirty_rows = np.flatnonzero(dirty)
+        if n < 2 or len(dirty_rows) == 0 or self.threshold > 1.0:
+            return
+        low, high, center_x = self._area_low[codes], self._area_high[codes], self._center[codes, 0]
+        slack = gd._PRUNE_SLACK
+        d_low, d_high = low[dirty_rows], high[dirty_rows]
+        area_bound = d_high / self.threshold if self.threshold > 0 else np.full(len(dirty_rows), np.inf)
+        reach = (self.max_distance * np.minimum(area_bound, np.max(high)) + 2*np.sqrt(2)*self.tolerance) * slack
+        widest = np.max(high - low)
+        sweeps = []
+        for key, lower, upper in ((center_x, center_x[dirty_rows] - reach, center_x[dirty_rows] + reach),
+                                  (low, self.threshold*d_low / slack - widest*slack, area_bound * slack)):
+            order = np.argsort(key, kind='stable')
+            position = np.empty(n, dtype=np.int64)
+            position[order] = np.arange(n)
+            own = position[dirty_rows]
+            clean = np.flatnonzero(~dirty[order])     # Sweep positions of the clean rows.
+            forward = (own + 1, np.maximum(np.searchsorted(key[order], upper, side='right'), own + 1))
+            backward = (np.searchsorted(clean, np.searchsorted(key[order], lower, side='left'), side='left'),
+                        np.searchsorted(clean, own, side='left'))
+            backward = (backward[0], np.maximum(backward[1], backward[0]))
+            count = np.sum(forward[1] - forward[0]) + np.sum(backward[1] - backward[0])
+            sweeps.append((count, order, clean, forward, backward))
+        _, order, clean, forward, backward = min(sweeps, key=lambda sweep: sweep[0])
+        for k, positions in gd._expand_ranges(starts=forward[0], ends=forward[1]):
+            yield dirty_rows[k], order[positions]
+        for k, positions in gd._expand_ranges(starts=backward[0], ends=backward[1]):
+            yield dirty_rows[k], order[clean[positions]]
+
+    def _certify(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        # True for the pairs (by code) whose test outcome is the same for all boxes within
+        # 'tolerance' of their reference boxes, whichever of the two boxes comes first in
+        # the frame (interval bounds on area, area ratio and center distance).
+        low_a, low_b = self._area_low[first], self._area_low[second]
+        high_a, high_b = self._area_high[first], self._area_high[second]
+        delta = self._center[first] - self._center[second]
+        distance = np.sqrt(delta[:, 0]**2 + delta[:, 1]**2)
+        slack = 2*np.sqrt(2)*self.tolerance
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio_low = np.minimum(low_a, low_b) / np.maximum(high_a, high_b)
+            ratio_high = np.minimum(high_a, high_b) / np.maximum(low_a, low_b)
+        always = (ratio_low >= self.threshold * _CERTIFY_SLACK) & \
+                 ((distance + slack) * _CERTIFY_SLACK <= self.max_distance*np.minimum(low_a, low_b))
+        never = (ratio_high * _CERTIFY_SLACK < self.threshold) | \
+                (distance - slack > self.max_distance*np.maximum(high_a, high_b) * _CERTIFY_SLACK)
+        return (always | never) & (low_a > 0) & (low_b > 0)
+
+    def _set_reference(self, codes: np.ndarray, boxes: np.ndarray):
+        width, height = boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]
+        delta = self.tolerance
+        self._reference[codes] = boxes
+        self._area_low[codes] = np.maximum(width - 2*delta, 0.0) * np.maximum(height - 2*delta, 0.0)
+        self._area_high[codes] = (width + 2*delta) * (height + 2*delta)
+        self._center[codes] = 0.5 * (boxes[:, :2] + boxes[:, 2:])
+
+    def _grow(self, size: int):
+        if size > len(self._present):
+            grown = max(size, 2*len(self._present))
+            self._present = np.concatenate((self._present, np.zeros(grown - len(self._present), dtype=bool)))
+            self._reference = np.concatenate((self._reference, np.zeros((grown - len(self._reference), 4))))
+            self._area_low = np.concatenate((self._area_low, np.zeros(grown - len(self._area_low))))
+            self._area_high = np.concatenate((self._area_high, np.zeros(grown - len(self._area_high))))
+            self._center = np.concatenate((self._center, np.zeros((grown - len(self._center), 2))))
+
+
+def group_sequence_by_position(parsed_data, category: str, threshold: float = 0.70, max_distance: float = 100.0,
+                               tolerance: float = 0.0, legacy_merge: bool = False) -> dict:
+    '''
+    Incremental equivalent of GroupingsDefiner.group_category_by_position() for an ordered
+    sequence of frames. See IncrementalGrouper for details on 'tolerance'.
+    '''
+    grouper = IncrementalGrouper(category=category, threshold=threshold, max_distance=max_distance,
+                                 tolerance=tolerance, legacy_merge=legacy_merge)
+    return {'frames': [grouper.update(frame_data=frame_data) for frame_data in gd._iter_frames(parsed_data)]}
@@ -0,0 +1,176 @@
+import numpy as np
+from ..GroupingsAnalyzer import GroupingsDefiner as gd
+from ..GroupingsAnalyzer import GroupingsComplexity as gc
+from ..GroupingsAnalyzer.IncrementalGrouper import IncrementalGrouper
+
+
+class OnlineGroupingsComplexity():
+    def __init__(self, categories: tuple = ('vehicle', 'pedestrian'), threshold: float = 0.70,
+                 max_distance: float = 100.0, window_size: tuple = (1920, 1080), grid_dimensions: tuple = (10, 20),
+                 reduction: str = 'sum', pos_factors: dict = gc.POS_FACTORS, speed_factors: dict = gc.SPEED_FACTORS,
+                 dir_factors: dict = gc.DIR_FACTORS):
+        '''
+        Grouping complexity of a sequence that is still being annotated. Frames are added
+        or changed one at a time with set_frame() / append_frame() / update_labels(), and
+        only that frame's groups, grid complexity and frame complexity are recomputed.
+
+        Notes
+        -----
+        Every category is grouped with an IncrementalGrouper, so when the same frame is
+        edited again (or the next frame, with the same object ids, is added) only the pairs
+        of boxes that changed are re-tested. The groups of all channels and state types of
+        a frame are rasterized in one pass per category. The results equal those of
+        group_category_by_position(), regroup_by_attribute_states() and
+        GroupingsComplexity.calc_gridc() / calc_framesc_arrays() on the whole sequence.\n
+        Use sync() to feed repeated exports of a local Scalabel instance; it only updates
+        the frames whose labels changed.
+        '''
+        gc._verify_reduction(reduction=reduction)
+        self.categories: tuple = tuple(categories)
+        self.window_size: tuple = window_size
+        self.grid_dimensions: tuple = grid_dimensions
+        self.reduction: str = reduction
+        self.factors: dict = {'pos_factors': pos_factors, 'speed_factors': speed_factors, 'dir_factors': dir_factors}
+        self._groupers: dict = {category: IncrementalGrouper(category=category, threshold=threshold,
+                                                             max_distance=max_distance)
+                                for category in self.categories}
+        self._frames: list = list()         # Frame labels, {'labels': [...], 'url': ...}.
+        self._fingerprints: list = list()   # Label fingerprint of every frame (None until sync() needs it).
+        self._groups: list = list()         # {category: groups} of every frame.
+        rows, cols = grid_dimensions
+        self._gridc: dict = {category: np.zeros((0, rows, cols, len(gc.GRID_CHANNELS))) for category in self.categories}
+        self._framesc: np.ndarray = np.zeros((0, len(gc.GRID_CHANNELS)))
+
+    def set_frame(self, frame: int, frame_data: dict) -> dict:
+        '''
+        Sets (or replaces) the labels of frame 'frame' and updates its complexity. Frames
+        between the last known frame and 'frame' are added empty. Returns the frame's grid
+        complexity {category: (rows, cols, 3)}.
+        '''
+        while len(self._frames) <= frame:
+            self._append_empty()
+        labels = list(frame_data['labels'])
+        self._frames[frame] = {'labels': labels, 'url': frame_data.get('url')}
+        self._fingerprints[frame] = None
+        return self._update(frame)
+
+    def append_frame(self, frame_data: dict) -> dict:
+        '''
+        Adds the next frame of the sequence. See set_frame().
+        '''
+        return self.set_frame(len(self._frames), frame_data)
+
+    def update_labels(self, frame: int, labels: list = (), removed_ids: list = ()) -> dict:
+        '''
+        Changes some labels of an existing frame: labels with the 'id' of an existing label
+        replace it, other labels are added, and the labels in 'removed_ids' are removed.
+        See set_frame().
+        '''
+        _verify_frame(frame=frame, num_frames=len(self._frames))
+        changed = {obj['id']: obj for obj in labels}
+        removed = set(removed_ids)
+        kept = [changed.pop(obj['id'], obj) for obj in self._frames[frame]['labels'] if obj['id'] not in removed]
+        kept.extend(obj for obj in changed.values() if obj['id'] not in removed)
+        return self.set_frame(frame, {'labels': kept, 'url': self._frames[frame]['url']})
+
+    def sync(self, parsed_data) -> list:
+        '''
+        Brings the sequence up to date with a full export ({'frames': [...]} or an iterable
+        of frames), updating only the frames whose labels differ. Returns the indices of
+        the updated frames.
+        '''
+        updated = []
+        for frame, frame_data in enumerate(gd._iter_frames(parsed_data)):
+            if frame < len(self._frames):
+                if self._fingerprints[frame] is None:
+                    self._fingerprints[frame] = _fingerprint(self._frames[frame]['labels'])
+                if self._fingerprints[frame] == _fingerprint(frame_data['labels']):
+                    continue
+            self.set_frame(frame, frame_data)
+            updated.append(frame)
+        return updated
+
+    def groups(self, frame: int) -> dict:
+        '''
+        Returns {category: groups} of a frame, groups being lists of label dicts.
+        '''
+        _verify_frame(frame=frame, num_frames=len(self._frames))
+        return self._groups[frame]
+
+    def gridc(self, category: str) -> np.ndarray:
+        '''
+        Returns the (frames, rows, cols, 3) grid complexity of a category, as
+        GroupingsComplexity.calc_gridc().
+        '''
+        return self._gridc[category][:len(self._frames)]
+
+    def framesc(self) -> np.ndarray:
+        '''
+        Returns the (frames, 3) frame complexity summed over the categories, as
+        GroupingsComplexity.calc_framesc_arrays().
+        '''
+        return self._framesc[:len(self._frames)]
+
+    @property
+    def num_frames(self) -> int:
+        return len(self._frames)
+
+    def _update(self, frame: int) -> dict:
+        # All groups of the frame go through one geometry call and one rasterize_gridc() call
+        # per category, and the frame complexity is summed from the same weights.
+        frame_data = self._frames[frame]
+        self._groups[frame] = {category: self._groupers[category].update(frame_data=frame_data)
+                               for category in self.categories}
+        gridc, weights, channels = dict(), [], []
+        for category, groups in self._groups[frame].items():
+            centers, radii, category_weights, channel = _frame_layers(groups=groups, **self.factors)
+            gridc[category] = gc.rasterize_gridc(centers, radii, category_weights, np.zeros(len(radii), dtype=np.int64),
+                                                 channel, num_frames=1, window_size=self.window_size,
+                                                 grid_dimensions=self.grid_dimensions, reduction=self.reduction)[0]
+            self._gridc[category][frame] = gridc[category]
+            weights.append(category_weights)
+            channels.append(channel)
+        self._framesc[frame] = np.bincount(np.concatenate(channels), weights=np.concatenate(weights),
+                                           minlength=len(gc.GRID_CHANNELS)) if self.categories else 0.0
+        return gridc
+
+    def _append_empty(self):
+        frame = len(self._frames)
+        self._frames.append({'labels': [], 'url': None})
+        self._fingerprints.append(())
+        self._groups.append({category: [] for category in self.categories})
+        if frame == len(self._framesc):
+            # Capacity doubling, so appending frames stays amortized O(1).
+            grown = max(2 * frame, 1)
+            for category, gridc in self._gridc.items():
+                self._gridc[category] = np.concatenate((gridc, np.zeros((grown - frame,) + gridc.shape[1:])))
+            self._framesc = np.concatenate((self._framesc, np.zeros((grown - frame, len(gc.GRID_CHANNELS)))))
+        for gridc in self._gridc.values():
+            gridc[frame] = 0.0
+        self._framesc[frame] = 0.0
+
+
+def _frame_layers(groups: list, pos_factors: dict, speed_factors: dict, dir_factors: dict) -> tuple:
+    # (centers, radii, weights, channel) of the position groups and the speed and direction
+    # state groups of one frame, in the order of GroupingsComplexity._grid_layers().
+    layers = [(group, 0, pos_factors['center']) for group in groups]
+    for c, attribute, factors in ((1, 'Speed', speed_factors), (2, 'Direction', dir_factors)):
+        for state, state_groups in gd.regroup_by_attribute_states({'frames': [groups]}, attribute, list(factors)).items():
+            layers.extend((group, c, factors[state]) for group in state_groups['frames'][0])
+    boxes = np.array([(obj['box2d']['x1'], obj['box2d']['y1'], obj['box2d']['x2'], obj['box2d']['y2'])
+                      for group, _, _ in layers for obj in group], dtype=float).reshape(-1, 4)
+    sizes = np.array([len(group) for group, _, _ in layers], dtype=np.int64)
+    centers, radii = gd._group_geometry_arrays(boxes=boxes, group_sizes=sizes)
+    weights = sizes * np.array([factor for _, _, factor in layers], dtype=float)
+    return centers, radii, weights, np.array([c for _, c, _ in layers], dtype=np.int64)
+
+
+def _fingerprint(labels: list) -> tuple:
+    # Everything of a label the grouping complexity depends on.
+    return tuple((obj['id'], obj['category'], tuple(sorted(obj.get('attributes', {}).items())),
+                  obj['box2d']['x1'], obj['box2d']['y1'], obj['box2d']['x2'], obj['box2d']['y2']) for obj in labels)
+
+
+def _verify_frame(frame: int, num_frames: int):
+    if not 0 <= frame < num_frames:
+        raise ValueError(f"'frame': {frame} is not allowed. Allowed values are 0 to {num_frames - 1}.")
@@ -1,8 +1,14 @@
 import os
+import re
+import json
+import fnmatch
 
 
 # CONSTANTS.
 _VALID_SUFFIXES = {'.jpg', '.png', '.json'}
+_MANIFEST_NAME = ".directory_manifest.json"
+_MANIFEST_VERSION = 2
+_NATURAL_SPLIT = re.compile(r'(\d+)')
 
 
 def parse_directory(folder_path: str, suffix: str = "") -> set:
@@ -11,26 +17,140 @@ def parse_directory(folder_path: str, suffix: str = "") -> set:
 
     Notes
     -----
-    Leaving 'suffix' empty returns all files in the folder.
+    Leaving 'suffix' empty returns all files in the folder. The manifest of
+    index_directory() ('.directory_manifest.json') is never returned.
     '''
     _verify_directory(folder_path)
     if suffix != "":
         _verify_suffix(suffix)
-    return {os.path.join(folder_path, file_name) for file_name in os.listdir(folder_path)
-            if os.path.isfile(os.path.join(folder_path, file_name)) and suffix in file_name}
+    with os.scandir(folder_path) as entries:
+        return {entry.path for entry in entries
+                if entry.is_file() and entry.name.endswith(suffix) and entry.name != _MANIFEST_NAME}
 
 
-def order_parsed_files(file_paths: set, order_type: str = 'ascending') -> list:
+def index_directory(folder_path: str, pattern: str = "*", recursive: bool = False,
+                    manifest_path: str = "", verify: bool = False) -> dict:
+    '''
+    Returns a dictionary with the size and modification time of every file within a
+    folder (and its sub-folders if 'recursive' is True) that matches a glob 'pattern'.
+    Each item has the following format: \n
+    file_path: {
+        'size': file size in bytes,\n
+        'mtime': modification time in nanoseconds\n
+    }
+
+    Notes
+    -----
+    The index is persisted to a manifest file ('manifest_path', by default
+    '.directory_manifest.json' inside 'folder_path'; files with that name are never
+    indexed). On later runs, folders whose modification time is unchanged are not listed
+    again, and the files of changed folders are stat'ed again. Set 'verify' to True to
+    re-stat every file, which also picks up files that were overwritten in place in
+    unchanged folders. Set 'manifest_path' to None to disable the manifest.\n
+    The manifest records the absolute 'folder_path', 'pattern' and 'recursive' it was built
+    for, and is ignored when any of them differs. If it cannot be written (e.g. on a
+    read-only mount), the index is still returned.
+
+    A 'pattern' without a '/' is matched against the file name, otherwise it is matched
+    against the path relative to 'folder_path' (using '/' as separator).
+    '''
+    _verify_directory(folder_path)
+    if manifest_path == "":
+        manifest_path = os.path.join(folder_path, _MANIFEST_NAME)
+    key = {'folder': os.path.abspath(folder_path), 'pattern': pattern, 'recursive': recursive}
+    cached = _read_manifest(manifest_path, key) if manifest_path and not verify else {}
+    directories = dict()
+    _index_folder(folder_path, "", recursive, cached, directories)
+    if manifest_path:
+        try:
+            _write_manifest(manifest_path, folder_path, key, directories)
+        except OSError:
+            # The manifest only speeds up later runs.
+            pass
+
+    match_path = '/' in pattern
+    manifest_file = os.path.abspath(manifest_path) if manifest_path else None
+    index = dict()
+    for rel_dir, listing in directories.items():
+        for name, (size, mtime) in listing['files'].items():
+            rel_path = f"{rel_dir}/{name}" if rel_dir else name
+            if not fnmatch.fnmatchcase(rel_path if match_path else name, pattern):
+                continue
+            file_path = os.path.join(folder_path, *rel_path.split('/'))
+            if manifest_file and os.path.abspath(file_path) == manifest_file:
+                continue
+            index[file_path] = {'size': size, 'mtime': mtime}
+    return index
+
+
+def order_parsed_files(file_paths: set, order_type: str = 'ascending', natural: bool = False) -> list:
     '''
     Returns a list of file paths ordered by 'order_type' ('ascending' by default).
 
     Notes
     -----
-    Allowed values for 'order_type' are 'ascending' and 'descending'.
+    Allowed values for 'order_type' are 'ascending' and 'descending'. With 'natural' set
+    to True, digit runs are compared numerically so that 'frame_10' comes after 'frame_9'.
     '''
     _verify_order_type(order_type=order_type)
     order_by = {'ascending': False, 'descending': True}
-    return sorted(list(file_paths), reverse=order_by[order_type])
+    return sorted(list(file_paths), key=natural_sort_key if natural else None, reverse=order_by[order_type])
+
+
+def natural_sort_key(file_path: str) -> tuple:
+    '''
+    Sort key that splits a path into text and number parts, e.g. 'frame_10.jpg'
+    becomes ('frame_', 10, '.jpg').
+    '''
+    return tuple(int(part) if part.isdigit() else part for part in _NATURAL_SPLIT.split(file_path))
+
+
+def _index_folder(folder_path: str, rel_dir: str, recursive: bool, cached: dict, directories: dict):
+    abs_dir = os.path.join(folder_path, *rel_dir.split('/')) if rel_dir else folder_path
+    mtime = os.stat(abs_dir).st_mtime_ns
+    old = cached.get(rel_dir)
+    if old and old['mtime'] == mtime:
+        listing = old
+    else:
+        files, subdirs = dict(), list()
+        with os.scandir(abs_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    subdirs.append(entry.name)
+                elif entry.is_file() and entry.name != _MANIFEST_NAME:
+                    # A changed folder may also hold files that were overwritten in place.
+                    stat = entry.stat()
+                    files[entry.name] = [stat.st_size, stat.st_mtime_ns]
+        listing = {'mtime': mtime, 'files': files, 'subdirs': subdirs}
+    directories[rel_dir] = listing
+    if recursive:
+        for name in listing['subdirs']:
+            _index_folder(folder_path, f"{rel_dir}/{name}" if rel_dir else name, recursive, cached, directories)
+
+
+def _read_manifest(manifest_path: str, key: dict) -> dict:
+    try:
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return dict()
+    if manifest.get('version') != _MANIFEST_VERSION or manifest.get('key') != key:
+        return dict()
+    return manifest['directories']
+
+
+def _write_manifest(manifest_path: str, folder_path: str, key: dict, directories: dict):
+    created = not os.path.exists(manifest_path)
+    with open(manifest_path, "w") as file:
+        json.dump({'version': _MANIFEST_VERSION, 'key': key, 'directories': directories}, file)
+    # Creating the manifest inside an indexed folder changes that folder's mtime. Overwriting
+    # an existing file does not, so refresh the stored mtime once and write it again.
+    rel_dir = os.path.relpath(os.path.dirname(os.path.abspath(manifest_path)), os.path.abspath(folder_path))
+    rel_dir = "" if rel_dir == os.curdir else rel_dir.replace(os.sep, '/')
+    if created and rel_dir in directories:
+        directories[rel_dir]['mtime'] = os.stat(os.path.dirname(os.path.abspath(manifest_path))).st_mtime_ns
+        with open(manifest_path, "w") as file:
+            json.dump({'version': _MANIFEST_VERSION, 'key': key, 'directories': directories}, file)
 
 
 def _verify_directory(folder_path: str):
@@ -1,4 +1,9 @@
 from PIL import Image
+import numpy as np
+
+
+# CONSTANTS.
+_REMAINDER_MODES = {'drop', 'last', 'spread'}
 
 
 def segment_frame(image: Image, num_segments: tuple = (1, 1)) -> dict:
@@ -25,6 +30,55 @@ def segment_frame(image: Image, num_segments: tuple = (1, 1)) -> dict:
             for i in range(rows) for j in range(cols)}
 
 
+def segment_frame_array(image, num_segments: tuple = (1, 1), remainder: str = 'drop') -> dict:
+    '''
+    Array-based version of segment_frame(). The frame is converted to a numpy array
+    once and every sub-image is returned as a read-only view into that array, so no
+    pixel data is copied per cell. The dictionary has the same format as segment_frame(),
+    with 'image' being an (height, width[, channels]) np.ndarray view.
+
+    Notes
+    -----
+    'image' can be a PIL.Image object or an np.ndarray.
+
+    'remainder' decides what happens with the leftover pixels when the image size is not
+    divisible by the grid dimensions: 'drop' ignores them (same as segment_frame()),
+    'last' adds them to the last row/col and 'spread' hands them out one pixel at a time
+    starting from the first row/col.
+    '''
+    array = _as_frame_array(image)
+    rows, cols = num_segments[0], num_segments[1]
+    row_bounds = _segment_bounds(array.shape[0], rows, remainder)
+    col_bounds = _segment_bounds(array.shape[1], cols, remainder)
+    return {(i, j): {'image': array[row_bounds[i]:row_bounds[i + 1], col_bounds[j]:col_bounds[j + 1]],
+                     'top': int(row_bounds[i]), 'left': int(col_bounds[j]),
+                     'width': int(col_bounds[j + 1] - col_bounds[j]),
+                     'height': int(row_bounds[i + 1] - row_bounds[i])}
+            for i in range(rows) for j in range(cols)}
+
+
+def segment_frame_strided(image, num_segments: tuple = (1, 1)) -> tuple:
+    '''
+    Returns all equally sized sub-images of a frame as a single strided view with shape
+    (rows, cols, height, width[, channels]), together with a geometry dictionary in the
+    format of segment_frame() (without the 'image' field).
+
+    Notes
+    -----
+    Leftover pixels are dropped, as in segment_frame(). The view shares memory with the
+    frame array; cells.reshape(rows * cols, ...) gives an N x h x w x C array but copies.
+    '''
+    array = _as_frame_array(image)
+    rows, cols = num_segments[0], num_segments[1]
+    size_row, size_col = array.shape[0] // rows, array.shape[1] // cols
+    shape = (rows, cols, size_row, size_col) + array.shape[2:]
+    strides = (array.strides[0] * size_row, array.strides[1] * size_col) + array.strides
+    cells = np.lib.stride_tricks.as_strided(array, shape=shape, strides=strides, writeable=False)
+    geometry = {(i, j): {'top': i * size_row, 'left': j * size_col, 'width': size_col, 'height': size_row}
+                for i in range(rows) for j in range(cols)}
+    return cells, geometry
+
+
 def grid_centers(window_size: tuple = (1920, 1080), grid_dimensions: tuple = (10, 20)) -> list:
     a, b = _calculate_segment_size(window_size, grid_dimensions)
     size_row, size_col = a // 2 , b // 2
@@ -40,15 +94,96 @@ def _points_within_radius(c, r, points):
 
 
 def points_within_radii(g_centers : dict, g_radii : dict, points: list) -> dict:
-    centers = g_centers['frames']
-    radii = g_radii['frames']
-    return {'frames' : [[_points_within_radius(c,r,points) for c, r in zip(c_g, r_g)] for c_g, r_g in zip(centers,radii)]}
+    '''
+    Returns, for every group in every frame, the list of points that lie strictly
+    within the group radius: {'frames': [[[(x, y), ...], ...], ...]}.
+
+    Notes
+    -----
+    Thin adapter around points_within_radii_csr(), which tests all groups of all frames
+    in one vectorized pass.
+    '''
+    centers, radii, frame_offsets = flatten_frames(g_centers, g_radii)
+    indptr, indices = points_within_radii_csr(centers, radii, points)
+    indptr, indices = indptr.tolist(), indices.tolist()
+    groups = [[points[k] for k in indices[indptr[g]:indptr[g + 1]]] for g in range(len(radii))]
+    return {'frames': [groups[frame_offsets[i]:frame_offsets[i + 1]] for i in range(len(frame_offsets) - 1)]}
+
+
+def points_within_radii_matrix(centers, radii, points) -> np.ndarray:
+    '''
+    Returns a boolean (groups, points) matrix where element [g, p] is True if point p
+    lies strictly within the circle given by centers[g] and radii[g].
+    '''
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    radii = np.asarray(radii, dtype=float).reshape(-1)
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    dx = centers[:, 0, None] - points[None, :, 0]
+    dy = centers[:, 1, None] - points[None, :, 1]
+    return (dx**2 + dy**2) < (radii**2)[:, None]
+
+
+def points_within_radii_csr(centers, radii, points, chunk_size: int = 8192) -> tuple:
+    '''
+    Same test as points_within_radii_matrix(), returned in CSR form (indptr, indices):
+    the points within group g are points[indices[indptr[g]:indptr[g + 1]]].
+
+    Notes
+    -----
+    Groups are processed 'chunk_size' at a time, so memory stays bounded when the
+    centers and radii of a whole sequence are passed at once.
+    '''
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    radii = np.asarray(radii, dtype=float).reshape(-1)
+    counts, indices = [], []
+    for start in range(0, len(radii), chunk_size):
+        within = points_within_radii_matrix(centers[start:start + chunk_size], radii[start:start + chunk_size], points)
+        counts.append(within.sum(axis=1))
+        indices.append(np.nonzero(within)[1])
+    indptr = np.zeros(len(radii) + 1, dtype=np.int64)
+    if counts:
+        np.cumsum(np.concatenate(counts), out=indptr[1:])
+    return indptr, np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64)
+
+
+def flatten_frames(g_centers: dict, g_radii: dict) -> tuple:
+    '''
+    Flattens the {'frames': [...]} centers and radii of group_centers_n_radii() into
+    contiguous arrays. Returns (centers (N, 2), radii (N,), frame_offsets (frames + 1,)),
+    where the groups of frame i are found at frame_offsets[i]:frame_offsets[i + 1].
+    '''
+    sizes = [len(frame) for frame in g_radii['frames']]
+    frame_offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=frame_offsets[1:])
+    centers = np.array([c for frame in g_centers['frames'] for c in frame], dtype=float).reshape(-1, 2)
+    radii = np.array([r for frame in g_radii['frames'] for r in frame], dtype=float)
+    return centers, radii, frame_offsets
 
 
 def _calculate_segment_size(img_size, num_segments) -> tuple:
     return img_size[1] // num_segments[0], img_size[0] // num_segments[1]
 
 
+def _as_frame_array(image) -> np.ndarray:
+    array = image if isinstance(image, np.ndarray) else np.asarray(image)
+    # Work on a read-only view so the cell views can't be used to modify the frame.
+    array = array.view()
+    array.flags.writeable = False
+    return array
+
+
+def _segment_bounds(length: int, num_segments: int, remainder: str) -> np.ndarray:
+    if remainder not in _REMAINDER_MODES:
+        raise ValueError(f"'remainder': {remainder} is not allowed. Allowed values are {_REMAINDER_MODES}.")
+    size, leftover = divmod(length, num_segments)
+    sizes = np.full(num_segments, size)
+    if remainder == 'last':
+        sizes[-1] += leftover
+    elif remainder == 'spread':
+        sizes[:leftover] += 1
+    return np.concatenate(([0], np.cumsum(sizes)))
+
+
 def _calculate_segment_data(image: Image, cell: tuple, cell_size: tuple) -> dict:
     top, left = cell[0] * cell_size[0], cell[1] * cell_size[1]
     bbox = (left, top, left + cell_size[1], top + cell_size[0])         # L T R B.
@@ -0,0 +1,127 @@
+import json
+
+
+# CONSTANTS.
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789.eE+-'
+_CHUNK_SIZE = 1 << 20
+
+
+class JsonStreamReader():
+    def __init__(self, file, chunk_size: int = _CHUNK_SIZE):
+        '''
+        Minimal incremental JSON reader on top of a text file object. It walks the
+        structural characters ('{', '[', ',', ':' ...) itself and decodes one value at a
+        time with json.JSONDecoder.raw_decode, so only the value currently being read
+        has to fit in memory.
+        '''
+        self.file = file
+        self.chunk_size: int = chunk_size
+        self.buffer: str = ""
+        self.pos: int = 0
+        self.eof: bool = False
+        self._decoder = json.JSONDecoder()
+
+    def peek(self) -> str:
+        '''
+        Returns the next non-whitespace character without consuming it ('' at the end of the file).
+        '''
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos] if self.pos < len(self.buffer) else ''
+            self._fill()
+
+    def expect(self, char: str):
+        '''
+        Consumes the next non-whitespace character, which has to be 'char'.
+        '''
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JsonStreamReader.expect(): Expected '{char}' but found '{found}'.")
+        self.pos += 1
+
+    def decode(self):
+        '''
+        Decodes and returns the next complete JSON value.
+        '''
+        self.peek()
+        read_size = self.chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+                # A number or literal at the very end of the buffer might continue in the next
+                # chunk. So might a number cut off after a '.', 'e', '+' or '-', which raw_decode
+                # returns without the incomplete part.
+                if self.eof or (end < len(self.buffer) and not (_is_number(value) and self.buffer[end] in _NUMBER_CHARS)):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow the read size so that large values are not re-decoded once per chunk.
+            self._fill(read_size)
+            read_size *= 2
+
+    def iter_array(self):
+        '''
+        Yields the items of the JSON array starting at the current position.
+        '''
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.decode()
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect(']')
+                return
+
+    def iter_object_keys(self):
+        '''
+        Yields the keys of the JSON object starting at the current position. After each
+        key, the caller has to consume the value (e.g. with decode() or iter_array())
+        before asking for the next key.
+        '''
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.decode()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+            else:
+                self.expect('}')
+                return
+
+    def _fill(self, size: int = 0):
+        data = self.file.read(size or self.chunk_size)
+        if not data:
+            self.eof = True
+            return
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def iter_array_items(file, key: str, chunk_size: int = _CHUNK_SIZE):
+    '''
+    Yields the items of the array stored under 'key' in a top-level JSON object, e.g.
+    iter_array_items(file, 'frames') for a Scalabel export. Other top-level values are
+    decoded and skipped.
+    '''
+    reader = JsonStreamReader(file, chunk_size=chunk_size)
+    for name in reader.iter_object_keys():
+        if name == key:
+            yield from reader.iter_array()
+        else:
+            reader.decode()
@@ -0,0 +1,90 @@
+import os
+import json
+import shutil
+import hashlib
+from . import LabelParser
+from .LabelStore import LabelStore
+
+
+# CONSTANTS.
+_CACHE_VERSION = 1
+_CACHE_SUFFIX = ".labelcache"
+_KEY_FILE = "key.json"
+
+
+def load_label_store(file_name: str, url_token: str = LabelParser._URL_TOKEN_STANDARD_LOCAL,
+                     cache_dir: str = None, use_cache: bool = True) -> LabelStore:
+    '''
+    Returns the parsed labels of a Scalabel export as a LabelStore, including the box
+    areas and centers. The first call parses the file (streaming, see
+    LabelParser.iter_scalabel_frames()) and writes a binary sidecar cache; later calls
+    memory-map the cached arrays instead.
+
+    Notes
+    -----
+    The cache is stored next to the export ('<file_name>.labelcache') unless 'cache_dir' is
+    given. It is keyed on the absolute path, size and modification time of the export
+    (and on 'url_token'), and is rebuilt automatically when any of them changes.
+    '''
+    cache_path = sidecar_path(file_name=file_name, cache_dir=cache_dir)
+    key = _cache_key(file_name=file_name, url_token=url_token)
+    if use_cache and _read_key(cache_path) == key:
+        return LabelStore.load(cache_path)
+    store = LabelStore.from_scalabel(LabelParser.iter_scalabel_frames(file_name, url_token=url_token))
+    if use_cache:
+        _write_cache(cache_path=cache_path, store=store, key=key)
+    return store
+
+
+def load_parsed_data(file_name: str, url_token: str = LabelParser._URL_TOKEN_STANDARD_LOCAL, cache_dir: str = None) -> dict:
+    '''
+    Cached drop-in for LabelParser.parse_scalabel_json_data(LabelParser.read_json(file_name)).
+
+    Notes
+    -----
+    The labels also carry the cached 'area' and 'center' in 'box2d', with the values the
+    grouping functions of GroupingsDefiner add to the labels they process.
+    '''
+    return load_label_store(file_name=file_name, url_token=url_token, cache_dir=cache_dir).to_scalabel(geometry=True)
+
+
+def sidecar_path(file_name: str, cache_dir: str = None) -> str:
+    '''
+    Returns the folder used to cache 'file_name'.
+    '''
+    if cache_dir is None:
+        return f"{file_name}{_CACHE_SUFFIX}"
+    digest = hashlib.sha1(os.path.abspath(file_name).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{os.path.basename(file_name)}.{digest}{_CACHE_SUFFIX}")
+
+
+def invalidate(file_name: str, cache_dir: str = None):
+    '''
+    Removes the cache of 'file_name', if there is one.
+    '''
+    shutil.rmtree(sidecar_path(file_name=file_name, cache_dir=cache_dir), ignore_errors=True)
+
+
+def _cache_key(file_name: str, url_token: str) -> dict:
+    stat = os.stat(file_name)
+    return {'version': _CACHE_VERSION, 'path': os.path.abspath(file_name), 'size': stat.st_size,
+            'mtime': stat.st_mtime_ns, 'url_token': url_token}
+
+
+def _read_key(cache_path: str):
+    try:
+        with open(os.path.join(cache_path, _KEY_FILE), "r") as file:
+            return json.load(file)
+    except (FileNotFoundError, NotADirectoryError, ValueError):
+        return None
+
+
+def _write_cache(cache_path: str, store: LabelStore, key: dict):
+    # Build the cache in a temporary folder and swap it in, so readers never see half a cache.
+    tmp_path = f"{cache_path}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    store.save(tmp_path)
+    with open(os.path.join(tmp_path, _KEY_FILE), "w") as file:
+        json.dump(key, file)
+    shutil.rmtree(cache_path, ignore_errors=True)
+    os.replace(tmp_path, cache_path)
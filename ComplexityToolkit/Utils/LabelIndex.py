@@ -0,0 +1,138 @@
+import itertools
+
+
+# CONSTANTS.
+_ANY = object()         # Posting key part matching any (truthy) state.
+
+
+class LabelIndex():
+    def __init__(self, frames=None, grouped: bool = False):
+        '''
+        Inverted index from (category, attribute, state) to the positions of the matching
+        labels in every frame. The index is built in one pass over the frames, after which
+        the selections of LabelParser and GroupingsDefiner are plain lookups.
+
+        'frames' can be parsed frames ({'labels': [...], 'url': ...}), lists of labels
+        (e.g. the frames of boxes_category_by_position()) or, with 'grouped' set to True,
+        lists of groups (the frames of group_category_by_position()).
+
+        Notes
+        -----
+        Frames can be added and removed afterwards with add_frame() and remove_frame().
+        Selections return frames in insertion order.
+        '''
+        self.grouped: bool = grouped
+        self._frames: dict = dict()
+        self._postings: dict = dict()
+        self._keys = itertools.count()
+        if frames is not None:
+            for frame in (frames['frames'] if isinstance(frames, dict) else frames):
+                self.add_frame(frame)
+
+    def add_frame(self, frame, frame_key=None):
+        '''
+        Indexes a frame and returns its key (a running number unless 'frame_key' is given).
+        A frame added with an existing key replaces that frame and keeps its position.
+        Running numbers skip the keys that are already in use.
+        '''
+        if frame_key is None:
+            frame_key = next(key for key in self._keys if key not in self._frames)
+        if frame_key in self._frames:
+            self._remove_postings(frame_key)
+        if self.grouped:
+            labels = [obj for group in frame for obj in group]
+            group_of = [g for g, group in enumerate(frame) for _ in group]
+            url = None
+        else:
+            labels = frame['labels'] if isinstance(frame, dict) else frame
+            group_of = None
+            url = frame.get('url') if isinstance(frame, dict) else None
+        posted = set()
+        for position, obj in enumerate(labels):
+            category = obj.get('category')
+            keys = [(category, None, None)]
+            for attribute, state in obj.get('attributes', {}).items():
+                keys += [(category, attribute, state), (None, attribute, state)]
+                if state:
+                    keys += [(category, attribute, _ANY), (None, attribute, _ANY)]
+            # Labels without a category give (None, attribute, state) twice.
+            for key in dict.fromkeys(keys):
+                self._postings.setdefault(key, dict()).setdefault(frame_key, []).append(position)
+            posted.update(keys)
+        self._frames[frame_key] = {'labels': labels, 'url': url, 'group_of': group_of, 'posted': posted}
+        return frame_key
+
+    def remove_frame(self, frame_key):
+        '''
+        Removes a frame and all its postings from the index.
+        '''
+        self._remove_postings(frame_key)
+        del self._frames[frame_key]
+
+    def _remove_postings(self, frame_key):
+        for key in self._frames[frame_key]['posted']:
+            posting = self._postings[key]
+            del posting[frame_key]
+            if not posting:
+                del self._postings[key]
+
+    def lookup(self, category=None, attribute: str = None, state=_ANY) -> dict:
+        '''
+        Returns {frame_key: [label positions]} for the labels matching a category and/or an
+        attribute state. Leaving 'state' out matches every truthy state of 'attribute'.
+        Frames without matches are left out.
+        '''
+        if attribute is None:
+            return self._postings.get((category, None, None), {})
+        return self._postings.get((category, attribute, state), {})
+
+    def select_by_category(self, category: str) -> list:
+        '''
+        Same output as LabelParser.select_parsed_data_by_category() for the indexed frames.
+        '''
+        posting = self.lookup(category=category)
+        return [{'labels': [{'id': frame['labels'][p]['id'], 'category': frame['labels'][p]['category'],
+                             'attributes': frame['labels'][p]['attributes'], 'box2d': frame['labels'][p]['box2d']}
+                            for p in posting.get(frame_key, ())],
+                 'url': frame['url']}
+                for frame_key, frame in self._frames.items()]
+
+    def select_by_attribute(self, attribute: str, state=_ANY, category=None) -> dict:
+        '''
+        Same output as LabelParser.select_parsed_data_by_attribute() (followed by
+        select_attribute_by_state() if 'state' is given), keyed by frame key.
+        '''
+        posting = self.lookup(category=category, attribute=attribute, state=state)
+        return {frame_key: [{'id': obj['id'], 'category': obj['category'], 'state': obj['attributes'][attribute], 'box2d': obj['box2d']}
+                            for obj in (frame['labels'][p] for p in posting.get(frame_key, ()))]
+                for frame_key, frame in self._frames.items()}
+
+    def rebox_by_attribute_state(self, attribute: str, state) -> dict:
+        '''
+        Same output as GroupingsDefiner.rebox_by_attribute_state() for the indexed frames.
+        '''
+        posting = self.lookup(attribute=attribute, state=state) if state else {}
+        return {'frames': [[frame['labels'][p] for p in posting.get(frame_key, ())]
+                           for frame_key, frame in self._frames.items()]}
+
+    def regroup_by_attribute_state(self, attribute: str, state) -> dict:
+        '''
+        Same output as GroupingsDefiner.regroup_by_attribute_state() for the indexed
+        (grouped) frames.
+        '''
+        if not self.grouped:
+            raise ValueError("LabelIndex.regroup_by_attribute_state(): The index was not built from grouped data.")
+        posting = self.lookup(attribute=attribute, state=state) if state else {}
+        groupings = {'frames': []}
+        for frame_key, frame in self._frames.items():
+            frame_groupings = []
+            labels, group_of = frame['labels'], frame['group_of']
+            for _, positions in itertools.groupby(posting.get(frame_key, ()), key=group_of.__getitem__):
+                group = [labels[p] for p in positions]
+                if len(group) > 1:
+                    frame_groupings.append(group)
+            groupings['frames'].append(frame_groupings)
+        return groupings
+
+    def __len__(self) -> int:
+        return len(self._frames)
@@ -1,19 +1,27 @@
 import json
+import logging
+from collections import Counter
+from . import JsonStream
 
 # CONSTANTS.
 _SCALABEL_FRAME_FIELDS = {'name', 'url', 'videoName', 'timestamp', 'attributes', 'labels', 'sensor'}
 _SCALABEL_LABELS_FIELDS = {'id', 'category', 'attributes', 'manualShape', 'box2d', 'poly2d', 'box3d'}
 _URL_TOKEN_STANDARD_WEB = "https://s3-us-west-2.amazonaws.com/scalabel-public/demo/frames/"
 _URL_TOKEN_STANDARD_LOCAL = "http://localhost:8686/items/"
+_DROPPED_LABELS_FIELDS = ('manualShape', 'poly2d', 'box3d')
+_PARSED_LABELS_FIELDS = tuple(sorted(_SCALABEL_LABELS_FIELDS.difference(_DROPPED_LABELS_FIELDS)))
+
+logger = logging.getLogger(__name__)
 
 
 def select_parsed_data_by_category(parsed_data: list, category: str) -> list:
-    category_data = list()
-    for data in parsed_data:
-        frame_category_data = [{ 'id': obj['id'], 'category': obj['category'], 'attributes': obj['attributes'], 'box2d': obj['box2d']}
-                               for obj in data['labels'] if obj['category'] == category]
-        category_data.append({'labels' : frame_category_data, 'url': data['url']})
-    return category_data
+    return [select_frame_by_category(frame_data=data, category=category) for data in parsed_data]
+
+
+def select_frame_by_category(frame_data: dict, category: str) -> dict:
+    frame_category_data = [{ 'id': obj['id'], 'category': obj['category'], 'attributes': obj['attributes'], 'box2d': obj['box2d']}
+                           for obj in frame_data['labels'] if obj['category'] == category]
+    return {'labels' : frame_category_data, 'url': frame_data['url']}
 
 
 def select_parsed_data_by_attribute(parsed_data: dict, attribute: str) -> dict:
@@ -57,26 +65,57 @@ def checkURL(url,token):
 
 
 def parse_scalabel_json_data(data, url_token: str = _URL_TOKEN_STANDARD_LOCAL):
+    '''
+    Returns {'frames': [{'labels': [...], 'url': str}, ...]} from a loaded Scalabel export.
+    Labels only keep the whitelisted fields ('id', 'category', 'attributes', 'box2d'),
+    and 'url_token' is stripped from the frame urls.
+
+    Notes
+    -----
+    Labels that lack any of the Scalabel label fields are counted per field, and the
+    totals are logged once (at INFO level) instead of being printed per label.
+    '''
     if not data:
         return
 
-    parsedData = {'frames': []}
-    for frame_data in data['frames']:
-        for i in range(len(frame_data['labels'])):
-            try:
-                del frame_data['labels'][i]['manualShape']
-            except:
-                print("frame_data['labels'][",i,"]['manualShape'] Dosen't exist")
-            try:
-                del frame_data['labels'][i]['poly2d']
-            except:
-                print("frame_data['labels'][",i,"]['poly2d'] Dosen't exist")
-            try:
-                del frame_data['labels'][i]['box3d']
-            except:
-                print("frame_data['labels'][",i,"]['box3d'] Dosen't exist")
-
-        frame_data['url'] = checkURL(url=frame_data['url'], token=url_token)
-        parsedData['frames'].append({'labels': frame_data['labels'], 'url': frame_data['url']})
-
-    return parsedData
\ No newline at end of file
+    missing = Counter()
+    parsedData = {'frames': [_parse_scalabel_frame(frame_data=frame_data, url_token=url_token, missing=missing)
+                             for frame_data in data['frames']]}
+    _log_missing_fields(caller="parse_scalabel_json_data", missing=missing)
+    return parsedData
+
+
+def iter_scalabel_frames(file_name, url_token: str = _URL_TOKEN_STANDARD_LOCAL):
+    '''
+    Streaming version of read_json() + parse_scalabel_json_data(). Yields the parsed
+    frames of a Scalabel export one at a time, in the format {'labels': [...], 'url': str},
+    without loading the whole file into memory.
+
+    Notes
+    -----
+    The 'manualShape', 'poly2d' and 'box3d' label fields are dropped and 'url_token' is
+    stripped from the frame urls while reading. Unlike read_json(), a missing file raises
+    FileNotFoundError.
+    '''
+    missing = Counter()
+    with open(file_name, "r") as file:
+        for frame_data in JsonStream.iter_array_items(file, 'frames'):
+            yield _parse_scalabel_frame(frame_data=frame_data, url_token=url_token, missing=missing)
+    _log_missing_fields(caller="iter_scalabel_frames", missing=missing)
+
+
+def _parse_scalabel_frame(frame_data: dict, url_token: str, missing: Counter) -> dict:
+    labels = []
+    for label in frame_data['labels']:
+        if not _SCALABEL_LABELS_FIELDS.issubset(label):
+            missing.update(_SCALABEL_LABELS_FIELDS.difference(label))
+        labels.append({field: label[field] for field in _PARSED_LABELS_FIELDS if field in label})
+    missing['labels'] += len(labels)
+    return {'labels': labels, 'url': checkURL(url=frame_data['url'], token=url_token)}
+
+
+def _log_missing_fields(caller: str, missing: Counter):
+    num_labels = missing.pop('labels', 0)
+    if missing:
+        summary = ", ".join(f"'{field}': {count}" for field, count in sorted(missing.items()))
+        logger.info(f"LabelParser.{caller}(): {num_labels} labels parsed. Labels missing each field: {summary}.")
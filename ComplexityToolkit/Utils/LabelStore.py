@@ -0,0 +1,216 @@
+import os
+import json
+import numpy as np
+
+
+# CONSTANTS.
+_BOX_FIELDS = ('x1', 'y1', 'x2', 'y2')
+_MISSING = -1
+_ARRAY_FIELDS = ('frame_offsets', 'frame_index', 'object_id', 'category', 'x1', 'y1', 'x2', 'y2', 'area', 'center')
+_TABLES_FILE = "tables.json"
+
+
+class LabelStore():
+    def __init__(self):
+        '''
+        Columnar (struct-of-arrays) storage for the labels of an annotated sequence.
+        Every label is one row in a set of flat arrays, and the labels of frame i are
+        found at frame_offsets[i]:frame_offsets[i + 1].
+
+        Fields
+        -----
+        frame_offsets: (frames + 1,) int64.\n
+        frame_index: (labels,) int32, frame of each label.\n
+        object_id: (labels,) int32, code into LabelStore.ids.\n
+        category: (labels,) int16, code into LabelStore.categories.\n
+        attributes: {attribute: (labels,) int16}, codes into LabelStore.attribute_states[attribute] (-1 if missing).\n
+        x1, y1, x2, y2, area: (labels,) float64.\n
+        center: (labels, 2) float64.\n
+        frames: list with the remaining per-frame fields (e.g. 'url').
+
+        Use LabelStore.from_scalabel() to build a store from parsed Scalabel data.
+        '''
+        self.frame_offsets: np.ndarray = np.zeros(1, dtype=np.int64)
+        self.frame_index: np.ndarray = np.zeros(0, dtype=np.int32)
+        self.object_id: np.ndarray = np.zeros(0, dtype=np.int32)
+        self.category: np.ndarray = np.zeros(0, dtype=np.int16)
+        self.attributes: dict = dict()
+        self.x1: np.ndarray = np.zeros(0)
+        self.y1: np.ndarray = np.zeros(0)
+        self.x2: np.ndarray = np.zeros(0)
+        self.y2: np.ndarray = np.zeros(0)
+        self.area: np.ndarray = np.zeros(0)
+        self.center: np.ndarray = np.zeros((0, 2))
+        self.frames: list = list()
+        self.ids: list = list()
+        self.categories: list = list()
+        self.attribute_states: dict = dict()
+
+    @classmethod
+    def from_scalabel(cls, parsed_data):
+        '''
+        Builds a LabelStore from parsed Scalabel data. 'parsed_data' is either a
+        {'frames': [...]} dictionary or an iterable of frames, such as
+        LabelParser.iter_scalabel_frames().
+        '''
+        store = cls()
+        frames = parsed_data['frames'] if isinstance(parsed_data, dict) else parsed_data
+        id_codes, category_codes, state_codes = dict(), dict(), dict()
+        sizes, ids, categories, boxes = [], [], [], []
+        attributes = dict()
+        num_labels = 0
+        for frame_data in frames:
+            labels = frame_data['labels']
+            store.frames.append({field: value for field, value in frame_data.items() if field != 'labels'})
+            sizes.append(len(labels))
+            for obj in labels:
+                ids.append(id_codes.setdefault(obj['id'], len(id_codes)))
+                categories.append(category_codes.setdefault(obj['category'], len(category_codes)))
+                box = obj['box2d']
+                boxes.append((box['x1'], box['y1'], box['x2'], box['y2']))
+                for attribute, state in obj.get('attributes', {}).items():
+                    if attribute not in attributes:
+                        # Attributes first seen at this label are missing for all previous labels.
+                        attributes[attribute], state_codes[attribute] = [_MISSING] * num_labels, dict()
+                    codes = state_codes[attribute]
+                    attributes[attribute].append(codes.setdefault(state, len(codes)))
+                num_labels += 1
+                for column in attributes.values():
+                    if len(column) < num_labels:
+                        column.append(_MISSING)
+
+        store.frame_offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=store.frame_offsets[1:])
+        store.frame_index = np.repeat(np.arange(len(sizes), dtype=np.int32), sizes)
+        store.object_id = np.array(ids, dtype=np.int32)
+        store.category = np.array(categories, dtype=np.int16)
+        store.attributes = {attribute: np.array(column, dtype=np.int16) for attribute, column in attributes.items()}
+        boxes = np.array(boxes, dtype=float).reshape(-1, 4)
+        store.x1, store.y1, store.x2, store.y2 = (np.ascontiguousarray(boxes[:, k]) for k in range(4))
+        store.ids = list(id_codes)
+        store.categories = list(category_codes)
+        store.attribute_states = {attribute: list(codes) for attribute, codes in state_codes.items()}
+        store._calculate_geometry()
+        return store
+
+    def to_scalabel(self, geometry: bool = False) -> dict:
+        '''
+        Returns the labels in the parsed Scalabel format {'frames': [{'labels': [...], ...}]},
+        where every label has the fields 'id', 'category', 'attributes' and 'box2d'. See
+        LabelStore.labels() for 'geometry'.
+        '''
+        labels = self.labels(np.arange(len(self)), geometry=geometry)
+        return {'frames': [{'labels': labels[self.frame_offsets[i]:self.frame_offsets[i + 1]], **fields}
+                           for i, fields in enumerate(self.frames)]}
+
+    def labels(self, indices, geometry: bool = False) -> list:
+        '''
+        Returns the labels at the given row indices as Scalabel label dicts. With 'geometry'
+        set to True, 'box2d' also holds the stored 'area' and 'center', in the format of
+        GroupingsDefiner._calculate_boundingbox_areas() / _calculate_centers().
+        '''
+        indices = np.asarray(indices, dtype=np.int64)
+        ids = [self.ids[code] for code in self.object_id[indices].tolist()]
+        categories = [self.categories[code] for code in self.category[indices].tolist()]
+        boxes = zip(*(getattr(self, field)[indices].tolist() for field in _BOX_FIELDS))
+        attributes = [{} for _ in range(len(indices))]
+        for attribute, codes in self.attributes.items():
+            states = self.attribute_states[attribute]
+            for k, code in enumerate(codes[indices].tolist()):
+                if code != _MISSING:
+                    attributes[k][attribute] = states[code]
+        labels = [{'id': i, 'category': c, 'attributes': a, 'box2d': dict(zip(_BOX_FIELDS, b))}
+                  for i, c, a, b in zip(ids, categories, attributes, boxes)]
+        if geometry:
+            for label, area, center in zip(labels, self.area[indices].tolist(), self.center[indices].tolist()):
+                label['box2d']['area'] = area
+                label['box2d']['center'] = tuple(center)
+        return labels
+
+    def save(self, folder_path: str):
+        '''
+        Saves the store to a folder, one .npy file per array plus a JSON file with the
+        string tables and frame fields. See LabelStore.load().
+        '''
+        os.makedirs(folder_path, exist_ok=True)
+        for field in _ARRAY_FIELDS:
+            np.save(os.path.join(folder_path, f"{field}.npy"), getattr(self, field))
+        attribute_names = list(self.attributes)
+        for k, attribute in enumerate(attribute_names):
+            np.save(os.path.join(folder_path, f"attribute_{k}.npy"), self.attributes[attribute])
+        tables = {'ids': self.ids, 'categories': self.categories, 'frames': self.frames,
+                  'attributes': attribute_names, 'attribute_states': [self.attribute_states[a] for a in attribute_names]}
+        with open(os.path.join(folder_path, _TABLES_FILE), "w") as file:
+            json.dump(tables, file)
+
+    @classmethod
+    def load(cls, folder_path: str, mmap_mode: str = 'r'):
+        '''
+        Loads a store saved with LabelStore.save(). By default the arrays are memory-mapped
+        read-only, so only the pages that are used are read from disk.
+        '''
+        store = cls()
+        for field in _ARRAY_FIELDS:
+            setattr(store, field, np.load(os.path.join(folder_path, f"{field}.npy"), mmap_mode=mmap_mode))
+        with open(os.path.join(folder_path, _TABLES_FILE), "r") as file:
+            tables = json.load(file)
+        store.ids, store.categories, store.frames = tables['ids'], tables['categories'], tables['frames']
+        store.attributes = {attribute: np.load(os.path.join(folder_path, f"attribute_{k}.npy"), mmap_mode=mmap_mode)
+                            for k, attribute in enumerate(tables['attributes'])}
+        store.attribute_states = dict(zip(tables['attributes'], tables['attribute_states']))
+        return store
+
+    def frame_slice(self, frame: int) -> slice:
+        '''
+        Returns the slice with the rows of a frame.
+        '''
+        return slice(int(self.frame_offsets[frame]), int(self.frame_offsets[frame + 1]))
+
+    def select_category(self, category: str):
+        '''
+        Returns a new LabelStore with the labels of one category. All frames are kept,
+        frames without labels of the category are left empty.
+        '''
+        if category not in self.categories:
+            return self.select(np.zeros(len(self), dtype=bool))
+        return self.select(self.category == self.categories.index(category))
+
+    def select(self, mask: np.ndarray):
+        '''
+        Returns a new LabelStore with the rows where 'mask' is True. All frames are kept.
+        '''
+        store = LabelStore()
+        store.frame_index = self.frame_index[mask]
+        counts = np.bincount(store.frame_index, minlength=self.num_frames)
+        store.frame_offsets = np.zeros(self.num_frames + 1, dtype=np.int64)
+        np.cumsum(counts, out=store.frame_offsets[1:])
+        for field in ('object_id', 'category', 'x1', 'y1', 'x2', 'y2', 'area', 'center'):
+            setattr(store, field, getattr(self, field)[mask])
+        store.attributes = {attribute: codes[mask] for attribute, codes in self.attributes.items()}
+        store.frames = self.frames
+        store.ids = self.ids
+        store.categories = self.categories
+        store.attribute_states = self.attribute_states
+        return store
+
+    def attribute_codes(self, attribute: str, state) -> tuple:
+        '''
+        Returns the (codes array, state code) pair used to test an attribute state on the
+        whole store, e.g. codes == code. The code is -2 if the state never occurs.
+        '''
+        codes = self.attributes.get(attribute, np.full(len(self), _MISSING, dtype=np.int16))
+        states = self.attribute_states.get(attribute, [])
+        return codes, states.index(state) if state in states else -2
+
+    @property
+    def num_frames(self) -> int:
+        return len(self.frame_offsets) - 1
+
+    def __len__(self) -> int:
+        return len(self.x1)
+
+    def _calculate_geometry(self):
+        # Same box math as GroupingsDefiner._calculate_boundingbox_areas() / _calculate_centers().
+        w, h = self.x2 - self.x1, self.y2 - self.y1
+        self.area = w * h
+        self.center = np.stack((self.x1 + 0.5 * w, self.y1 + 0.5 * h), axis=1)
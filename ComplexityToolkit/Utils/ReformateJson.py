@@ -1,4 +1,5 @@
 import json
+from . import JsonStream
 
 # CONSTANTS
 LABEL_CONFIG_STANDARD_V1 = {"attributes": [{"name": "Occluded", "type": "switch", "tag": "O"},
@@ -11,6 +12,7 @@ LABEL_CONFIG_STANDARD_V1 = {"attributes": [{"name": "Occluded", "type": "switch"
 VEHICLES = ["car","bus","truck", "train", "trailer", "other vehicle", "motorcycle", "bicycle"]
 PEDESTRIANS = ["pedestrian", "other person"]
 OTHERS = ["dog", "rider", "traffic sign", "traffic light"]
+CATEGORY_MAP_STANDARD_V1 = {**{category: "vehicle" for category in VEHICLES}, **{category: "pedestrian" for category in PEDESTRIANS}}
 
 
 # replace config to our standard config we are using
@@ -20,37 +22,142 @@ def replace_config(data):
 
 # change the categories to our categories we have in our config. If set attributes to true also clean the attributes already on
 def change_categories_attributes(data,attributes = False):
-    for i, frame_data in enumerate(data['frames']):
-        indices_to_remove = []
-        for j in range(len(frame_data['labels'])):
-            if frame_data['labels'][j]['category'] in VEHICLES or "vehicle" in frame_data['labels'][j]['category']:
-                frame_data['labels'][j]['category'] = "vehicle"
-            elif frame_data['labels'][j]['category'] in PEDESTRIANS or "pedestrian" in frame_data['labels'][j]['category']:
-                frame_data['labels'][j]['category'] = "pedestrian"
-            else:
-                indices_to_remove.append(j)
-            if attributes:
-                frame_data['labels'][j]['attributes'] = {}
-        frame_data['labels'] = [frame_data['labels'][j] for j in range(len(frame_data['labels'])) if j not in indices_to_remove]
-        data['frames'][i] = frame_data
-
-    return data
+    return transform_frames(data, category_map=CATEGORY_MAP_STANDARD_V1, attributes=attributes)
 
 
 def delete_frames(data: dict, delframes: list) -> dict:
-    for i in delframes:
-        del data['frames'][i]
-    return data
+    return transform_frames(data, drop_frames=delframes)
 
 
 def start_frame(data: dict, startframe: int) -> dict:
-    for i in range(startframe):
-        del data['frames'][i]
-    return data
+    return transform_frames(data, start_frame=startframe)
 
 
 def sort_frames(data: dict) -> dict:
-    frames = data['frames']
-    frames = sorted(frames, key=lambda d: d['name']) 
-    data['frames'] = frames
-    return data
\ No newline at end of file
+    return transform_frames(data, sort=True)
+
+
+def transform_frames(data: dict, category_map: dict = None, attributes: bool = False, drop_frames=(),
+                     start_frame: int = 0, sort: bool = False, in_place: bool = True) -> dict:
+    '''
+    Applies a set of label/frame transformations to a Scalabel export in a single pass
+    over its frames:\n
+    'category_map': {category: new category}. Categories that are not in the map, and do
+    not contain any of the new category names (e.g. "small vehicle"), are removed.
+    None keeps all categories.\n
+    'attributes': reset the attributes of every label to {}.\n
+    'drop_frames': indices of frames to remove. Negative indices count from the end, and
+    indices out of range raise an IndexError, as with del data['frames'][i].\n
+    'start_frame': remove all frames before this index.\n
+    'sort': sort the remaining frames by 'name'.
+
+    Notes
+    -----
+    Frame indices refer to the order of the frames before any frame is removed. With
+    'in_place' set to False, 'data' is left untouched and new frame and label dicts are
+    returned.
+    '''
+    frames = list(iter_transform_frames(data['frames'], category_map=category_map, attributes=attributes,
+                                        drop_frames=drop_frames, start_frame=start_frame, in_place=in_place))
+    if sort:
+        frames.sort(key=lambda d: d['name'])
+    if in_place:
+        data['frames'] = frames
+        return data
+    return {**data, 'frames': frames}
+
+
+def iter_transform_frames(frames, category_map: dict = None, attributes: bool = False, drop_frames=(),
+                          start_frame: int = 0, in_place: bool = True):
+    '''
+    Streaming version of transform_frames() (without sorting). Yields the transformed
+    frames of any iterable of Scalabel frames, e.g. JsonStream.iter_array_items().
+
+    Notes
+    -----
+    Negative 'drop_frames' indices need the number of frames, so they are only allowed
+    when 'frames' has a length (e.g. a list); otherwise they raise a ValueError. An index
+    beyond the last frame raises an IndexError once the frames are exhausted.
+    '''
+    drop_frames = _drop_indices(drop_frames, num_frames=len(frames) if hasattr(frames, '__len__') else None)
+    i = -1
+    remap = _category_lookup(category_map) if category_map is not None else None
+    for i, frame_data in enumerate(frames):
+        if i < start_frame or i in drop_frames:
+            continue
+        labels = []
+        for label in frame_data['labels']:
+            category = remap(label['category']) if remap else label['category']
+            if category is None:
+                continue
+            if not in_place:
+                label = dict(label)
+            label['category'] = category
+            if attributes:
+                label['attributes'] = {}
+            labels.append(label)
+        if not in_place:
+            frame_data = dict(frame_data)
+        frame_data['labels'] = labels
+        yield frame_data
+    if drop_frames and max(drop_frames) > i:
+        raise IndexError(f"Frame index {max(drop_frames)} is out of range for {i + 1} frames.")
+
+
+def transform_json_file(input_path: str, output_path: str, config: dict = None, sort: bool = False, **kwargs):
+    '''
+    Streams a Scalabel export from 'input_path' to 'output_path', applying the
+    transformations of transform_frames() (see 'kwargs') to one frame at a time.
+    'config' replaces the label config (e.g. LABEL_CONFIG_STANDARD_V1).
+
+    Notes
+    -----
+    With 'sort' set to True, the transformed frames are kept in memory until the end of
+    the 'frames' array so they can be sorted.
+    '''
+    with open(input_path, "r") as input_file, open(output_path, "w") as output_file:
+        reader = JsonStream.JsonStreamReader(input_file)
+        output_file.write("{")
+        for n, key in enumerate(reader.iter_object_keys()):
+            output_file.write(f"{', ' if n else ''}{json.dumps(key)}: ")
+            if key != 'frames':
+                value = reader.decode()
+                json.dump(config if key == 'config' and config is not None else value, output_file)
+                continue
+            frames = iter_transform_frames(reader.iter_array(), **kwargs)
+            if sort:
+                frames = sorted(frames, key=lambda d: d['name'])
+            output_file.write("[")
+            for m, frame_data in enumerate(frames):
+                output_file.write(", " if m else "")
+                json.dump(frame_data, output_file)
+            output_file.write("]")
+        output_file.write("}")
+
+
+def _drop_indices(drop_frames, num_frames: int = None) -> set:
+    # Frame indices as non-negative positions, checked against 'num_frames' when it is known.
+    indices = set()
+    for i in drop_frames:
+        if num_frames is not None:
+            if not -num_frames <= i < num_frames:
+                raise IndexError(f"Frame index {i} is out of range for {num_frames} frames.")
+            i %= num_frames
+        elif i < 0:
+            raise ValueError(f"'drop_frames': {i} is not allowed for a stream of frames. "
+                             "Allowed values are non-negative indices.")
+        indices.add(i)
+    return indices
+
+
+def _category_lookup(category_map: dict):
+    # Hashed lookup with a fallback on the new category names as substrings. Every
+    # category string is resolved once and then cached.
+    cache = dict(category_map)
+    targets = list(dict.fromkeys(category_map.values()))
+
+    def remap(category):
+        if category not in cache:
+            cache[category] = next((target for target in targets if target in category), None)
+        return cache[category]
+    return remap
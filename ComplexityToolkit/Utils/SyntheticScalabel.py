@@ -0,0 +1,146 @@
+import json
+import numpy as np
+from . import LabelParser
+
+
+# CONSTANTS.
+SPEED_STATES = ("Slow", "Moderate", "Fast", "VeryFast")
+DIRECTION_STATES = ("UL", "U", "UR", "L", "NA", "R", "DL", "D", "DR")
+DEFAULT_CATEGORIES = {'vehicle': 0.6, 'pedestrian': 0.4}
+DEFAULT_BOX_SIZES = {'vehicle': (40.0, 160.0), 'pedestrian': (10.0, 40.0)}
+DEFAULT_ATTRIBUTES = {'Speed': {state: 1.0 for state in SPEED_STATES},
+                      'Direction': {state: 1.0 for state in DIRECTION_STATES}}
+
+
+def generate_scalabel(num_frames: int = 100, objects_per_frame: int = 50, categories: dict = None,
+                      num_clusters: int = 5, clustered_fraction: float = 0.7, cluster_spread: float = 50.0,
+                      box_sizes: dict = None, attributes: dict = None, missing_attribute_rate: float = 0.0,
+                      motion: float = 2.0, turnover: float = 0.0, window_size: tuple = (1920, 1080), seed: int = 0,
+                      url_token: str = LabelParser._URL_TOKEN_STANDARD_LOCAL, video_name: str = "synthetic") -> dict:
+    '''
+    Generates a synthetic sequence in the Scalabel export format ({'frames': [...],
+    'config': {...}, 'groups': []}), readable by LabelParser like an annotated file.
+
+    Every frame has 'objects_per_frame' labels of persistent objects (same 'id' in every
+    frame). The objects are distributed as follows:
+
+    categories: {category: weight}, drawn per object (default DEFAULT_CATEGORIES).\n
+    num_clusters, clustered_fraction, cluster_spread: 'clustered_fraction' of the objects
+    belong to one of 'num_clusters' clusters, placed normally around the cluster center
+    with a standard deviation of 'cluster_spread' pixels; the others are uniform over the window.\n
+    box_sizes: {category: (min, max)} side lengths in pixels, drawn uniformly per object (default DEFAULT_BOX_SIZES).
+    Every category of 'categories' needs an entry.\n
+    attributes: {attribute: {state: weight}}, one state drawn per object (default DEFAULT_ATTRIBUTES).
+    Each attribute is left out of a label with probability 'missing_attribute_rate'.\n
+    motion: standard deviation in pixels of the per-frame movement of clusters and objects.\n
+    turnover: fraction of the objects replaced by new objects (new ids) in every frame.
+
+    Notes
+    -----
+    The output only depends on the arguments, so 'seed' reproduces a sequence exactly.
+    Box centers stay within 'window_size'.
+    '''
+    categories = DEFAULT_CATEGORIES if categories is None else categories
+    box_sizes = DEFAULT_BOX_SIZES if box_sizes is None else box_sizes
+    attributes = DEFAULT_ATTRIBUTES if attributes is None else attributes
+    _verify_fraction(name='clustered_fraction', value=clustered_fraction)
+    _verify_fraction(name='missing_attribute_rate', value=missing_attribute_rate)
+    _verify_fraction(name='turnover', value=turnover)
+    _verify_box_sizes(categories=categories, box_sizes=box_sizes)
+    rng = np.random.default_rng(seed)
+    size = np.array(window_size, dtype=float)
+    cluster_centers = rng.uniform(0.0, 1.0, (max(num_clusters, 1), 2)) * size
+    cluster_velocities = rng.normal(0.0, motion, (max(num_clusters, 1), 2))
+    objects = _spawn_objects(rng, count=objects_per_frame, first_id=0, categories=categories, num_clusters=num_clusters,
+                             clustered_fraction=clustered_fraction, cluster_spread=cluster_spread,
+                             box_sizes=box_sizes, attributes=attributes, window=size)
+    next_id = objects_per_frame
+    frames = []
+    for f in range(num_frames):
+        if f and turnover and objects_per_frame:
+            replaced = rng.choice(objects_per_frame, size=int(round(turnover * objects_per_frame)), replace=False)
+            spawned = _spawn_objects(rng, count=len(replaced), first_id=next_id, categories=categories,
+                                     num_clusters=num_clusters, clustered_fraction=clustered_fraction,
+                                     cluster_spread=cluster_spread, box_sizes=box_sizes, attributes=attributes,
+                                     window=size)
+            for field, values in spawned.items():
+                if field == 'states':
+                    for attribute, states in values.items():
+                        objects['states'][attribute][replaced] = states
+                else:
+                    objects[field][replaced] = values
+            next_id += len(replaced)
+        # Clusters drift, and every object walks around its cluster (or freely).
+        cluster_centers = np.clip(cluster_centers + cluster_velocities, 0.0, size)
+        objects['offset'] += rng.normal(0.0, motion, objects['offset'].shape)
+        clustered = objects['cluster'] >= 0
+        centers = np.where(clustered[:, None], cluster_centers[np.maximum(objects['cluster'], 0)], 0.0) + objects['offset']
+        centers = np.clip(centers, 0.0, size)
+        frames.append(_frame(f, objects=objects, centers=centers, missing_attribute_rate=missing_attribute_rate,
+                             rng=rng, url_token=url_token, video_name=video_name))
+    config = {'categories': list(categories),
+              'attributes': [{'name': attribute, 'values': list(states)} for attribute, states in attributes.items()]}
+    return {'frames': frames, 'config': config, 'groups': []}
+
+
+def write_scalabel(file_path: str, **kwargs) -> str:
+    '''
+    Writes a generate_scalabel() sequence to a JSON file and returns the path. Keyword
+    arguments are passed on to generate_scalabel().
+    '''
+    with open(file_path, "w") as file:
+        json.dump(generate_scalabel(**kwargs), file)
+    return file_path
+
+
+def _spawn_objects(rng, count: int, first_id: int, categories: dict, num_clusters: int, clustered_fraction: float,
+                   cluster_spread: float, box_sizes: dict, attributes: dict, window: np.ndarray) -> dict:
+    # Per-object fields of 'count' new objects. Clustered objects store their offset from the
+    # cluster center, free objects their position.
+    names = list(categories)
+    category = rng.choice(len(names), size=count, p=_probabilities(categories))
+    clustered = (rng.uniform(size=count) < clustered_fraction) & (num_clusters > 0)
+    cluster = np.where(clustered, rng.integers(0, max(num_clusters, 1), size=count), -1)
+    offset = np.where(clustered[:, None], rng.normal(0.0, cluster_spread, (count, 2)),
+                      rng.uniform(0.0, 1.0, (count, 2)) * window)
+    bounds = np.array([box_sizes[name] for name in names], dtype=float).reshape(-1, 2)[category]
+    extent = rng.uniform(bounds[:, :1], bounds[:, 1:], (count, 2))
+    states = {attribute: np.array(list(distribution), dtype=object)[rng.choice(len(distribution), size=count,
+                                                                                p=_probabilities(distribution))]
+              for attribute, distribution in attributes.items()}
+    return {'id': np.arange(first_id, first_id + count), 'category': np.array(names, dtype=object)[category],
+            'cluster': cluster, 'offset': offset, 'extent': extent, 'states': states}
+
+
+def _frame(f: int, objects: dict, centers: np.ndarray, missing_attribute_rate: float, rng, url_token: str,
+           video_name: str) -> dict:
+    attribute_names = list(objects['states'])
+    missing = rng.uniform(size=(len(centers), len(attribute_names))) < missing_attribute_rate
+    corners = np.concatenate((centers - 0.5 * objects['extent'], centers + 0.5 * objects['extent']), axis=1).tolist()
+    labels = []
+    for k, (x1, y1, x2, y2) in enumerate(corners):
+        label_attributes = {attribute: objects['states'][attribute][k]
+                            for a, attribute in enumerate(attribute_names) if not missing[k, a]}
+        labels.append({'id': str(objects['id'][k]), 'category': objects['category'][k], 'attributes': label_attributes,
+                       'manualShape': True, 'box2d': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
+                       'poly2d': None, 'box3d': None})
+    name = f"{video_name}-{f:06d}.jpg"
+    return {'name': name, 'url': f"{url_token}{name}", 'videoName': video_name, 'timestamp': f,
+            'attributes': {}, 'labels': labels, 'sensor': -1}
+
+
+def _probabilities(weights: dict) -> np.ndarray:
+    values = np.array(list(weights.values()), dtype=float)
+    return values / values.sum()
+
+
+def _verify_box_sizes(categories: dict, box_sizes: dict):
+    missing = [category for category in categories if category not in box_sizes]
+    if missing:
+        raise ValueError(f"'box_sizes': no box sizes for the categories {missing}. Allowed values are "
+                         f"{{category: (min, max)}} dictionaries covering all categories {list(categories)}.")
+
+
+def _verify_fraction(name: str, value: float):
+    if not 0.0 <= value <= 1.0:
+        raise ValueError(f"'{name}': {value} is not allowed. Allowed values are within [0, 1].")
@@ -0,0 +1,60 @@
+import sys
+import time
+sys.path.append("../AdvancedHCI_project/")
+from ComplexityToolkit.Utils import LabelCache
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsDefiner as gd
+
+
+def _co_grouped_pairs(grouped_data: dict) -> set:
+    # All (frame, id, id) pairs of objects that share a group.
+    pairs = set()
+    for f, frame in enumerate(grouped_data['frames']):
+        for group in frame:
+            ids = sorted(obj['id'] for obj in group)
+            pairs.update((f, a, b) for i, a in enumerate(ids) for b in ids[i + 1:])
+    return pairs
+
+
+def _agreement(reference: set, candidate: set) -> tuple:
+    # Precision, recall and F1 of the candidate's co-grouped pairs against the reference.
+    common = len(reference & candidate)
+    precision = common / len(candidate) if candidate else 1.0
+    recall = common / len(reference) if reference else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def _timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    output = function(*args, **kwargs)
+    return output, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    file_path = sys.argv[1] if len(sys.argv) > 1 else "data/Dublin1_Annotated.json"
+    category = sys.argv[2] if len(sys.argv) > 2 else "vehicle"
+    data = LabelCache.load_parsed_data(file_path)
+
+    backends = {
+        "heuristic (pruned)": 'pruned',
+        "dbscan eps=50": gd.DensityClustering(method='dbscan', eps=50.0),
+        "dbscan eps=100": gd.DensityClustering(method='dbscan', eps=100.0),
+        "dbscan eps=100, area": gd.DensityClustering(method='dbscan', eps=100.0, area_weight=1.0),
+        "hdbscan": gd.DensityClustering(method='hdbscan'),
+    }
+
+    reference, reference_time = _timed(gd.group_category_by_position, data, category)
+    reference_pairs = _co_grouped_pairs(reference)
+    num_objects = sum(len(frame['labels']) for frame in data['frames'])
+    print(f"{file_path}: {len(data['frames'])} frames, {num_objects} labels, category '{category}'.")
+    print(f"{'backend':<24}{'time [s]':>10}{'groups':>8}{'precision':>11}{'recall':>8}{'f1':>7}")
+    for name, pairing in backends.items():
+        try:
+            grouped, elapsed = (reference, reference_time) if pairing == 'pruned' else \
+                _timed(gd.group_category_by_position, data, category, pairing=pairing)
+        except ImportError as error:
+            print(f"{name:<24}skipped ({error})")
+            continue
+        precision, recall, f1 = _agreement(reference_pairs, _co_grouped_pairs(grouped))
+        num_groups = sum(len(frame) for frame in grouped['frames'])
+        print(f"{name:<24}{elapsed:>10.3f}{num_groups:>8}{precision:>11.3f}{recall:>8.3f}{f1:>7.3f}")
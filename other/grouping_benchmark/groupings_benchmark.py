@@ -0,0 +1,211 @@
+import sys
+import json
+import time
+import argparse
+import platform
+import numpy as np
+sys.path.append("../AdvancedHCI_project/")
+from ComplexityToolkit.Utils import LabelParser, SyntheticScalabel
+from ComplexityToolkit.Utils.LabelStore import LabelStore
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsDefiner as gd
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsComplexity as gc
+from ComplexityToolkit.GroupingsAnalyzer.GroupingsModel import GroupSet
+from ComplexityToolkit.GroupingsAnalyzer.IncrementalGrouper import group_sequence_by_position
+from ComplexityToolkit.GroupingsAnalyzer.OnlineGroupings import OnlineGroupingsComplexity
+
+
+# CONSTANTS.
+STAGES = ('selection', 'pairwise', 'finalization', 'regrouping', 'centers_radii', 'gridc',
+          'store', 'store_grouping', 'store_regrouping', 'store_geometry', 'rasterize_gridc', 'incremental', 'online')
+BATCH_STAGES = ('selection', 'pairwise', 'finalization', 'regrouping', 'centers_radii', 'gridc')
+CATEGORIES = ('vehicle', 'pedestrian')
+
+
+def run_stages(parsed_data: dict, store: LabelStore, category: str, threshold: float, max_distance: float) -> dict:
+    # Runs the grouping complexity of one category stage by stage, on label dicts, on the LabelStore
+    # (GroupSet) path and with the IncrementalGrouper. Returns {stage: seconds}.
+    times = dict()
+    start = time.perf_counter()
+    frames = [gd._prepare_frame(frame_data=frame_data, category=category)['labels'] for frame_data in parsed_data['frames']]
+    times['selection'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pairs = []
+    for labels in frames:
+        areas = np.array([obj['box2d']['area'] for obj in labels], dtype=float)
+        centers = np.array([obj['box2d']['center'] for obj in labels], dtype=float).reshape(-1, 2)
+        pairs.append(gd._group_pairs_arrays(areas=areas, centers=centers, threshold=threshold, max_distance=max_distance))
+    times['pairwise'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    grouped = {'frames': [[[labels[k] for k in group] for group in gd._components_to_groups(first, second, len(labels))]
+                          for labels, (first, second) in zip(frames, pairs)]}
+    times['finalization'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    spd_groups = gd.regroup_by_attribute_states(grouped, attribute='Speed', states=list(gc.SPEED_FACTORS))
+    dir_groups = gd.regroup_by_attribute_states(grouped, attribute='Direction', states=list(gc.DIR_FACTORS))
+    times['regrouping'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for state_groups in [grouped, *spd_groups.values(), *dir_groups.values()]:
+        gd.group_geometry(state_groups)
+    times['centers_radii'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    gc.calc_gridc({category: {'pos': grouped}}, {category: spd_groups}, {category: dir_groups}, category)
+    times['gridc'] = time.perf_counter() - start
+    times.update(run_store_stages(store, category, threshold, max_distance))
+
+    start = time.perf_counter()
+    group_sequence_by_position(parsed_data, category, threshold=threshold, max_distance=max_distance)
+    times['incremental'] = time.perf_counter() - start
+    return times
+
+
+def run_store_stages(store: LabelStore, category: str, threshold: float, max_distance: float) -> dict:
+    # Same pipeline as GroupingsPipeline on the GroupSet arrays of a LabelStore. Returns {stage: seconds}.
+    times = dict()
+    start = time.perf_counter()
+    grouped = GroupSet.from_boxes(store, category).group_by_position(threshold=threshold, max_distance=max_distance)
+    times['store_grouping'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    layers = [('pos', None, gc.POS_FACTORS, grouped)]
+    for channel, attribute, factors in (('spd', 'Speed', gc.SPEED_FACTORS), ('dir', 'Direction', gc.DIR_FACTORS)):
+        layers.extend((channel, attribute, factors, state_groups) for state_groups in
+                      grouped.split_by_attribute_states(attribute=attribute, states=list(factors)).values())
+    times['store_regrouping'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    geometry = [state_groups.geometry() for _, _, _, state_groups in layers]
+    times['store_geometry'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    arrays = []
+    for (channel, attribute, factors, state_groups), (centers, radii, _) in zip(layers, geometry):
+        weights, frame_index = state_groups.weights(attribute=attribute, factors=factors)
+        arrays.append((centers, radii, weights, frame_index, np.full(len(radii), gc.GRID_CHANNELS.index(channel))))
+    centers, radii, weights, frame_index, channel = (np.concatenate(values) for values in zip(*arrays))
+    gc.rasterize_gridc(centers, radii, weights, frame_index, channel, num_frames=store.num_frames)
+    times['rasterize_gridc'] = time.perf_counter() - start
+    return times
+
+
+def run_online(parsed_data: dict, threshold: float, max_distance: float) -> float:
+    # Appends the frames one at a time to an OnlineGroupingsComplexity of all CATEGORIES. Returns seconds.
+    online = OnlineGroupingsComplexity(categories=CATEGORIES, threshold=threshold, max_distance=max_distance)
+    start = time.perf_counter()
+    for frame_data in parsed_data['frames']:
+        online.append_frame(frame_data)
+    return time.perf_counter() - start
+
+
+def benchmark(object_counts: list, num_frames: int, repeats: int, threshold: float, max_distance: float,
+              generator_params: dict) -> dict:
+    # {objects per frame: {stage: best time over the repeats, summed over CATEGORIES}}.
+    results = dict()
+    for count in object_counts:
+        raw_data = SyntheticScalabel.generate_scalabel(num_frames=num_frames, objects_per_frame=count, **generator_params)
+        best = {stage: float('inf') for stage in STAGES}
+        for _ in range(repeats):
+            parsed_data = LabelParser.parse_scalabel_json_data(raw_data)
+            totals = dict.fromkeys(STAGES, 0.0)
+            start = time.perf_counter()
+            store = LabelStore.from_scalabel(parsed_data)
+            totals['store'] = time.perf_counter() - start
+            for category in CATEGORIES:
+                for stage, seconds in run_stages(parsed_data, store, category, threshold, max_distance).items():
+                    totals[stage] += seconds
+            totals['online'] = run_online(LabelParser.parse_scalabel_json_data(raw_data), threshold, max_distance)
+            best = {stage: min(best[stage], totals[stage]) for stage in STAGES}
+        results[str(count)] = best
+        print(f"{count:>8}" + "".join(f"{best[stage] * 1e3:>17.2f}" for stage in STAGES), flush=True)
+    return results
+
+
+def scaling_exponents(results: dict) -> dict:
+    # Slope of log(time) over log(objects per frame) for every stage (1 = linear, 2 = quadratic).
+    counts = np.array([int(count) for count in results], dtype=float)
+    if len(counts) < 2:
+        return dict()
+    return {stage: float(np.polyfit(np.log(counts), np.log([max(r[stage], 1e-9) for r in results.values()]), 1)[0])
+            for stage in STAGES}
+
+
+def online_latency(results: dict, num_frames: int) -> dict:
+    # {objects per frame: (online ms per frame, ratio to the per-frame time of BATCH_STAGES)}.
+    latency = dict()
+    for count, stages in results.items():
+        batch = sum(stages[stage] for stage in BATCH_STAGES)
+        latency[count] = (stages['online'] / num_frames * 1e3, stages['online'] / batch if batch else float('inf'))
+    return latency
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    # (objects per frame, stage, ratio) of every stage that is slower than the baseline by more than 'tolerance'.
+    regressions = []
+    for count, stages in results.items():
+        for stage, seconds in stages.items():
+            reference = baseline['results'].get(count, {}).get(stage)
+            if reference and seconds > reference * (1.0 + tolerance):
+                regressions.append((count, stage, seconds / reference))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Times the groupings stages on synthetic Scalabel data.")
+    parser.add_argument("--objects", type=int, nargs='+', default=[10, 25, 50, 100, 200, 400], help="objects per frame")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--clusters", type=int, default=5)
+    parser.add_argument("--clustered-fraction", type=float, default=0.7)
+    parser.add_argument("--spread", type=float, default=50.0)
+    parser.add_argument("--missing-attributes", type=float, default=0.0)
+    parser.add_argument("--threshold", type=float, default=0.70)
+    parser.add_argument("--max-distance", type=float, default=100.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results to a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="compare the results with a baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+    parser.add_argument("--max-online-ratio", type=float, default=2.0,
+                        help="allowed online time per frame, relative to the batch grouping complexity stages")
+    args = parser.parse_args()
+
+    generator_params = {'num_clusters': args.clusters, 'clustered_fraction': args.clustered_fraction,
+                        'cluster_spread': args.spread, 'missing_attribute_rate': args.missing_attributes, 'seed': args.seed}
+    config = {'frames': args.frames, 'repeats': args.repeats, 'threshold': args.threshold,
+              'max_distance': args.max_distance, **generator_params}
+    print(f"{args.frames} frames, categories {CATEGORIES}, best of {args.repeats}. Times in ms.")
+    print(f"{'objects':>8}" + "".join(f"{stage:>17}" for stage in STAGES))
+    results = benchmark(object_counts=args.objects, num_frames=args.frames, repeats=args.repeats,
+                        threshold=args.threshold, max_distance=args.max_distance, generator_params=generator_params)
+    exponents = scaling_exponents(results)
+    if exponents:
+        print(f"{'exponent':>8}" + "".join(f"{exponents[stage]:>17.2f}" for stage in STAGES))
+    latency = online_latency(results=results, num_frames=args.frames)
+    slow_online = []
+    for count, (milliseconds, ratio) in latency.items():
+        print(f"Online: {count} objects per frame take {milliseconds:.2f} ms per frame ({ratio:.2f}x the batch stages).")
+        if ratio > args.max_online_ratio:
+            slow_online.append(count)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump({'config': config, 'machine': platform.platform(), 'python': platform.python_version(),
+                       'results': results, 'exponents': exponents, 'online_latency': latency}, file, indent=2)
+        print(f"Baseline saved to {args.save_baseline}.")
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+        if baseline.get('config') != config:
+            print(f"Warning: the baseline was recorded with a different configuration: {baseline.get('config')}.")
+        regressions = compare(results=results, baseline=baseline, tolerance=args.tolerance)
+        for count, stage, ratio in regressions:
+            print(f"Regression: '{stage}' with {count} objects per frame is {ratio:.2f}x slower than the baseline.")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare} (tolerance {args.tolerance:.0%}).")
+    if slow_online:
+        print(f"Online updates are slower than {args.max_online_ratio:.2f}x the batch stages for {slow_online} objects per frame.")
+        sys.exit(1)
@@ -70,44 +70,16 @@ if __name__ == "__main__":
     }
 
     # Spd
-    spd_groupings = {
-        "vehicle" : {
-        "slow" : gd.regroup_by_attribute_state(pos_groupings['vehicle']['pos'],attribute="Speed",state="Slow"),
-        "moderate" : gd.regroup_by_attribute_state(pos_groupings['vehicle']['pos'],attribute="Speed",state="Moderate"),
-        "fast" : gd.regroup_by_attribute_state(pos_groupings['vehicle']['pos'],attribute="Speed",state="Fast"),
-        "veryfast" : gd.regroup_by_attribute_state(pos_groupings['vehicle']['pos'],attribute="Speed",state="VeryFast"),},
-
-        "pedestrian" : {
-        "slow" : gd.regroup_by_attribute_state(pos_groupings['pedestrian']['pos'],attribute="Speed",state="Slow"),
-        "moderate" : gd.regroup_by_attribute_state(pos_groupings['pedestrian']['pos'],attribute="Speed",state="Moderate"),
-        "fast" : gd.regroup_by_attribute_state(pos_groupings['pedestrian']['pos'],attribute="Speed",state="Fast"),
-        "veryfast" : gd.regroup_by_attribute_state(pos_groupings['pedestrian']['pos'],attribute="Speed",state="VeryFast"),}
-    }
+    spd_groupings = {category: {state.lower(): groups for state, groups in
+                                gd.regroup_by_attribute_states(pos_groupings[category]['pos'], attribute="Speed",
+                                                               states=["Slow", "Moderate", "Fast", "VeryFast"]).items()}
+                     for category in pos_groupings}
 
     # Dir
-    dir_groupings = {
-        "vehicle" : {
-        "ul" : gd.regroup_by_attribute_state(pos_groupings['vehicle']['pos'],attribute="Direction",state="UL"),
-        "u" : gd.regroup_by_attribute_state(pos_groupings['vehicle']['pos'],attribute="Direction",state="U"),
-        "ur" : gd.regroup_by_attribute_state(pos_groupings['vehicle']['pos'],attribute="Direction",state="UR"),
-        "l" : gd.regroup_by_attribute_state(pos_groupings['vehicle']['pos'],attribute="Direction",state="L"),
-        "na" : gd.regroup_by_attribute_state(pos_groupings['vehicle']['pos'],attribute="Direction",state="NA"),
-        "r" : gd.regroup_by_attribute_state(pos_groupings['vehicle']['pos'],attribute="Direction",state="R"),
-        "dl" : gd.regroup_by_attribute_state(pos_groupings['vehicle']['pos'],attribute="Direction",state="DL"),
-        "d" : gd.regroup_by_attribute_state(pos_groupings['vehicle']['pos'],attribute="Direction",state="D"),
-        "dr" : gd.regroup_by_attribute_state(pos_groupings['vehicle']['pos'],attribute="Direction",state="DR"),},
-
-        "pedestrian" : {
-        "ul" : gd.regroup_by_attribute_state(pos_groupings['pedestrian']['pos'],attribute="Direction",state="UL"),
-        "u" : gd.regroup_by_attribute_state(pos_groupings['pedestrian']['pos'],attribute="Direction",state="U"),
-        "ur" : gd.regroup_by_attribute_state(pos_groupings['pedestrian']['pos'],attribute="Direction",state="UR"),
-        "l" : gd.regroup_by_attribute_state(pos_groupings['pedestrian']['pos'],attribute="Direction",state="L"),
-        "na" : gd.regroup_by_attribute_state(pos_groupings['pedestrian']['pos'],attribute="Direction",state="NA"),
-        "r" : gd.regroup_by_attribute_state(pos_groupings['pedestrian']['pos'],attribute="Direction",state="R"),
-        "dl" : gd.regroup_by_attribute_state(pos_groupings['pedestrian']['pos'],attribute="Direction",state="DL"),
-        "d" : gd.regroup_by_attribute_state(pos_groupings['pedestrian']['pos'],attribute="Direction",state="D"),
-        "dr" : gd.regroup_by_attribute_state(pos_groupings['pedestrian']['pos'],attribute="Direction",state="DR"),}
-    }
+    dir_groupings = {category: {state.lower(): groups for state, groups in
+                                gd.regroup_by_attribute_states(pos_groupings[category]['pos'], attribute="Direction",
+                                                               states=["UL", "U", "UR", "L", "NA", "R", "DL", "D", "DR"]).items()}
+                     for category in pos_groupings}
 
     frame_complexities = calc_framesc_groupings(pos_groupings,spd_groupings,dir_groupings)
 
@@ -0,0 +1,54 @@
+import copy
+import numpy as np
+import pytest
+from ComplexityToolkit.Utils import LabelParser, SyntheticScalabel
+from ComplexityToolkit.Utils.LabelStore import LabelStore
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsDefiner as gd
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsComplexity as gc
+
+
+CATEGORIES = ('vehicle', 'pedestrian')
+GROUP_DISTANCE = 0.05
+
+
+@pytest.fixture
+def make_sequence():
+    # Small parsed SyntheticScalabel sequences. Grouping adds 'area' and 'center' to the
+    # labels, so every call returns a fresh copy.
+    def make(num_frames: int = 12, objects_per_frame: int = 40, **kwargs) -> dict:
+        kwargs.setdefault('missing_attribute_rate', 0.1)
+        raw_data = SyntheticScalabel.generate_scalabel(num_frames=num_frames, objects_per_frame=objects_per_frame, **kwargs)
+        return copy.deepcopy(LabelParser.parse_scalabel_json_data(raw_data))
+    return make
+
+
+@pytest.fixture
+def scalabel_file(tmp_path):
+    # Writes a SyntheticScalabel export and returns its path.
+    def write(name: str = "labels.json", **kwargs) -> str:
+        kwargs.setdefault('num_frames', 10)
+        kwargs.setdefault('objects_per_frame', 30)
+        return SyntheticScalabel.write_scalabel(str(tmp_path / name), **kwargs)
+    return write
+
+
+def assert_stores_equal(a: LabelStore, b: LabelStore):
+    for field in ('frame_offsets', 'frame_index', 'object_id', 'category', 'x1', 'y1', 'x2', 'y2', 'area', 'center'):
+        assert np.array_equal(getattr(a, field), getattr(b, field)), field
+    assert a.attributes.keys() == b.attributes.keys()
+    assert all(np.array_equal(a.attributes[name], b.attributes[name]) for name in a.attributes)
+    assert (a.ids, a.categories, a.attribute_states, a.frames) == (b.ids, b.categories, b.attribute_states, b.frames)
+
+
+def dict_groups(parsed_data: dict) -> tuple:
+    # (pos_groups, spd_groups, dir_groups) of CATEGORIES as label dicts, the input of the
+    # GroupingsComplexity functions.
+    pos_groups, spd_groups, dir_groups = dict(), dict(), dict()
+    for category in CATEGORIES:
+        grouped = gd.group_category_by_position(copy.deepcopy(parsed_data), category, max_distance=GROUP_DISTANCE)
+        pos_groups[category] = {'pos': grouped}
+        spd_groups[category] = {state.lower(): groups for state, groups in
+                                gd.regroup_by_attribute_states(grouped, 'Speed', list(gc.SPEED_FACTORS)).items()}
+        dir_groups[category] = {state.lower(): groups for state, groups in
+                                gd.regroup_by_attribute_states(grouped, 'Direction', list(gc.DIR_FACTORS)).items()}
+    return pos_groups, spd_groups, dir_groups
@@ -0,0 +1,95 @@
+import os
+import pytest
+from ComplexityToolkit.Utils import DirectoryParser
+
+
+def _write(path, text: str = "x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(text)
+
+
+def _expected(folder_path, pattern_suffix: str = "", recursive: bool = True) -> dict:
+    # Reference index built with os.walk().
+    index = dict()
+    for root, dirs, files in os.walk(folder_path):
+        for name in files:
+            if name.endswith(pattern_suffix) and name != DirectoryParser._MANIFEST_NAME:
+                stat = os.stat(os.path.join(root, name))
+                index[os.path.join(root, name)] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        if not recursive:
+            break
+    return index
+
+
+@pytest.fixture
+def frames_folder(tmp_path):
+    folder = tmp_path / "frames"
+    for k in range(5):
+        _write(str(folder / f"frame_{k}.jpg"))
+        _write(str(folder / "sub" / f"frame_{k}.png"))
+    _write(str(folder / "sub" / "deeper" / "labels.json"))
+    return str(folder)
+
+
+@pytest.mark.parametrize("recursive", [False, True])
+def test_index_matches_walk(frames_folder, recursive):
+    assert DirectoryParser.index_directory(frames_folder, recursive=recursive) == _expected(frames_folder,
+                                                                                           recursive=recursive)
+    assert DirectoryParser.index_directory(frames_folder, pattern="*.png", recursive=recursive) == \
+        _expected(frames_folder, pattern_suffix=".png", recursive=recursive)
+
+
+def test_rescan_picks_up_changes(frames_folder):
+    DirectoryParser.index_directory(frames_folder, recursive=True)
+    assert os.path.isfile(os.path.join(frames_folder, DirectoryParser._MANIFEST_NAME))
+    os.remove(os.path.join(frames_folder, "frame_0.jpg"))
+    _write(os.path.join(frames_folder, "sub", "frame_9.png"))
+    # Overwritten in place in a folder that also changed.
+    _write(os.path.join(frames_folder, "sub", "frame_1.png"), "longer contents")
+    assert DirectoryParser.index_directory(frames_folder, recursive=True) == _expected(frames_folder)
+
+
+def test_verify_restats_unchanged_folders(frames_folder):
+    DirectoryParser.index_directory(frames_folder)
+    file_path = os.path.join(frames_folder, "frame_2.jpg")
+    _write(file_path, "overwritten in place")
+    assert DirectoryParser.index_directory(frames_folder, verify=True)[file_path]['size'] == os.path.getsize(file_path)
+
+
+def test_manifest_is_never_listed(frames_folder):
+    DirectoryParser.index_directory(frames_folder)
+    assert DirectoryParser._MANIFEST_NAME not in {os.path.basename(path) for path in
+                                                  DirectoryParser.index_directory(frames_folder)}
+    assert DirectoryParser._MANIFEST_NAME not in {os.path.basename(path) for path in
+                                                  DirectoryParser.parse_directory(frames_folder)}
+
+
+def test_shared_manifest_is_keyed_on_the_folder(tmp_path, frames_folder):
+    other_folder = str(tmp_path / "other")
+    _write(os.path.join(other_folder, "frame_0.jpg"), "other")
+    manifest_path = str(tmp_path / "manifest.json")
+    assert DirectoryParser.index_directory(frames_folder, manifest_path=manifest_path) == \
+        _expected(frames_folder, recursive=False)
+    # Same folder mtime, so only the folder path tells the listings apart.
+    mtime = os.stat(frames_folder).st_mtime_ns
+    os.utime(other_folder, ns=(mtime, mtime))
+    assert DirectoryParser.index_directory(other_folder, manifest_path=manifest_path) == _expected(other_folder)
+    assert DirectoryParser.index_directory(frames_folder, recursive=True, manifest_path=manifest_path) == \
+        _expected(frames_folder)
+
+
+def test_unwritable_manifest_is_not_fatal(tmp_path, frames_folder):
+    manifest_path = str(tmp_path / "missing" / "manifest.json")
+    assert DirectoryParser.index_directory(frames_folder, manifest_path=manifest_path) == \
+        _expected(frames_folder, recursive=False)
+    assert not os.path.exists(manifest_path)
+
+
+def test_natural_order():
+    paths = {"frame_10.jpg", "frame_9.jpg", "frame_1.jpg"}
+    assert DirectoryParser.order_parsed_files(paths, natural=True) == ["frame_1.jpg", "frame_9.jpg", "frame_10.jpg"]
+    assert DirectoryParser.order_parsed_files(paths, order_type='descending') == ["frame_9.jpg", "frame_10.jpg",
+                                                                                  "frame_1.jpg"]
+    with pytest.raises(ValueError):
+        DirectoryParser.order_parsed_files(paths, order_type='random')
@@ -0,0 +1,116 @@
+import sys
+import types
+import importlib
+import numpy as np
+import pytest
+from PIL import Image
+from ComplexityToolkit.Utils import FrameSegmenter
+
+
+@pytest.fixture
+def frame():
+    pixels = np.random.default_rng(0).integers(0, 256, (107, 203, 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+@pytest.mark.parametrize("num_segments", [(1, 1), (3, 4), (10, 20)])
+def test_array_segments_match_pil_segments(frame, num_segments):
+    expected = FrameSegmenter.segment_frame(frame, num_segments=num_segments)
+    segments = FrameSegmenter.segment_frame_array(frame, num_segments=num_segments)
+    assert segments.keys() == expected.keys()
+    for key, segment in segments.items():
+        assert np.array_equal(segment['image'], np.asarray(expected[key]['image']))
+        assert (segment['top'], segment['left'], segment['width']) == \
+            (expected[key]['top'], expected[key]['left'], expected[key]['width'])
+        assert segment['height'] == segment['image'].shape[0]
+
+
+def test_array_segments_are_read_only_views(frame):
+    array = np.asarray(frame).copy()
+    for segment in FrameSegmenter.segment_frame_array(array, num_segments=(3, 4)).values():
+        assert np.shares_memory(segment['image'], array)
+        assert not segment['image'].flags.writeable
+    assert array.flags.writeable
+
+
+@pytest.mark.parametrize("remainder", ['last', 'spread'])
+def test_remainder_covers_the_whole_frame(frame, remainder):
+    array = np.asarray(frame)
+    segments = FrameSegmenter.segment_frame_array(array, num_segments=(4, 6), remainder=remainder)
+    covered = np.zeros(array.shape[:2], dtype=int)
+    for segment in segments.values():
+        covered[segment['top']:segment['top'] + segment['height'], segment['left']:segment['left'] + segment['width']] += 1
+        assert segment['image'].shape[:2] == (segment['height'], segment['width'])
+    assert (covered == 1).all()
+    with pytest.raises(ValueError):
+        FrameSegmenter.segment_frame_array(array, num_segments=(4, 6), remainder='pad')
+
+
+def test_strided_segments_match_array_segments(frame):
+    cells, geometry = FrameSegmenter.segment_frame_strided(frame, num_segments=(3, 4))
+    segments = FrameSegmenter.segment_frame_array(frame, num_segments=(3, 4))
+    for (i, j), segment in segments.items():
+        assert np.array_equal(cells[i, j], segment['image'])
+        assert geometry[(i, j)] == {field: segment[field] for field in ('top', 'left', 'width', 'height')}
+    assert not cells.flags.writeable
+
+
+def test_clutter_receives_contiguous_writable_segments(frame, monkeypatch):
+    # Vlc is replaced below, so the test also runs without visual_clutter installed.
+    try:
+        import visual_clutter
+    except ImportError:
+        monkeypatch.setitem(sys.modules, "visual_clutter", types.ModuleType("visual_clutter"))
+    vcf = importlib.import_module("ComplexityToolkit.ClutterAnalyzer.VCFrameAnalyzer")
+    received = []
+
+    class Vlc():
+        def __init__(self, inputImage, **kwargs):
+            received.append(inputImage)
+
+        def getClutter_FC(self, **kwargs):
+            return 0.0, None
+
+        def getClutter_SE(self, **kwargs):
+            return 0.0
+
+    monkeypatch.setattr(vcf.vc, "Vlc", Vlc, raising=False)
+    analyzer = vcf.VCFrameAnalyzer(num_segments=(3, 4))
+    analyzer.image = frame
+    analyzer.calculate_clutter()
+    assert len(received) == 12
+    assert all(image.flags.c_contiguous and image.flags.writeable for image in received)
+
+
+@pytest.fixture
+def circles():
+    rng = np.random.default_rng(1)
+    frames = [rng.integers(0, 6) for _ in range(8)]
+    centers = {'frames': [[tuple(c) for c in rng.uniform(0, 1920, (n, 2)).tolist()] for n in frames]}
+    radii = {'frames': [rng.uniform(0, 400, n).tolist() for n in frames]}
+    return centers, radii
+
+
+def test_points_within_radii_matches_loops(circles):
+    centers, radii = circles
+    points = FrameSegmenter.grid_centers()
+    expected = {'frames': [[FrameSegmenter._points_within_radius(c, r, points) for c, r in zip(frame_centers, frame_radii)]
+                           for frame_centers, frame_radii in zip(centers['frames'], radii['frames'])]}
+    assert FrameSegmenter.points_within_radii(centers, radii, points) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 8192])
+def test_csr_matches_matrix(circles, chunk_size):
+    flat_centers, flat_radii, frame_offsets = FrameSegmenter.flatten_frames(*circles)
+    assert frame_offsets[-1] == len(flat_radii)
+    points = FrameSegmenter.grid_centers(grid_dimensions=(6, 8))
+    matrix = FrameSegmenter.points_within_radii_matrix(flat_centers, flat_radii, points)
+    indptr, indices = FrameSegmenter.points_within_radii_csr(flat_centers, flat_radii, points, chunk_size=chunk_size)
+    for g in range(len(flat_radii)):
+        assert indices[indptr[g]:indptr[g + 1]].tolist() == np.flatnonzero(matrix[g]).tolist()
+
+
+def test_no_groups():
+    indptr, indices = FrameSegmenter.points_within_radii_csr(np.zeros((0, 2)), np.zeros(0), FrameSegmenter.grid_centers())
+    assert indptr.tolist() == [0] and len(indices) == 0
+    assert FrameSegmenter.points_within_radii({'frames': [[], []]}, {'frames': [[], []]}, [(1, 1)]) == {'frames': [[], []]}
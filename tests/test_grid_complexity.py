@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from ComplexityToolkit.Utils import FrameSegmenter
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsComplexity as gc
+from conftest import CATEGORIES, dict_groups
+
+
+@pytest.fixture
+def sequence(make_sequence):
+    return make_sequence(seed=21, cluster_spread=20.0, missing_attribute_rate=0.2)
+
+
+def test_gridc_tensor_matches_dict_grid(sequence):
+    groups = dict_groups(sequence)
+    grid_dimensions = (6, 8)
+    points = FrameSegmenter.grid_centers(grid_dimensions=grid_dimensions)
+    for category in CATEGORIES:
+        gridc = gc.calc_gridc(*groups, category, grid_dimensions=grid_dimensions)
+        grid = gc._calc_gridc_groupings(*groups, grid_centers=points, category=category)
+        assert len(grid['frames']) == len(gridc)
+        for frame_grid, frame_gridc in zip(grid['frames'], gridc):
+            # grid_centers() runs over the rows within each column.
+            expected = np.zeros_like(frame_gridc)
+            for p, point in enumerate(points):
+                cell = frame_grid.get(point, {})
+                expected[p % grid_dimensions[0], p // grid_dimensions[0]] = [sum(cell.get(channel, []))
+                                                                              for channel in gc.GRID_CHANNELS]
+            assert np.allclose(frame_gridc, expected)
+
+
+@pytest.mark.parametrize("reduction", ['sum', 'max', 'mean'])
+def test_gridc_reductions_match_group_cover(sequence, reduction):
+    groups = dict_groups(sequence)
+    rows, cols = 6, 8
+    points = np.array(FrameSegmenter.grid_centers(grid_dimensions=(rows, cols)), dtype=float)
+    gridc = gc.calc_gridc(*groups, 'vehicle', grid_dimensions=(rows, cols), reduction=reduction)
+    centers, radii, weights, frame_index, channel, _ = gc._grid_layers(*groups, 'vehicle', boxes=False,
+                                                                      pos_factors=gc.POS_FACTORS,
+                                                                      speed_factors=gc.SPEED_FACTORS,
+                                                                      dir_factors=gc.DIR_FACTORS)
+    for p, point in enumerate(points):
+        covers = np.hypot(*(centers - point).T) < radii
+        for f in range(len(gridc)):
+            for c in range(len(gc.GRID_CHANNELS)):
+                values = weights[covers & (frame_index == f) & (channel == c)]
+                expected = {'sum': values.sum(), 'max': values.max(initial=0.0),
+                            'mean': values.mean() if len(values) else 0.0}[reduction]
+                assert gridc[f, p % rows, p // rows, c] == pytest.approx(expected)
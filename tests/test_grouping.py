@@ -0,0 +1,168 @@
+import copy
+import functools
+import numpy as np
+import pytest
+from ComplexityToolkit.Utils.LabelStore import LabelStore
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsDefiner as gd
+from conftest import CATEGORIES
+
+
+SETTINGS = [(0.7, 100.0), (0.0, 0.05), (0.95, 0.05), (0.7, 0.01), (1.0, 100.0)]
+
+
+def _id_sets(grouped_data: dict) -> list:
+    return [sorted(sorted(obj['id'] for obj in group) for group in frame) for frame in grouped_data['frames']]
+
+
+def _components(parsed_data: dict, category: str, threshold: float, max_distance: float) -> list:
+    # Reference groups: connected components (of at least two boxes) of the dense adjacency matrix.
+    id_sets = []
+    for frame_data in parsed_data['frames']:
+        labels = [obj for obj in frame_data['labels'] if obj['category'] == category]
+        boxes = np.array([[obj['box2d'][k] for k in ('x1', 'y1', 'x2', 'y2')] for obj in labels]).reshape(-1, 4)
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        centers = 0.5 * (boxes[:, :2] + boxes[:, 2:])
+        adjacency = gd.adjacency_matrix(areas, centers, threshold=threshold, max_distance=max_distance)
+        adjacency |= adjacency.T
+        unvisited, groups = set(range(len(labels))), []
+        while unvisited:
+            stack, component = [unvisited.pop()], []
+            while stack:
+                k = stack.pop()
+                component.append(k)
+                neighbours = set(np.flatnonzero(adjacency[k]).tolist()) & unvisited
+                unvisited -= neighbours
+                stack.extend(neighbours)
+            if len(component) > 1:
+                groups.append(sorted(labels[k]['id'] for k in component))
+        id_sets.append(sorted(groups))
+    return id_sets
+
+
+def _chain_frame() -> dict:
+    # Equal boxes on a line; only neighbours group, and the pair (2, 3) links the groups
+    # {0, 3} and {1, 2}, which already exist when it is merged.
+    labels = [{'id': str(k), 'category': 'vehicle', 'attributes': {},
+               'box2d': {'x1': x, 'y1': 0.0, 'x2': x + 1.0, 'y2': 1.0}} for k, x in enumerate((0.0, 3.0, 2.0, 1.0))]
+    return {'frames': [{'labels': labels, 'url': None}]}
+
+
+@pytest.mark.parametrize("threshold, max_distance", SETTINGS)
+@pytest.mark.parametrize("category", CATEGORIES)
+def test_pruned_and_dense_pairing_match_connected_components(make_sequence, category, threshold, max_distance):
+    parsed_data = make_sequence(seed=3, cluster_spread=20.0)
+    expected = _components(parsed_data, category, threshold, max_distance)
+    for pairing in ('pruned', 'dense'):
+        grouped = gd.group_category_by_position(copy.deepcopy(parsed_data), category, threshold=threshold,
+                                                max_distance=max_distance, pairing=pairing)
+        assert _id_sets(grouped) == expected
+
+
+@pytest.mark.parametrize("threshold, max_distance", SETTINGS)
+def test_legacy_merge_matches_between_pairings(make_sequence, threshold, max_distance):
+    parsed_data = make_sequence(seed=5, cluster_spread=20.0)
+    pruned = gd.group_category_by_position(copy.deepcopy(parsed_data), 'vehicle', threshold=threshold,
+                                           max_distance=max_distance, legacy_merge=True)
+    dense = gd.group_category_by_position(copy.deepcopy(parsed_data), 'vehicle', threshold=threshold,
+                                          max_distance=max_distance, legacy_merge=True, pairing='dense')
+    assert pruned == dense
+    # Legacy groups never join boxes that are not connected.
+    components = _components(parsed_data, 'vehicle', threshold, max_distance)
+    for frame_groups, frame_components in zip(_id_sets(pruned), components):
+        for group in frame_groups:
+            assert any(set(group) <= set(component) for component in frame_components)
+
+
+def test_transitive_groups_are_merged():
+    grouped = gd.group_category_by_position(_chain_frame(), 'vehicle', max_distance=1.5)
+    assert _id_sets(grouped) == [[['0', '1', '2', '3']]]
+    legacy = gd.group_category_by_position(_chain_frame(), 'vehicle', max_distance=1.5, legacy_merge=True)
+    assert _id_sets(legacy) == [[['0', '2', '3'], ['1', '2']]]
+
+
+@pytest.mark.parametrize("legacy_merge", [False, True])
+@pytest.mark.parametrize("threshold, max_distance", SETTINGS[:3])
+def test_store_grouping_matches_label_grouping(make_sequence, threshold, max_distance, legacy_merge):
+    parsed_data = make_sequence(seed=7, cluster_spread=20.0)
+    store = LabelStore.from_scalabel(parsed_data)
+    for category in CATEGORIES:
+        expected = gd.group_category_by_position(store.to_scalabel(), category, threshold=threshold,
+                                                 max_distance=max_distance, legacy_merge=legacy_merge)
+        grouped = gd.group_store_by_position(store, category, threshold=threshold, max_distance=max_distance,
+                                             legacy_merge=legacy_merge)
+        assert gd.store_groups_to_labels(store, grouped) == expected
+
+
+@pytest.mark.parametrize("legacy_merge", [False, True])
+def test_worker_processes_give_the_same_groups(make_sequence, monkeypatch, legacy_merge):
+    # Small chunks, so the frames are spread over several tasks.
+    monkeypatch.setattr(gd, '_FRAMES_PER_TASK', 5)
+    parsed_data = make_sequence(seed=9, cluster_spread=20.0)
+    store = LabelStore.from_scalabel(parsed_data)
+    for category in CATEGORIES:
+        expected = gd.group_category_by_position(copy.deepcopy(parsed_data), category, max_distance=0.05,
+                                                 legacy_merge=legacy_merge)
+        frames = iter(copy.deepcopy(parsed_data['frames']))
+        assert gd.group_category_by_position(frames, category, max_distance=0.05, legacy_merge=legacy_merge,
+                                             workers=2) == expected
+        grouped = gd.group_store_by_position(store, category, max_distance=0.05, legacy_merge=legacy_merge,
+                                             workers=2)
+        assert gd.store_groups_to_labels(store, grouped) == \
+            gd.group_category_by_position(store.to_scalabel(), category, max_distance=0.05, legacy_merge=legacy_merge)
+
+
+def test_callable_pairing_is_used_as_backend(make_sequence):
+    parsed_data = make_sequence(seed=10, cluster_spread=20.0)
+    backend = functools.partial(gd._group_indices, threshold=0.7, max_distance=0.05)
+    expected = gd.group_category_by_position(copy.deepcopy(parsed_data), 'vehicle', max_distance=0.05)
+    # 'threshold' and 'max_distance' are left to the backend.
+    assert gd.group_category_by_position(copy.deepcopy(parsed_data), 'vehicle', max_distance=100.0,
+                                         pairing=backend) == expected
+    assert gd.group_category_by_position(copy.deepcopy(parsed_data), 'vehicle', pairing=backend, workers=2) == expected
+    with pytest.raises(ValueError):
+        gd.group_category_by_position(copy.deepcopy(parsed_data), 'vehicle', pairing='sweep')
+
+
+def test_density_clustering_arguments():
+    with pytest.raises(ValueError):
+        gd.DensityClustering(method='optics')
+    # Too few boxes to form a group; scikit-learn is not needed.
+    assert gd.DensityClustering(min_samples=3)(np.ones(2), np.zeros((2, 2))) == []
+
+
+@pytest.mark.parametrize("eps", [5.0, 40.0])
+def test_dbscan_groups_are_eps_components(make_sequence, eps):
+    # With min_samples=2 every box with a neighbour within 'eps' is a core point, so the
+    # DBSCAN clusters are the connected components of the 'eps' neighbourhood graph.
+    pytest.importorskip("sklearn")
+    parsed_data = make_sequence(seed=11, cluster_spread=20.0)
+    grouped = gd.group_category_by_position(copy.deepcopy(parsed_data), 'vehicle',
+                                            pairing=gd.DensityClustering(eps=eps))
+    expected = []
+    for frame_data in parsed_data['frames']:
+        labels = [obj for obj in frame_data['labels'] if obj['category'] == 'vehicle']
+        boxes = np.array([[obj['box2d'][k] for k in ('x1', 'y1', 'x2', 'y2')] for obj in labels]).reshape(-1, 4)
+        centers = 0.5 * (boxes[:, :2] + boxes[:, 2:])
+        reach = np.hypot(*(centers[:, None] - centers[None, :]).transpose(2, 0, 1)) <= eps
+        while True:
+            grown = (reach.astype(np.int64) @ reach.astype(np.int64)) > 0
+            if np.array_equal(grown, reach):
+                break
+            reach = grown
+        expected.append(sorted({tuple(sorted(labels[k]['id'] for k in np.flatnonzero(row))) for row in reach
+                                if np.count_nonzero(row) > 1}))
+    assert [sorted(tuple(group) for group in frame) for frame in _id_sets(grouped)] == expected
+
+
+def test_hdbscan_groups_are_disjoint_and_ordered(make_sequence):
+    pytest.importorskip("sklearn", minversion="1.3")
+    parsed_data = make_sequence(seed=12, cluster_spread=20.0)
+    backend = gd.DensityClustering(method='hdbscan', area_weight=0.5)
+    for frame_data in parsed_data['frames']:
+        boxes = np.array([[obj['box2d'][k] for k in ('x1', 'y1', 'x2', 'y2')] for obj in frame_data['labels']])
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        groups = backend(areas, 0.5 * (boxes[:, :2] + boxes[:, 2:]))
+        members = np.concatenate(groups) if groups else np.zeros(0, dtype=np.int64)
+        assert all(len(group) > 1 and np.all(np.diff(group) > 0) for group in groups)
+        assert len(np.unique(members)) == len(members)
+        assert [group[0] for group in groups] == sorted(group[0] for group in groups)
@@ -0,0 +1,94 @@
+import os
+import json
+import numpy as np
+import pytest
+from ComplexityToolkit.Utils import FrameSegmenter
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsMerger
+
+
+WINDOW_SIZE = (1920, 1080)
+GRID_DIMENSIONS = (4, 6)
+
+
+@pytest.fixture
+def clutter_file(tmp_path):
+    # VCBatchAnalyzer output with a 2 x 3 clutter grid; frame "2" has no clutter data.
+    cells = {str((row, col)): {'feature_congestion': 1.0, 'subband_entropy': -1, 'top': 540 * row, 'left': 640 * col,
+                               'width': 640, 'height': 540, 'center_xy': (640.0 * col + 320, 540.0 * row + 270)}
+             for row in range(2) for col in range(3)}
+    data = {str(frame): {'file_path': f"frame{frame}.jpg", 'clutter_data': dict(cells) if frame != 2 else None}
+            for frame in range(4)}
+    clutter = {'folder_name': "frames", 'dimensions': [2, 3], 'number_of_frames': len(data),
+               'image_width': WINDOW_SIZE[0], 'image_height': WINDOW_SIZE[1], 'data': data}
+    path = str(tmp_path / "clutter.json")
+    with open(path, "w") as file:
+        json.dump(clutter, file)
+    return path
+
+
+@pytest.fixture
+def gridc():
+    return np.random.default_rng(0).random((3, *GRID_DIMENSIONS, 3))
+
+
+def _expected(clutter_path: str, gridc: np.ndarray, reduction: str, frame_offset: int) -> dict:
+    # Reference: every grid center is tested against every cell rectangle.
+    with open(clutter_path, "r") as file:
+        clutter = json.load(file)
+    points = FrameSegmenter.grid_centers(window_size=WINDOW_SIZE, grid_dimensions=GRID_DIMENSIONS)
+    rows = GRID_DIMENSIONS[0]
+    for frame_no, frame in clutter['data'].items():
+        f = int(frame_no) + frame_offset
+        if not frame['clutter_data'] or not 0 <= f < len(gridc):
+            continue
+        for cell in frame['clutter_data'].values():
+            values = [gridc[f, p % rows, p // rows].sum() for p, (x, y) in enumerate(points)
+                      if cell['left'] <= x < cell['left'] + cell['width'] and cell['top'] <= y < cell['top'] + cell['height']]
+            if values:
+                cell['grouping_complexity'] = {'sum': sum(values), 'max': max(values),
+                                               'mean': sum(values) / len(values)}[reduction]
+    return clutter
+
+
+@pytest.mark.parametrize("reduction", ['sum', 'mean', 'max'])
+@pytest.mark.parametrize("frame_offset", [0, 1])
+def test_merged_file_matches_cell_assignment(clutter_file, gridc, tmp_path, reduction, frame_offset):
+    output_path = str(tmp_path / "merged.json")
+    GroupingsMerger.merge_grouping_complexity(clutter_file, output_path, gridc, reduction=reduction,
+                                              frame_offset=frame_offset)
+    with open(output_path, "r") as file:
+        merged = json.load(file)
+    expected = _expected(clutter_file, gridc, reduction, frame_offset)
+    assert merged.keys() == expected.keys()
+    assert {key: value for key, value in merged.items() if key != 'data'} == \
+        {key: value for key, value in expected.items() if key != 'data'}
+    for frame_no, frame in expected['data'].items():
+        assert merged['data'][frame_no].keys() == frame.keys()
+        if not frame['clutter_data']:
+            assert merged['data'][frame_no] == frame
+            continue
+        for cell, values in frame['clutter_data'].items():
+            assert merged['data'][frame_no]['clutter_data'][cell] == pytest.approx(values)
+    assert not os.path.exists(output_path + ".tmp")
+
+
+def test_saved_array_matches_array(clutter_file, gridc, tmp_path):
+    np.save(str(tmp_path / "gridc.npy"), gridc)
+    GroupingsMerger.merge_grouping_complexity(clutter_file, str(tmp_path / "from_array.json"), gridc)
+    GroupingsMerger.merge_grouping_complexity(clutter_file, str(tmp_path / "from_file.json"), str(tmp_path / "gridc.npy"))
+    with open(str(tmp_path / "from_array.json"), "r") as a, open(str(tmp_path / "from_file.json"), "r") as b:
+        assert json.load(a) == json.load(b)
+
+
+def test_failed_merge_leaves_no_partial_copy(clutter_file, tmp_path):
+    output_path = str(tmp_path / "merged.json")
+    with open(output_path, "w") as file:
+        file.write("previous")
+    with pytest.raises(ValueError):
+        # (frames, points) is not a grid.
+        GroupingsMerger.merge_grouping_complexity(clutter_file, output_path, np.zeros((3, 24)))
+    assert not os.path.exists(output_path + ".tmp")
+    with open(output_path, "r") as file:
+        assert file.read() == "previous"
+    with pytest.raises(ValueError):
+        GroupingsMerger.merge_grouping_complexity(clutter_file, output_path, np.zeros((3, 4, 6)), reduction='median')
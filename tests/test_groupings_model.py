@@ -0,0 +1,65 @@
+import copy
+import numpy as np
+import pytest
+from ComplexityToolkit.Utils.LabelStore import LabelStore
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsDefiner as gd
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsComplexity as gc
+from ComplexityToolkit.GroupingsAnalyzer.GroupingsModel import GroupSet
+from conftest import CATEGORIES, GROUP_DISTANCE, dict_groups
+
+
+def _store_groups(store: LabelStore) -> tuple:
+    # Same as dict_groups(), as GroupSets.
+    pos_groups, spd_groups, dir_groups = dict(), dict(), dict()
+    for category in CATEGORIES:
+        grouped = GroupSet.from_boxes(store, category).group_by_position(max_distance=GROUP_DISTANCE)
+        pos_groups[category] = {'pos': grouped}
+        spd_groups[category] = {state.lower(): groups for state, groups in
+                                grouped.split_by_attribute_states('Speed', list(gc.SPEED_FACTORS)).items()}
+        dir_groups[category] = {state.lower(): groups for state, groups in
+                                grouped.split_by_attribute_states('Direction', list(gc.DIR_FACTORS)).items()}
+    return pos_groups, spd_groups, dir_groups
+
+
+@pytest.fixture
+def sequence(make_sequence):
+    return make_sequence(seed=21, cluster_spread=20.0, missing_attribute_rate=0.2)
+
+
+def test_groupsets_match_label_dicts(sequence):
+    store = LabelStore.from_scalabel(sequence)
+    label_groups, store_groups = dict_groups(store.to_scalabel()), _store_groups(store)
+    for category in CATEGORIES:
+        for channel_dicts, channel_sets in zip(label_groups, store_groups):
+            assert list(channel_dicts[category]) == list(channel_sets[category])
+            for state, groups in channel_sets[category].items():
+                assert groups.to_labels() == channel_dicts[category][state]
+                assert all(np.allclose(a, b) for a, b in zip(groups.geometry(),
+                                                             gd.group_geometry(channel_dicts[category][state])))
+        assert np.allclose(gc.calc_gridc(*store_groups, category), gc.calc_gridc(*label_groups, category))
+    assert np.allclose(gc.calc_framesc_arrays(*store_groups), gc.calc_framesc_arrays(*label_groups))
+    groupings = {category: gd.group_store_by_position(store, category, max_distance=GROUP_DISTANCE)
+                 for category in CATEGORIES}
+    assert np.allclose(gc.calc_store_framesc(store, groupings), gc.calc_framesc_arrays(*label_groups))
+
+
+def test_weights_need_a_factor_for_every_state(sequence):
+    store = LabelStore.from_scalabel(sequence)
+    grouped = GroupSet.from_boxes(store, 'vehicle').group_by_position(max_distance=GROUP_DISTANCE)
+    label_groups = gd.group_category_by_position(store.to_scalabel(), 'vehicle', max_distance=GROUP_DISTANCE)
+    factors = dict(gc.SPEED_FACTORS)
+    del factors['Fast']
+    for state, state_groups in grouped.split_by_attribute_states('Speed', list(gc.SPEED_FACTORS)).items():
+        if state == 'Fast' and len(state_groups):
+            with pytest.raises(ValueError):
+                state_groups.weights(attribute='Speed', factors=factors)
+            # The label dicts have no factor for the state either.
+            with pytest.raises(KeyError):
+                gc._state_weights(gd.regroup_by_attribute_state(label_groups, 'Speed', state), attribute='Speed',
+                                  factors=factors, boxes=False)
+        elif state != 'Fast':
+            weights, _ = state_groups.weights(attribute='Speed', factors=factors)
+            assert np.array_equal(weights, state_groups.group_sizes * factors[state])
+    # Boxes without the attribute have no state, and no factor.
+    with pytest.raises(ValueError):
+        GroupSet.from_boxes(store, 'vehicle').weights(attribute='Speed', factors=gc.SPEED_FACTORS)
@@ -0,0 +1,96 @@
+import os
+import numpy as np
+import pytest
+from ComplexityToolkit.Utils import LabelParser, LabelCache
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsComplexity as gc
+from ComplexityToolkit.GroupingsAnalyzer.GroupingsPipeline import GroupingsPipeline, SPEED_STATES
+from conftest import CATEGORIES, GROUP_DISTANCE, dict_groups
+
+
+@pytest.fixture
+def pipeline_runs(monkeypatch):
+    # Records the stages that actually run (not loaded from the memo or the disk cache).
+    runs = []
+    for stage in ('parse', 'select', 'group', 'regroup', 'geometry', 'gridc', 'framesc'):
+        run = getattr(GroupingsPipeline, f"_run_{stage}")
+        monkeypatch.setattr(GroupingsPipeline, f"_run_{stage}",
+                            lambda self, *args, _run=run, _stage=stage: runs.append(_stage) or _run(self, *args))
+    return runs
+
+
+def _pickles(cache_dir: str) -> list:
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith(".pkl"))
+
+
+def test_pipeline_matches_groupings_complexity(scalabel_file, tmp_path):
+    file_name = scalabel_file(seed=41, cluster_spread=20.0, missing_attribute_rate=0.2)
+    pipeline = GroupingsPipeline(file_name, cache_dir=str(tmp_path / "cache"), max_distance=GROUP_DISTANCE)
+    framesc = pipeline.run('framesc')
+    # The LabelCache of the export is kept in 'cache_dir'.
+    assert os.path.isdir(LabelCache.sidecar_path(file_name, cache_dir=str(tmp_path / "cache")))
+    assert not os.path.exists(LabelCache.sidecar_path(file_name))
+    groups = dict_groups(LabelParser.parse_scalabel_json_data(LabelParser.read_json(file_name)))
+    assert np.allclose(framesc, gc.calc_framesc_arrays(*groups))
+    gridc = pipeline.run('gridc')
+    for category in CATEGORIES:
+        assert np.allclose(gridc[category], gc.calc_gridc(*groups, category, grid_dimensions=(10, 20)))
+        assert pipeline.run('group')[category].to_labels() == groups[0][category]['pos']
+
+
+def test_changed_parameters_only_rerun_their_stages(scalabel_file, tmp_path, pipeline_runs):
+    file_name = scalabel_file(seed=42)
+    pipeline = GroupingsPipeline(file_name, cache_dir=str(tmp_path / "cache"))
+    pipeline.run('gridc')
+    pipeline.run('framesc')
+    assert sorted(pipeline_runs) == sorted(['parse', 'select', 'group', 'regroup', 'geometry', 'gridc', 'framesc'])
+    pipeline_runs.clear()
+    pipeline.set_params(speed_factors=dict(gc.SPEED_FACTORS, VeryFast=2.0))
+    pipeline.run('gridc')
+    pipeline.run('framesc')
+    assert pipeline_runs == ['gridc', 'framesc']
+    pipeline_runs.clear()
+    pipeline.set_params(speed_states=SPEED_STATES[:2])
+    assert pipeline.stage_key('group') == GroupingsPipeline(file_name, cache_dir=str(tmp_path / "cache")).stage_key('group')
+    pipeline.run('framesc')
+    assert pipeline_runs == ['regroup', 'framesc']
+    with pytest.raises(ValueError):
+        pipeline.set_params(speed_state=SPEED_STATES)
+    with pytest.raises(ValueError):
+        pipeline.run('grid')
+
+
+def test_stage_pickles_are_reused_and_pruned(scalabel_file, tmp_path, pipeline_runs):
+    cache_dir = str(tmp_path / "cache")
+    first, second = scalabel_file("first.json", seed=43), scalabel_file("second.json", seed=44)
+    GroupingsPipeline(first, cache_dir=cache_dir).run('framesc')
+    GroupingsPipeline(second, cache_dir=cache_dir).run('framesc')
+    pickles = _pickles(cache_dir)
+    assert len(pickles) == 2 * 4
+    pipeline_runs.clear()
+    expected = GroupingsPipeline(first).run('framesc')
+    pipeline_runs.clear()
+    assert np.array_equal(GroupingsPipeline(first, cache_dir=cache_dir).run('framesc'), expected)
+    assert pipeline_runs == []
+
+    # A new threshold outdates the 'group' pickle of 'first' and everything downstream of it.
+    pipeline = GroupingsPipeline(first, cache_dir=cache_dir, threshold=0.5)
+    pipeline.run('framesc')
+    prefixes = {stage: pipeline._cache_prefix(stage) for stage in ('select', 'group', 'regroup', 'framesc')}
+    assert len(_pickles(cache_dir)) == len(pickles)
+    for stage, prefix in prefixes.items():
+        [name] = [name for name in _pickles(cache_dir) if name.startswith(prefix)]
+        assert name == os.path.basename(pipeline._cache_path(stage, pipeline.stage_key(stage)))
+    assert set(_pickles(cache_dir)).difference(pickles) == {name for name in _pickles(cache_dir)
+                                                            if name.startswith(tuple(prefixes.values()))
+                                                            and not name.startswith(prefixes['select'])}
+
+    # Touching the export changes every key.
+    os.utime(first, ns=(1, 1))
+    pipeline_runs.clear()
+    pipeline = GroupingsPipeline(first, cache_dir=cache_dir, threshold=0.5)
+    pipeline.run('framesc')
+    assert pipeline_runs == ['parse', 'select', 'group', 'regroup', 'framesc']
+    assert len(_pickles(cache_dir)) == len(pickles)
+    pipeline.clear(disk=True)
+    assert all(not name.startswith(tuple(prefixes.values())) for name in _pickles(cache_dir))
+    assert len(_pickles(cache_dir)) == 4
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from ComplexityToolkit.Utils.LabelStore import LabelStore
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsDefiner as gd
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsComplexity as gc
+from ComplexityToolkit.GroupingsAnalyzer.GroupingsSweep import GroupingSweep, sweep_grouping_parameters
+from conftest import CATEGORIES
+
+
+THRESHOLDS = (0.5, 0.7, 0.95)
+MAX_DISTANCES = (0.01, 0.05, 0.2)
+
+
+@pytest.fixture
+def store(make_sequence):
+    return LabelStore.from_scalabel(make_sequence(seed=51, cluster_spread=20.0, missing_attribute_rate=0.2))
+
+
+def test_sweep_groups_match_group_store_by_position(store):
+    sweep = GroupingSweep(store, thresholds=THRESHOLDS, max_distances=MAX_DISTANCES)
+    for threshold in THRESHOLDS + (1.0,):
+        for max_distance in MAX_DISTANCES + (0.0,):
+            for category in CATEGORIES:
+                expected = gd.group_store_by_position(store, category, threshold=threshold, max_distance=max_distance)
+                grouped = sweep.groups(category, threshold=threshold, max_distance=max_distance)
+                assert len(grouped['frames']) == len(expected['frames'])
+                for frame_groups, expected_groups in zip(grouped['frames'], expected['frames']):
+                    assert len(frame_groups) == len(expected_groups)
+                    assert all(np.array_equal(a, b) for a, b in zip(frame_groups, expected_groups))
+
+
+def test_sweep_report_matches_store_framesc(store):
+    report = GroupingSweep(store, thresholds=THRESHOLDS, max_distances=MAX_DISTANCES).run()
+    assert len(report['threshold']) == len(THRESHOLDS) * len(MAX_DISTANCES)
+    for k, (threshold, max_distance) in enumerate(zip(report['threshold'], report['max_distance'])):
+        groupings = {category: gd.group_store_by_position(store, category, threshold=threshold,
+                                                          max_distance=max_distance)
+                     for category in CATEGORIES}
+        assert report['group_counts'][k].tolist() == [sum(len(groupings[category]['frames'][f]) for category in CATEGORIES)
+                                                      for f in range(store.num_frames)]
+        assert np.allclose(report['framesc'][k], gc.calc_store_framesc(store, groupings))
+    assert report['group_counts'].any()
+
+
+def test_parsed_data_and_settings_outside_the_sweep(make_sequence, store):
+    parsed_data = make_sequence(seed=51, cluster_spread=20.0, missing_attribute_rate=0.2)
+    report = sweep_grouping_parameters(parsed_data, thresholds=THRESHOLDS[1:], max_distances=MAX_DISTANCES[:1])
+    expected = GroupingSweep(store, thresholds=THRESHOLDS[1:], max_distances=MAX_DISTANCES[:1]).run()
+    assert all(np.array_equal(report[name], expected[name]) for name in expected)
+    sweep = GroupingSweep(store, thresholds=THRESHOLDS[1:], max_distances=MAX_DISTANCES[:1])
+    for threshold, max_distance in ((THRESHOLDS[0], MAX_DISTANCES[0]), (THRESHOLDS[1], MAX_DISTANCES[1])):
+        with pytest.raises(ValueError):
+            sweep.groups('vehicle', threshold=threshold, max_distance=max_distance)
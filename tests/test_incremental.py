@@ -0,0 +1,73 @@
+import copy
+import pytest
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsDefiner as gd
+from ComplexityToolkit.GroupingsAnalyzer.IncrementalGrouper import IncrementalGrouper, group_sequence_by_position
+from conftest import CATEGORIES
+
+
+@pytest.mark.parametrize("tolerance", [0.0, 0.5, 5.0])
+@pytest.mark.parametrize("generator_params", [{'motion': 0.0}, {'motion': 2.0}, {'motion': 40.0},
+                                              {'motion': 2.0, 'turnover': 0.2}])
+@pytest.mark.parametrize("threshold, max_distance", [(0.7, 100.0), (0.7, 0.05), (0.9, 0.01)])
+def test_incremental_grouping_matches_full_grouping(make_sequence, generator_params, tolerance, threshold, max_distance):
+    parsed_data = make_sequence(seed=11, cluster_spread=20.0, **generator_params)
+    for category in CATEGORIES:
+        expected = gd.group_category_by_position(copy.deepcopy(parsed_data), category, threshold=threshold,
+                                                 max_distance=max_distance)
+        assert group_sequence_by_position(copy.deepcopy(parsed_data), category, threshold=threshold,
+                                          max_distance=max_distance, tolerance=tolerance) == expected
+
+
+def test_incremental_legacy_merge_matches_full_grouping(make_sequence):
+    parsed_data = make_sequence(seed=12, cluster_spread=20.0, turnover=0.1)
+    expected = gd.group_category_by_position(copy.deepcopy(parsed_data), 'vehicle', max_distance=0.05, legacy_merge=True)
+    assert group_sequence_by_position(copy.deepcopy(parsed_data), 'vehicle', max_distance=0.05,
+                                      legacy_merge=True) == expected
+
+
+def test_edited_frames_match_full_grouping(make_sequence):
+    # The same frame is updated again after a few boxes moved, were removed or were added.
+    parsed_data = make_sequence(num_frames=1, objects_per_frame=60, seed=13, cluster_spread=20.0)
+    frame_data = parsed_data['frames'][0]
+    grouper = IncrementalGrouper('vehicle', max_distance=0.05)
+    grouper.update(copy.deepcopy(frame_data))
+    for step in range(5):
+        labels = frame_data['labels']
+        for obj in labels[step::7]:
+            obj['box2d']['x1'] += 15.0
+            obj['box2d']['x2'] += 15.0
+        added = copy.deepcopy(labels[step])
+        added['id'] = f"added-{step}"
+        frame_data['labels'] = labels[1:] + [added]
+        expected = gd.group_category_by_position({'frames': [copy.deepcopy(frame_data)]}, 'vehicle', max_distance=0.05)
+        assert grouper.update(copy.deepcopy(frame_data)) == expected['frames'][0]
+    assert grouper.stats['carried_pairs'] > 0
+
+
+def test_reset_forgets_previous_frames(make_sequence):
+    parsed_data = make_sequence(num_frames=3, seed=14)
+    grouper = IncrementalGrouper('pedestrian')
+    for frame_data in copy.deepcopy(parsed_data['frames']):
+        grouper.update(frame_data)
+    grouper.reset()
+    expected = gd.group_category_by_position(copy.deepcopy(parsed_data), 'pedestrian')['frames'][0]
+    assert grouper.update(copy.deepcopy(parsed_data['frames'][0])) == expected
+
+
+def test_duplicate_ids_keep_the_carried_pairs(make_sequence):
+    parsed_data = make_sequence(num_frames=4, objects_per_frame=60, seed=15, cluster_spread=20.0, motion=0.0)
+    frames = parsed_data['frames']
+    duplicated = copy.deepcopy(frames[1])
+    vehicles = [obj for obj in duplicated['labels'] if obj['category'] == 'vehicle']
+    vehicles[1]['id'] = vehicles[0]['id']
+    sequence = {'frames': [frames[0], duplicated, frames[1], frames[2], frames[3]]}
+    expected = gd.group_category_by_position(copy.deepcopy(sequence), 'vehicle', max_distance=0.05)
+    grouper = IncrementalGrouper('vehicle', max_distance=0.05)
+    grouper.update(copy.deepcopy(frames[0]))
+    carried = grouper.stats['carried_pairs']
+    assert grouper.update(copy.deepcopy(duplicated)) == expected['frames'][1]
+    assert grouper.stats['carried_pairs'] == carried
+    assert [grouper.update(copy.deepcopy(frame_data)) for frame_data in frames[1:]] == expected['frames'][2:]
+    assert grouper.stats['carried_pairs'] > carried
+    assert set(grouper._codes) == {obj['id'] for frame_data in frames for obj in frame_data['labels']
+                                   if obj['category'] == 'vehicle'}
@@ -0,0 +1,48 @@
+import io
+import json
+import pytest
+from ComplexityToolkit.Utils import LabelParser
+from ComplexityToolkit.Utils.JsonStream import JsonStreamReader, iter_array_items
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsDefiner as gd
+
+
+DOCUMENT = {
+    'config': {'numbers': [0, -1, 12.5, -0.25, 1e10, 2.5E-3, -7e+2, 123456789012345678901234567890], 'flag': True},
+    'frames': [1.5, -2, 3e-2, 1234.5678, -0.001, 6E+5, True, False, None, "a, \"b\" [c] {d} é", [], {},
+               {'box2d': {'x1': 10.25, 'y1': -3.5e1, 'x2': 1200.0, 'y2': 1e3}, 'labels': [[1, 2.75], {'k': -9.5e-5}]},
+               987654.321],
+    'groups': [],
+    # Many fractions and exponents, so that every chunk size cuts some number after '.', 'e', '+' or '-'.
+    'series': [k * 1.0625e-3 - 7.5 for k in range(200)] + [(-1)**k * 1.5 * 10.0**(k % 40 - 20) for k in range(120)],
+}
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 33))
+def test_every_chunk_size_decodes_the_document(chunk_size):
+    text = json.dumps(DOCUMENT, indent=1)
+    assert list(iter_array_items(io.StringIO(text), 'frames', chunk_size=chunk_size)) == DOCUMENT['frames']
+    assert list(iter_array_items(io.StringIO(text), 'series', chunk_size=chunk_size)) == DOCUMENT['series']
+    reader = JsonStreamReader(io.StringIO(json.dumps(DOCUMENT)), chunk_size=chunk_size)
+    assert reader.decode() == DOCUMENT
+    assert reader.peek() == ''
+
+
+@pytest.mark.parametrize("text", ['[1.5 2]', '[1e', '[-]', '{"a" 1}'])
+def test_invalid_documents_raise(text):
+    with pytest.raises(ValueError):
+        list(JsonStreamReader(io.StringIO(text), chunk_size=2).iter_array() if text[0] == '[' else
+             iter_array_items(io.StringIO(text), 'a', chunk_size=2))
+
+
+def test_streaming_parse_matches_full_parse(scalabel_file):
+    file_name = scalabel_file(missing_attribute_rate=0.2, seed=1)
+    parsed_data = LabelParser.parse_scalabel_json_data(LabelParser.read_json(file_name))
+    assert list(LabelParser.iter_scalabel_frames(file_name)) == parsed_data['frames']
+
+
+def test_streaming_grouping_matches_full_grouping(scalabel_file):
+    file_name = scalabel_file(seed=2, cluster_spread=20.0)
+    parsed_data = LabelParser.parse_scalabel_json_data(LabelParser.read_json(file_name))
+    for category in ('vehicle', 'pedestrian'):
+        streamed = gd.group_category_by_position(LabelParser.iter_scalabel_frames(file_name), category, max_distance=0.05)
+        assert streamed == gd.group_category_by_position(parsed_data, category, max_distance=0.05)
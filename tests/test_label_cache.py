@@ -0,0 +1,47 @@
+import os
+import copy
+from ComplexityToolkit.Utils import LabelParser, LabelCache
+from ComplexityToolkit.Utils.LabelStore import LabelStore
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsDefiner as gd
+from conftest import assert_stores_equal
+
+
+def _parse_with_geometry(file_name: str) -> dict:
+    # Parsed export with the 'area' and 'center' the grouping functions add to every label.
+    parsed_data = LabelParser.parse_scalabel_json_data(LabelParser.read_json(file_name))
+    for frame_data in parsed_data['frames']:
+        gd._calculate_centers(gd._calculate_boundingbox_areas(frame_data))
+    return parsed_data
+
+
+def test_label_cache_round_trip(scalabel_file, tmp_path):
+    file_name = scalabel_file(missing_attribute_rate=0.2, seed=6)
+    cache_dir = str(tmp_path / "cache")
+    built = LabelCache.load_label_store(file_name, cache_dir=cache_dir)
+    assert os.path.isdir(LabelCache.sidecar_path(file_name, cache_dir=cache_dir))
+    assert_stores_equal(built, LabelStore.from_scalabel(LabelParser.iter_scalabel_frames(file_name)))
+    cached = LabelCache.load_label_store(file_name, cache_dir=cache_dir)
+    assert_stores_equal(cached, built)
+    assert LabelCache.load_parsed_data(file_name, cache_dir=cache_dir) == _parse_with_geometry(file_name)
+    LabelCache.invalidate(file_name, cache_dir=cache_dir)
+    assert not os.path.exists(LabelCache.sidecar_path(file_name, cache_dir=cache_dir))
+
+
+def test_cached_geometry_matches_grouping_geometry(scalabel_file):
+    file_name = scalabel_file(seed=9, cluster_spread=20.0)
+    parsed_data = LabelCache.load_parsed_data(file_name)
+    unchanged = copy.deepcopy(parsed_data)
+    expected = gd.group_category_by_position(LabelParser.parse_scalabel_json_data(LabelParser.read_json(file_name)),
+                                             'vehicle', max_distance=0.05)
+    assert gd.group_category_by_position(parsed_data, 'vehicle', max_distance=0.05) == expected
+    assert parsed_data == unchanged
+
+
+def test_label_cache_is_rebuilt_when_the_export_changes(scalabel_file):
+    file_name = scalabel_file(seed=7)
+    LabelCache.load_label_store(file_name)
+    scalabel_file(seed=8, num_frames=4)
+    os.utime(file_name, ns=(1, 1))
+    assert LabelCache.load_parsed_data(file_name) == _parse_with_geometry(file_name)
+    LabelCache.load_label_store(file_name, use_cache=False)
+    assert LabelCache.load_parsed_data(file_name) == _parse_with_geometry(file_name)
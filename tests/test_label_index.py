@@ -0,0 +1,74 @@
+import copy
+import pytest
+from ComplexityToolkit.Utils import LabelParser
+from ComplexityToolkit.Utils.LabelIndex import LabelIndex
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsDefiner as gd
+
+
+@pytest.fixture
+def parsed_data(make_sequence):
+    parsed_data = make_sequence(num_frames=6, missing_attribute_rate=0.3, seed=31)
+    # Falsy states are never selected.
+    parsed_data['frames'][0]['labels'][0]['attributes']['Speed'] = ''
+    return parsed_data
+
+
+@pytest.mark.parametrize("category", ['vehicle', 'pedestrian', 'bicycle'])
+def test_category_selection_matches_label_parser(parsed_data, category):
+    index = LabelIndex(parsed_data)
+    assert index.select_by_category(category) == LabelParser.select_parsed_data_by_category(parsed_data['frames'],
+                                                                                             category)
+
+
+@pytest.mark.parametrize("attribute, state", [('Speed', None), ('Speed', 'Fast'), ('Direction', 'UL'),
+                                              ('Direction', 'Unknown'), ('Weather', None)])
+def test_attribute_selection_matches_label_parser(parsed_data, attribute, state):
+    index = LabelIndex(parsed_data)
+    expected = LabelParser.select_parsed_data_by_attribute(
+        {f: frame_data['labels'] for f, frame_data in enumerate(parsed_data['frames'])}, attribute)
+    if state is None:
+        assert index.select_by_attribute(attribute) == expected
+    else:
+        assert index.select_by_attribute(attribute, state) == LabelParser.select_attribute_by_state(expected, state)
+
+
+@pytest.mark.parametrize("attribute, state", [('Speed', 'Fast'), ('Speed', ''), ('Direction', 'NA')])
+def test_rebox_and_regroup_match_groupings_definer(parsed_data, attribute, state):
+    boxed = gd.boxes_category_by_position(copy.deepcopy(parsed_data), 'vehicle')
+    assert LabelIndex(boxed['frames']).rebox_by_attribute_state(attribute, state) == \
+        gd.rebox_by_attribute_state(boxed, attribute, state)
+    grouped = gd.group_category_by_position(copy.deepcopy(parsed_data), 'vehicle')
+    assert LabelIndex(grouped['frames'], grouped=True).regroup_by_attribute_state(attribute, state) == \
+        gd.regroup_by_attribute_state(grouped, attribute, state)
+    with pytest.raises(ValueError):
+        LabelIndex(boxed['frames']).regroup_by_attribute_state(attribute, state)
+
+
+def test_labels_without_category_are_posted_once():
+    labels = [{'id': '0', 'attributes': {'Speed': 'Fast'}, 'box2d': {}},
+              {'id': '1', 'category': 'vehicle', 'attributes': {'Speed': 'Fast'}, 'box2d': {}}]
+    index = LabelIndex([labels])
+    assert index.lookup(attribute='Speed', state='Fast') == {0: [0, 1]}
+    assert index.lookup(attribute='Speed') == {0: [0, 1]}
+    assert index.lookup(category='vehicle', attribute='Speed') == {0: [1]}
+
+
+def test_replaced_and_removed_frames(parsed_data):
+    frames = parsed_data['frames']
+    index = LabelIndex(frames[:3])
+    assert index.add_frame(frames[5], frame_key=1) == 1
+    assert index.select_by_category('vehicle') == \
+        LabelParser.select_parsed_data_by_category([frames[0], frames[5], frames[2]], 'vehicle')
+    index.remove_frame(0)
+    assert index.select_by_category('pedestrian') == \
+        LabelParser.select_parsed_data_by_category([frames[5], frames[2]], 'pedestrian')
+    assert len(index) == 2
+    assert all(0 not in posting for posting in index._postings.values())
+
+
+def test_running_keys_skip_explicit_keys(parsed_data):
+    frames = parsed_data['frames']
+    index = LabelIndex()
+    assert index.add_frame(frames[0], frame_key=1) == 1
+    assert [index.add_frame(frame) for frame in frames[1:4]] == [0, 2, 3]
+    assert index.select_by_category('vehicle') == LabelParser.select_parsed_data_by_category(frames[:4], 'vehicle')
@@ -0,0 +1,39 @@
+import numpy as np
+from ComplexityToolkit.Utils.LabelStore import LabelStore
+from conftest import assert_stores_equal
+
+
+def test_label_store_round_trip(make_sequence, tmp_path):
+    parsed_data = make_sequence(missing_attribute_rate=0.3, turnover=0.2, seed=4)
+    store = LabelStore.from_scalabel(parsed_data)
+    assert store.to_scalabel() == parsed_data
+    assert_stores_equal(LabelStore.from_scalabel(iter(parsed_data['frames'])), store)
+    store.save(str(tmp_path / "store"))
+    loaded = LabelStore.load(str(tmp_path / "store"))
+    assert_stores_equal(loaded, store)
+    assert loaded.to_scalabel() == parsed_data
+
+
+def test_selections_match_label_dicts(make_sequence):
+    parsed_data = make_sequence(missing_attribute_rate=0.3, seed=5)
+    store = LabelStore.from_scalabel(parsed_data)
+    for category in ('vehicle', 'pedestrian', 'bicycle'):
+        selected = store.select_category(category).to_scalabel()
+        assert selected == {'frames': [dict(frame_data, labels=[obj for obj in frame_data['labels']
+                                                                if obj['category'] == category])
+                                       for frame_data in parsed_data['frames']]}
+    codes, code = store.attribute_codes('Speed', 'Fast')
+    assert store.labels(np.flatnonzero(codes == code)) == [obj for frame_data in parsed_data['frames']
+                                                            for obj in frame_data['labels']
+                                                            if obj['attributes'].get('Speed') == 'Fast']
+    assert store.attribute_codes('Speed', 'Unknown')[1] == -2
+    assert store.labels(np.arange(len(store))[store.frame_slice(3)]) == parsed_data['frames'][3]['labels']
+
+
+def test_geometry_matches_label_boxes(make_sequence):
+    parsed_data = make_sequence(seed=6)
+    store = LabelStore.from_scalabel(parsed_data)
+    boxes = np.array([[obj['box2d'][k] for k in ('x1', 'y1', 'x2', 'y2')] for frame_data in parsed_data['frames']
+                      for obj in frame_data['labels']])
+    assert np.allclose(store.area, (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]))
+    assert np.allclose(store.center, 0.5 * (boxes[:, :2] + boxes[:, 2:]))
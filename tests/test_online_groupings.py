@@ -0,0 +1,38 @@
+import copy
+import numpy as np
+import pytest
+from ComplexityToolkit.GroupingsAnalyzer import GroupingsComplexity as gc
+from ComplexityToolkit.GroupingsAnalyzer.OnlineGroupings import OnlineGroupingsComplexity
+from conftest import CATEGORIES, GROUP_DISTANCE, dict_groups
+
+
+@pytest.mark.parametrize("reduction", ['sum', 'max'])
+def test_online_matches_full_sequence(make_sequence, reduction):
+    parsed_data = make_sequence(seed=22, cluster_spread=20.0, missing_attribute_rate=0.2, turnover=0.1)
+    online = OnlineGroupingsComplexity(max_distance=GROUP_DISTANCE, reduction=reduction)
+    for frame_data in copy.deepcopy(parsed_data['frames']):
+        online.append_frame(frame_data)
+
+    def assert_matches(parsed_data: dict):
+        groups = dict_groups(parsed_data)
+        for category in CATEGORIES:
+            assert np.allclose(online.gridc(category), gc.calc_gridc(*groups, category, reduction=reduction))
+            assert [online.groups(f)[category] for f in range(online.num_frames)] == groups[0][category]['pos']['frames']
+        assert np.allclose(online.framesc(), gc.calc_framesc_arrays(*groups))
+
+    assert_matches(parsed_data)
+    # Edit frame 4: move two boxes, remove one and add one.
+    labels = copy.deepcopy(parsed_data['frames'][4]['labels'])
+    moved = labels[:2]
+    for obj in moved:
+        obj['box2d']['y1'] += 25.0
+        obj['box2d']['y2'] += 25.0
+    added = dict(copy.deepcopy(labels[5]), id="added")
+    online.update_labels(4, labels=copy.deepcopy(moved + [added]), removed_ids=[labels[3]['id']])
+    parsed_data['frames'][4]['labels'] = moved + labels[2:3] + labels[4:] + [added]
+    assert_matches(parsed_data)
+    # sync() only updates the frames that changed.
+    edited = copy.deepcopy(parsed_data)
+    edited['frames'][7]['labels'][0]['box2d']['x1'] -= 10.0
+    assert online.sync(copy.deepcopy(edited)) == [7]
+    assert_matches(edited)
@@ -0,0 +1,93 @@
+import copy
+import json
+import random
+import pytest
+from ComplexityToolkit.Utils import ReformateJson, SyntheticScalabel
+
+
+CATEGORIES = {'car': 1.0, 'bus': 1.0, 'other person': 1.0, 'dog': 1.0, 'small vehicle': 1.0, 'pedestrian': 1.0,
+              'traffic sign': 1.0}
+
+
+@pytest.fixture
+def data():
+    data = SyntheticScalabel.generate_scalabel(num_frames=8, objects_per_frame=20, categories=CATEGORIES,
+                                               box_sizes={category: (10.0, 50.0) for category in CATEGORIES}, seed=33)
+    random.Random(0).shuffle(data['frames'])
+    return data
+
+
+def _change_categories(data: dict, attributes: bool) -> dict:
+    # Reference: the label loop ReformateJson.change_categories_attributes() used to run.
+    for frame_data in data['frames']:
+        labels = []
+        for label in frame_data['labels']:
+            if label['category'] in ReformateJson.VEHICLES or "vehicle" in label['category']:
+                label['category'] = "vehicle"
+            elif label['category'] in ReformateJson.PEDESTRIANS or "pedestrian" in label['category']:
+                label['category'] = "pedestrian"
+            else:
+                continue
+            if attributes:
+                label['attributes'] = {}
+            labels.append(label)
+        frame_data['labels'] = labels
+    return data
+
+
+@pytest.mark.parametrize("attributes", [False, True])
+def test_change_categories_matches_label_loop(data, attributes):
+    expected = _change_categories(copy.deepcopy(data), attributes)
+    assert ReformateJson.change_categories_attributes(data, attributes=attributes) == expected
+    assert {label['category'] for frame_data in data['frames'] for label in frame_data['labels']} == \
+        {'vehicle', 'pedestrian'}
+
+
+def test_frame_selection_uses_the_original_indices(data):
+    names = [frame_data['name'] for frame_data in data['frames']]
+    kept = ReformateJson.transform_frames(copy.deepcopy(data), drop_frames=[1, -1, 3], start_frame=2)
+    assert [frame_data['name'] for frame_data in kept['frames']] == [names[2]] + names[4:7]
+    assert [frame_data['name'] for frame_data in ReformateJson.delete_frames(copy.deepcopy(data), [0, -2])['frames']] \
+        == names[1:6] + names[7:]
+    assert [frame_data['name'] for frame_data in ReformateJson.start_frame(copy.deepcopy(data), 5)['frames']] == names[5:]
+    assert [frame_data['name'] for frame_data in ReformateJson.sort_frames(copy.deepcopy(data))['frames']] == sorted(names)
+
+
+@pytest.mark.parametrize("drop_frames", [[8], [-9]])
+def test_out_of_range_frames_raise(data, drop_frames):
+    with pytest.raises(IndexError):
+        ReformateJson.delete_frames(data, drop_frames)
+
+
+def test_streamed_frames_check_their_indices(data):
+    with pytest.raises(ValueError):
+        list(ReformateJson.iter_transform_frames(iter(data['frames']), drop_frames=[-1]))
+    with pytest.raises(IndexError):
+        list(ReformateJson.iter_transform_frames(iter(data['frames']), drop_frames=[8]))
+    streamed = list(ReformateJson.iter_transform_frames(iter(copy.deepcopy(data['frames'])), drop_frames=[0, 7]))
+    assert streamed == copy.deepcopy(data['frames'])[1:7]
+
+
+def test_copy_leaves_the_input_untouched(data):
+    original = copy.deepcopy(data)
+    transformed = ReformateJson.transform_frames(data, category_map=ReformateJson.CATEGORY_MAP_STANDARD_V1,
+                                                 attributes=True, drop_frames=[0], sort=True, in_place=False)
+    assert data == original
+    expected = ReformateJson.sort_frames(_change_categories(copy.deepcopy(original), attributes=True))
+    assert transformed['frames'] == [frame_data for frame_data in expected['frames']
+                                     if frame_data['name'] != original['frames'][0]['name']]
+
+
+@pytest.mark.parametrize("sort", [False, True])
+def test_json_file_transform_matches_in_memory_transform(data, tmp_path, sort):
+    input_path, output_path = str(tmp_path / "input.json"), str(tmp_path / "output.json")
+    with open(input_path, "w") as file:
+        json.dump(data, file, indent=2)
+    kwargs = {'category_map': ReformateJson.CATEGORY_MAP_STANDARD_V1, 'attributes': False, 'drop_frames': [2],
+              'start_frame': 1}
+    ReformateJson.transform_json_file(input_path, output_path, config=ReformateJson.LABEL_CONFIG_STANDARD_V1,
+                                      sort=sort, **kwargs)
+    with open(output_path, "r") as file:
+        output = json.load(file)
+    expected = ReformateJson.replace_config(ReformateJson.transform_frames(copy.deepcopy(data), sort=sort, **kwargs))
+    assert output == expected